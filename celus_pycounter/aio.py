@@ -0,0 +1,273 @@
+"""asyncio SUSHI client.
+
+Requests are made with `httpx <https://www.python-httpx.org/>`_, which
+must be installed to use this module (``pip install celus-pycounter[async]``),
+and parsing of responses is offloaded to an executor, so that many
+requests can be in flight in one process::
+
+    async with AsyncSushiClient() as client:
+        reports = await asyncio.gather(
+            *(client.get_report(url, start, end, report=name) for name in ("JR1", "DB1"))
+        )
+
+Parameters of the methods are the same as those of the functions in
+:py:mod:`celus_pycounter.sushi`, except `verify` and `session`, which are
+set on the client.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import celus_pycounter.exceptions
+import celus_pycounter.report
+from celus_pycounter import diagnostics, polling, sessions, sushi, sushi5, throttle
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 100
+
+
+class AsyncSushiClient:
+    """Client for SUSHI servers using asyncio.
+
+    :param client: ``httpx.AsyncClient`` to make requests with; by default
+        a new one is created
+
+    :param executor: :py:class:`concurrent.futures.Executor` to parse
+        responses in; defaults to the event loop's default executor
+
+    :param verify: whether to verify SSL certificates; ignored if `client`
+        is passed
+
+    :param max_connections: maximum number of open connections; ignored if
+        `client` is passed
+    """
+
+    def __init__(self, client=None, executor=None, verify=True, max_connections=MAX_CONNECTIONS):
+        self._owns_client = client is None
+        if client is None:
+            import httpx  # pylint: disable=import-outside-toplevel
+
+            client = httpx.AsyncClient(
+                verify=verify, limits=httpx.Limits(max_connections=max_connections)
+            )
+        self.client = client
+        self.executor = executor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the client's HTTP client, unless it was passed to the client."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def get_sushi_stats_raw(self, *args, release=4, **kwargs):
+        """Get a raw report.
+
+        Returns XML as bytes for COUNTER 4, decoded JSON for COUNTER 5
+        (``release=5``); see :py:func:`celus_pycounter.sushi.get_sushi_stats_raw`
+        and :py:func:`celus_pycounter.sushi5.get_sushi_stats_raw`.
+        """
+        if release == 5:
+            return await self._get_sushi5_stats_raw(*args, release=release, **kwargs)
+        response = await self._get_sushi4_response(*args, release=release, **kwargs)
+        return response.content
+
+    async def _get_sushi4_response(
+        self,
+        wsdl_url,
+        start_date,
+        end_date,
+        requestor_id=None,
+        requestor_email=None,
+        requestor_name=None,
+        customer_reference=None,
+        customer_name=None,
+        report="JR1",
+        release=4,
+        sushi_dump=False,
+        dump_file=None,
+        **extra_params,
+    ):
+        # pylint: disable=too-many-arguments
+        payload, headers = sushi._report_request(  # pylint: disable=protected-access
+            start_date,
+            end_date,
+            requestor_id,
+            requestor_email,
+            requestor_name,
+            customer_reference,
+            customer_name,
+            report,
+            release,
+        )
+        with throttle.guard(wsdl_url, blocking=False) as guard:
+            await asyncio.sleep(guard.delay)
+            response = await self.client.post(
+                wsdl_url, headers=headers, content=payload, **extra_params
+            )
+            guard.check(response)
+            sessions.raise_for_status(response)
+
+        if dump_file:
+            dump_file.write(response.content)
+
+        if sushi_dump:
+            diagnostics.dump(
+                logger, "SUSHI DUMP: request: %s \n\n response: %s", payload, response.content
+            )
+        return response
+
+    async def _get_sushi5_stats_raw(
+        self,
+        wsdl_url=None,
+        start_date=None,
+        end_date=None,
+        requestor_id=None,
+        customer_reference=None,
+        report="TR_J1",
+        release=5,
+        sushi_dump=False,
+        dump_file=None,
+        url=None,
+        api_key=None,
+        **kwargs,
+    ):
+        # pylint: disable=too-many-arguments,protected-access
+        sushi5._check_params(kwargs, release)
+        url_full, req_params = sushi5._report_request(
+            url or wsdl_url, report, customer_reference, start_date, end_date, requestor_id, api_key
+        )
+        logger.debug("Making request to %s with params %s", url_full, req_params)
+        with throttle.guard(url_full, blocking=False) as guard:
+            await asyncio.sleep(guard.delay)
+            response = await self.client.get(
+                url_full,
+                # requests leaves out parameters set to None, httpx does not
+                params={key: str(value) for key, value in req_params.items() if value is not None},
+                headers=sushi5._headers(),
+            )
+            guard.check(response)
+            sessions.raise_for_status(response)
+
+            if dump_file:
+                dump_file.write(response.content)
+
+            if sushi_dump:
+                diagnostics.dump(
+                    logger,
+                    "SUSHI DUMP: request: %s \n\n response: %s",
+                    url_full,
+                    response.content,
+                )
+
+            response_data = await self._run(json.loads, response.content)
+            sushi5._check_report_exceptions(response_data, response.headers)
+        return response_data
+
+    async def get_report(self, *args, **kwargs):
+        """Get a usage report, see :py:func:`celus_pycounter.sushi.get_report`.
+
+        Waiting before requesting a queued report again does not block
+        the event loop. With `chunk_months`, the windows are requested
+        concurrently, at most `chunk_workers` at once; with `cache`,
+        reading and writing the cache is done in the executor.
+        """
+        # pylint: disable=protected-access
+        chunk_months = kwargs.pop("chunk_months", None)
+        chunk_workers = kwargs.pop("chunk_workers", sushi.CHUNK_WORKERS)
+        if chunk_months:
+            return await self._get_report_chunked(args, kwargs, chunk_months, chunk_workers)
+        if kwargs.get("release") == 5:
+            gssr = self._get_sushi5_stats_raw
+            rtf = sushi5.raw_to_full
+        else:
+            # the response is kept for its headers
+            gssr = self._get_sushi4_response
+            rtf = sushi._sushi4_response_to_full
+            sushi._drop_api_key(kwargs)
+        strategy = sushi._polling_strategy(kwargs) or polling.PollingStrategy()
+        cache = kwargs.pop("cache", None)
+
+        started = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                with throttle.deferred():
+                    if cache is not None:
+                        return await self._fetch_cached(cache, gssr, rtf, args, kwargs)
+                    raw_report = await gssr(*args, **kwargs)
+                    return await self._run(rtf, raw_report)
+            except celus_pycounter.exceptions.SushiException as exc:
+                if not polling.is_retryable(exc):
+                    raise
+                delay = strategy.next_delay(attempts, time.monotonic() - started, exc.retry_after)
+                if delay is None:
+                    raise
+            logger.info("Service busy, retrying in %d seconds", delay)
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def _get_report_chunked(self, args, kwargs, chunk_months, chunk_workers):
+        """Get a report in windows of `chunk_months` months and merge them."""
+        # pylint: disable=protected-access
+        windows = sushi._report_windows(args, kwargs, chunk_months)
+        if len(windows) == 1:
+            return await self.get_report(*args, **kwargs)
+        semaphore = asyncio.Semaphore(chunk_workers)
+
+        async def get_window(window):
+            window_args, window_kwargs = sushi._window_arguments(args, kwargs, window)
+            async with semaphore:
+                return await self.get_report(*window_args, **window_kwargs)
+
+        reports = await asyncio.gather(*(get_window(window) for window in windows))
+        return await self._run(celus_pycounter.report.merge_reports, reports)
+
+    async def _fetch_cached(self, cache, gssr, rtf, args, kwargs):
+        """Get a report from a response cache, or request it and cache the response."""
+        # pylint: disable=protected-access
+        arguments = sushi._bind_arguments(gssr, args, kwargs)
+        release = arguments["release"]
+        key = sushi._cache_key(cache, arguments)
+        cached = await self._run(cache.get, key)
+        if cached is not None:
+            logger.debug("Using cached response for %s", key)
+            return await self._run(rtf, json.loads(cached) if release == 5 else cached)
+
+        raw_report = await gssr(*args, **kwargs)
+        # only successful responses get this far
+        report = await self._run(rtf, raw_report)
+        if cache.is_cacheable(arguments["end_date"]):
+            content = json.dumps(raw_report).encode("utf-8") if release == 5 else raw_report.content
+            await self._run(cache.set, key, content)
+        return report
+
+    async def get_status(self, url, release):
+        """Request SUSHI server status, see :py:func:`celus_pycounter.sushi.get_status`."""
+        if release != 5:
+            raise NotImplementedError(f"Status for COUNTER {release} is not implemented.")
+        response = await self.client.get(f"{url}/status")
+        return response.content
+
+
+async def get_sushi_stats_raw(*args, **kwargs):
+    """Get a raw report with a new :class:`AsyncSushiClient`."""
+    async with AsyncSushiClient() as client:
+        return await client.get_sushi_stats_raw(*args, **kwargs)
+
+
+async def get_report(*args, **kwargs):
+    """Get a usage report with a new :class:`AsyncSushiClient`."""
+    async with AsyncSushiClient() as client:
+        return await client.get_report(*args, **kwargs)
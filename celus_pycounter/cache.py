@@ -0,0 +1,289 @@
+"""On-disk caches of SUSHI responses and parsed reports.
+
+Entries are stored compressed, one file per entry named after the hash of
+its key, and evicted least recently used first when the cache grows over
+its size limit. A :class:`ResponseCache` passed to
+:py:func:`celus_pycounter.sushi.get_report` is consulted before making a
+request::
+
+    cache = ResponseCache("~/.cache/pycounter/responses", max_size=512 * 1024 * 1024)
+    report = sushi.get_report(url, start, end, report="JR1", cache=cache)
+
+Only reports of complete past months are cached, as usage of the current
+month may still change.
+
+A :class:`ReportCache` keeps parsed reports, in the compact form of
+:py:mod:`celus_pycounter.serialization`, keyed by a hash of the parsed
+content, so that loading the same file again only deserializes it::
+
+    reports = ReportCache("~/.cache/pycounter/reports")
+    report = reports.parse("archive/2019/JR1.xlsx")
+
+Reports are loaded from a :class:`ReportCache` by unpickling its files, so
+its directory must be trusted: whoever can write to it can run code in the
+process reading it.
+"""
+
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+import celus_pycounter
+import celus_pycounter.report
+import celus_pycounter.sushi
+import celus_pycounter.sushi5
+from celus_pycounter import serialization
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+
+class DiskCache:
+    """Size-bounded cache of compressed byte strings in a directory.
+
+    :param directory: directory to keep entries in; created if missing
+
+    :param max_size: maximum total size of entries in bytes, after
+        compression
+
+    :param ttl: seconds after which an entry expires, or None to keep
+        entries until they are evicted
+
+    :param compresslevel: zlib compression level
+    """
+
+    SUFFIX = ".z"
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, ttl=None, compresslevel=6):
+        self.directory = os.path.expanduser(directory)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.compresslevel = compresslevel
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+    def __repr__(self):
+        return "<{} {} max_size={} ttl={}>".format(
+            type(self).__name__, self.directory, self.max_size, self.ttl
+        )
+
+    def _entries(self):
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.name.endswith(self.SUFFIX)]
+
+    def path(self, key):
+        """Get path of the file holding the entry of `key`."""
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + self.SUFFIX)
+
+    def get(self, key):
+        """Get the value of `key`, or None if it is not in the cache or expired."""
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                self._remove(path)
+                return None
+            with open(path, "rb") as cache_file:
+                value = zlib.decompress(cache_file.read())
+            # access time orders entries for eviction, modification time
+            # keeps when the entry was stored
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error) as exc:
+            logger.warning("Dropping unreadable cache entry %s: %s", path, exc)
+            self._remove(path)
+            return None
+        return value
+
+    def set(self, key, value):
+        """Store `value` (bytes) as the value of `key`."""
+        data = zlib.compress(value, self.compresslevel)
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as cache_file:
+                cache_file.write(data)
+            with self.lock:
+                try:
+                    self.size -= os.stat(path).st_size
+                except FileNotFoundError:
+                    pass
+                os.replace(tmp_path, path)
+                self.size += len(data)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its size limit."""
+        with self.lock:
+            entries = []
+            for entry in self._entries():
+                try:
+                    entries.append((entry.stat().st_atime, entry.stat().st_size, entry.path))
+                except FileNotFoundError:
+                    pass
+            entries.sort()
+            self.size = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self.size <= self.max_size:
+                    break
+                self._remove(path, lock=False)
+
+    def clear(self):
+        """Remove all entries."""
+        with self.lock:
+            for entry in self._entries():
+                self._remove(entry.path, lock=False)
+
+    def _remove(self, path, lock=True):
+        if lock:
+            with self.lock:
+                self._remove(path, lock=False)
+            return
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.size = max(0, self.size - size)
+
+
+class ResponseCache(DiskCache):
+    """Cache of raw SUSHI responses, keyed by request parameters.
+
+    Takes the same parameters as :class:`DiskCache`.
+    """
+
+    SUFFIX = ".sushi.z"
+
+    @staticmethod
+    def key(url, report, release, customer_reference, requestor_id, start_date, end_date):
+        """Get the cache key of a report request."""
+        # pylint: disable=too-many-arguments
+        return json.dumps(
+            [
+                url,
+                report,
+                str(release),
+                customer_reference,
+                requestor_id,
+                str(start_date),
+                str(end_date),
+            ]
+        )
+
+    @staticmethod
+    def is_cacheable(end_date, today=None):
+        """Check if a report ending on `end_date` only covers complete past months."""
+        if not isinstance(end_date, datetime.date):
+            try:
+                end_date = datetime.date.fromisoformat(str(end_date))
+            except ValueError:
+                return False
+        if isinstance(end_date, datetime.datetime):
+            end_date = end_date.date()
+        today = today or datetime.date.today()
+        return end_date < today.replace(day=1)
+
+
+class ReportCache(DiskCache):
+    """Cache of parsed reports, keyed by hash of their source.
+
+    Keys include the library version, so reports parsed by another
+    version are never used. Takes the same parameters as
+    :class:`DiskCache`.
+    """
+
+    SUFFIX = ".report.z"
+
+    @staticmethod
+    def key(kind, content, options=()):
+        """Get the cache key of content parsed in a way.
+
+        :param kind: how the content is parsed, such as "file" or "sushi5"
+        :param content: bytes to parse
+        :param options: parse options affecting the result
+        """
+        return json.dumps(
+            [
+                kind,
+                celus_pycounter.__version__,
+                serialization.FORMAT_VERSION,
+                hashlib.sha256(content).hexdigest(),
+                sorted(options),
+            ]
+        )
+
+    def _cached(self, key, make_report):
+        data = self.get(key)
+        if data is not None:
+            return serialization.loads(data)
+        report = make_report()
+        self.set(key, serialization.dumps(report))
+        return report
+
+    def parse(self, filename, filetype=None, **kwargs):
+        """Parse a COUNTER file, unless it was parsed before.
+
+        Takes the same parameters as :py:func:`celus_pycounter.report.parse`.
+        """
+        # pylint: disable=protected-access
+        if celus_pycounter.report._is_path(filename):
+            path = os.fspath(filename)
+            if filetype is None:
+                filetype = celus_pycounter.report._filetype_from_extension(path)
+            with open(path, "rb") as report_file:
+                content = report_file.read()
+        elif hasattr(filename, "read"):
+            content = filename.read()
+        else:
+            content = bytes(filename)
+        kwargs.pop("use_mmap", None)
+        options = [(name, str(value)) for name, value in kwargs.items()]
+        options.append(("filetype", str(filetype)))
+        return self._cached(
+            self.key("file", content, options),
+            lambda: celus_pycounter.report.parse(content, filetype=filetype, **kwargs),
+        )
+
+    def raw_to_full(self, raw_report, release=4):
+        """Convert a raw SUSHI report to a report, unless it was converted before.
+
+        :param raw_report: raw report as accepted by
+            :py:func:`celus_pycounter.sushi.raw_to_full` or, for
+            ``release=5``, :py:func:`celus_pycounter.sushi5.raw_to_full`;
+            binary file objects are read whole to hash their content
+        :param release: COUNTER release of the report
+        """
+        if release == 5:
+            rtf = celus_pycounter.sushi5.raw_to_full
+        else:
+            rtf = celus_pycounter.sushi.raw_to_full
+        if hasattr(raw_report, "read"):
+            try:
+                content = raw_report.read()
+            finally:
+                # responses are read only once; other files belong to the caller
+                if isinstance(raw_report, celus_pycounter.sushi5.ResponseStream):
+                    raw_report.close()
+            raw_report = io.BytesIO(content) if release == 5 else content
+        elif release == 5:
+            content = json.dumps(raw_report, sort_keys=True).encode("utf-8")
+        else:
+            content = raw_report.encode("utf-8") if isinstance(raw_report, str) else raw_report
+        return self._cached(self.key(f"sushi{release}", content), lambda: rtf(raw_report))
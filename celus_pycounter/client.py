@@ -0,0 +1,66 @@
+"""SUSHI client keeping connections open between requests."""
+
+from celus_pycounter import sessions, sushi, sushi5
+
+
+class SushiClient:
+    """Client for SUSHI servers, reusing connections across requests.
+
+    Methods take the same parameters as the module-level functions in
+    :py:mod:`celus_pycounter.sushi`, but make requests through the
+    client's session. Should be closed when no longer needed, best by
+    using it as a context manager::
+
+        with SushiClient() as client:
+            for report_type in ("JR1", "DB1"):
+                report = client.get_report(url, start, end, report=report_type)
+
+    :param session: :class:`requests.Session` to use; by default a new
+        session with connection pools of the given size is created
+
+    :param pool_connections: number of hosts to keep connection pools for
+
+    :param pool_maxsize: maximum number of connections kept open per host
+    """
+
+    def __init__(
+        self,
+        session=None,
+        pool_connections=sessions.POOL_CONNECTIONS,
+        pool_maxsize=sessions.POOL_MAXSIZE,
+    ):
+        self._owns_session = session is None
+        if session is None:
+            session = sessions.make_session(pool_connections, pool_maxsize)
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the client's session, unless it was passed to the client."""
+        if self._owns_session:
+            self.session.close()
+
+    def get_report(self, *args, **kwargs):
+        """Get a usage report, see :py:func:`celus_pycounter.sushi.get_report`."""
+        kwargs.setdefault("session", self.session)
+        return sushi.get_report(*args, **kwargs)
+
+    def get_sushi_stats_raw(self, *args, **kwargs):
+        """Get a raw report, see :py:func:`celus_pycounter.sushi.get_sushi_stats_raw`.
+
+        For COUNTER 5 (``release=5``),
+        :py:func:`celus_pycounter.sushi5.get_sushi_stats_raw` is used.
+        """
+        kwargs.setdefault("session", self.session)
+        if kwargs.get("release") == 5:
+            return sushi5.get_sushi_stats_raw(*args, **kwargs)
+        return sushi.get_sushi_stats_raw(*args, **kwargs)
+
+    def get_status(self, url, release):
+        """Request SUSHI server status, see :py:func:`celus_pycounter.sushi.get_status`."""
+        return sushi.get_status(url, release, session=self.session)
@@ -0,0 +1,194 @@
+"""Compact columnar storage of usage data.
+
+Instead of every resource keeping its own list of ``(date, usage)`` tuples,
+a :class:`UsageMatrix` keeps the month axis once and usage of all resources
+in one 2-D integer matrix; resources then read their usage through a
+:class:`UsageRow` view. NumPy is used to store the matrix when it is
+installed, a flat :class:`array.array` otherwise.
+"""
+
+import array
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class UsageMatrix:
+    """Usage of many resources over a shared axis of months.
+
+    Each row holds usage of one resource, each column one month. Usage for
+    months missing from the data is zero.
+
+    :param months: first days of months making up the month axis, in order
+
+    :param backend: "numpy" or "array"; defaults to "numpy" when NumPy is
+        installed
+    """
+
+    def __init__(self, months, backend=None):
+        if backend is None:
+            backend = "numpy" if numpy is not None else "array"
+        if backend not in ("numpy", "array"):
+            raise ValueError("unknown backend %s" % backend)
+        self.backend = backend
+        self.months = list(months)
+        self._month_index = {month: idx for idx, month in enumerate(self.months)}
+        self.row_count = 0
+        # rows allocated in _data, of which row_count are used
+        self._capacity = 16
+        self._data = self._empty(self._capacity, len(self.months))
+
+    def __len__(self):
+        return self.row_count
+
+    def __repr__(self):
+        return "<UsageMatrix {} rows x {} months ({})>".format(
+            self.row_count, len(self.months), self.backend
+        )
+
+    def _empty(self, rows, columns):
+        if self.backend == "numpy":
+            return numpy.zeros((rows, columns), dtype=numpy.int64)
+        return array.array("q", bytes(8 * rows * columns))
+
+    def add_row(self, month_data=()):
+        """Add usage of a resource.
+
+        :param month_data: iterable of (datetime.date, usage) tuples
+
+        :return: index of the new row
+        """
+        row = self.row_count
+        width = len(self.months)
+        if row >= self._capacity:
+            self._capacity *= 2
+            if self.backend == "numpy":
+                data = self._empty(self._capacity, width)
+                data[:row] = self._data[:row]
+                self._data = data
+            else:
+                self._data.frombytes(bytes(8 * width * (self._capacity - row)))
+        self.row_count += 1
+        for month, usage in month_data:
+            self.add(row, month, usage)
+        return row
+
+    def view(self, row):
+        """Get a :class:`UsageRow` for a row of the matrix."""
+        return UsageRow(self, row)
+
+    def add(self, row, month, usage):
+        """Add usage for a month to a row."""
+        try:
+            col = self._month_index[month]
+        except KeyError:
+            # months outside the axis are kept even with zero usage, like
+            # resources keeping usage in lists do
+            self._add_month(month)
+            col = self._month_index[month]
+        if self.backend == "numpy":
+            self._data[row, col] += usage
+        else:
+            self._data[row * len(self.months) + col] += usage
+
+    def _add_month(self, month):
+        """Insert a month in the month axis, keeping it sorted."""
+        old_width = len(self.months)
+        self.months = sorted(self.months + [month])
+        self._month_index = {month: idx for idx, month in enumerate(self.months)}
+        width = len(self.months)
+        new_col = self._month_index[month]
+        if self.backend == "numpy":
+            self._data = numpy.insert(self._data, new_col, 0, axis=1)
+        else:
+            data = self._empty(self._capacity, width)
+            for row in range(self.row_count):
+                old = self._data[row * old_width : (row + 1) * old_width]
+                data[row * width : row * width + new_col] = old[:new_col]
+                data[row * width + new_col + 1 : (row + 1) * width] = old[new_col:]
+            self._data = data
+
+    def row_values(self, row):
+        """Get usage of a row for every month of the month axis, as list of ints."""
+        if self.backend == "numpy":
+            return self._data[row].tolist()
+        width = len(self.months)
+        return self._data[row * width : (row + 1) * width].tolist()
+
+    def value(self, row, col):
+        """Get usage of a row for the month in column `col` of the month axis."""
+        if self.backend == "numpy":
+            return int(self._data[row, col])
+        return self._data[row * len(self.months) + col]
+
+    def row_totals(self):
+        """Get total usage of every row, as list of ints."""
+        if self.backend == "numpy":
+            return self._data[: self.row_count].sum(axis=1).tolist()
+        width = len(self.months)
+        return [sum(self._data[row * width : (row + 1) * width]) for row in range(self.row_count)]
+
+    def month_totals(self, rows=None):
+        """Sum usage of rows for every month of the month axis.
+
+        :param rows: indices of rows to sum; all rows if None
+
+        :return: list of ints
+        """
+        if rows is None:
+            rows = range(self.row_count)
+        if self.backend == "numpy":
+            return self._data[list(rows)].sum(axis=0).tolist()
+        width = len(self.months)
+        totals = [0] * width
+        for row in rows:
+            start = row * width
+            totals = [
+                total + usage for total, usage in zip(totals, self._data[start : start + width])
+            ]
+        return totals
+
+
+class UsageRow:
+    """Usage of one resource stored in a :class:`UsageMatrix`.
+
+    Behaves like the list of (datetime.date, usage) tuples resources
+    otherwise keep, always holding one tuple per month of the month axis,
+    in order.
+    """
+
+    __slots__ = ("matrix", "row")
+
+    def __init__(self, matrix, row):
+        self.matrix = matrix
+        self.row = row
+
+    def __iter__(self):
+        return zip(self.matrix.months, self.matrix.row_values(self.row))
+
+    def __len__(self):
+        return len(self.matrix.months)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[col] for col in range(*idx.indices(len(self)))]
+        months = self.matrix.months
+        col = idx + len(months) if idx < 0 else idx
+        if not 0 <= col < len(months):
+            raise IndexError("usage row index out of range")
+        return months[col], self.matrix.value(self.row, col)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, item):
+        """Add usage for a month, given as (datetime.date, usage) tuple."""
+        self.matrix.add(self.row, item[0], item[1])
+
+    def sort(self):
+        """Do nothing; usage is always in month order."""
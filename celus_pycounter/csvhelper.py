@@ -1,8 +1,17 @@
 """Read CSV as unicode from both python 2 and 3 transparently."""
 
+import codecs
 import csv
+import io
+import re
 import warnings
 
+CHUNK_SIZE = 64 * 1024
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+_LINE_END_RE = re.compile(r"\r\n|\r|\n")
+
 
 # noinspection PyUnusedLocal
 class UnicodeReader:
@@ -13,17 +22,29 @@ class UnicodeReader:
     with UnicodeReader('myfile.csv') as reader:
         pass # do things with reader
 
-    :param filename: path to file to open
+    :param filename: path to file to open, or a binary file object
+             (which is not closed on exit), read from its current position
     :param dialect: a csv.Dialect instance or dialect name
     :param encoding: text encoding of file
     :param fallback_encoding: encoding to fall back to if default
              encoding fails; gives warning if it's used.
+    :param incremental: detect the encoding while reading instead of
+             decoding the whole file up front. The file is then decoded
+             only once; if decoding fails after non-ASCII text was already
+             read, only the rest of the file is decoded with
+             fallback_encoding.
 
     All other parameters will be passed through to csv.reader()
     """
 
     def __init__(
-        self, filename, dialect=csv.excel, encoding="utf-8", fallback_encoding="latin-1", **kwargs
+        self,
+        filename,
+        dialect=csv.excel,
+        encoding="utf-8",
+        fallback_encoding="latin-1",
+        incremental=False,
+        **kwargs,
     ):
         self.filename = filename
         self.dialect = dialect
@@ -32,25 +53,117 @@ class UnicodeReader:
         self.fileobj = None
         self.reader = None
         self.fallback_encoding = fallback_encoding
+        self.incremental = incremental
+        # position of a file object passed in, to read again from on fallback
+        self._start = None
+        self._text_start = 0
 
     def __enter__(self):
-        self.fileobj = open(self.filename, "rt", encoding=self.encoding, newline="")
-        try:
-            self.fileobj.read()
-        except UnicodeDecodeError:
-            warnings.warn(
-                "Decoding with '%s' codec failed; falling "
-                "back to '%s'" % (self.encoding, self.fallback_encoding)
-            )
-            self.fileobj = open(self.filename, "rt", encoding=self.fallback_encoding, newline="")
-            self.encoding = self.fallback_encoding
-        finally:
-            self.fileobj.seek(0)
-        self.reader = csv.reader(self.fileobj, dialect=self.dialect, **self.kwargs)
+        if self.incremental:
+            self.fileobj = self._open_binary()
+            lines = self._decoded_lines()
+        else:
+            self.fileobj = self._open_text(self.encoding)
+            try:
+                self.fileobj.read()
+            except UnicodeDecodeError:
+                self._warn_fallback()
+                self._close()
+                self.fileobj = self._open_text(self.fallback_encoding)
+                self.encoding = self.fallback_encoding
+            finally:
+                self.fileobj.seek(self._text_start)
+            lines = self.fileobj
+        self.reader = csv.reader(lines, dialect=self.dialect, **self.kwargs)
         return self
 
+    def _is_file_object(self):
+        return hasattr(self.filename, "read")
+
+    def _open_binary(self):
+        if self._is_file_object():
+            return self.filename
+        return open(self.filename, "rb")
+
+    def _open_text(self, encoding):
+        if self._is_file_object():
+            if self._start is None:
+                self._start = self.filename.tell()
+            else:
+                self.filename.seek(self._start)
+            fileobj = io.TextIOWrapper(self.filename, encoding=encoding, newline="")
+        else:
+            fileobj = open(self.filename, "rt", encoding=encoding, newline="")
+        self._text_start = fileobj.tell()
+        return fileobj
+
+    def _close(self):
+        if not self._is_file_object():
+            self.fileobj.close()
+        elif isinstance(self.fileobj, io.TextIOWrapper):
+            # leave the caller's file object open
+            self.fileobj.detach()
+
+    def _warn_fallback(self):
+        warnings.warn(
+            "Decoding with '%s' codec failed; falling "
+            "back to '%s'" % (self.encoding, self.fallback_encoding)
+        )
+
+    def _decoded_chunks(self):
+        """Decode the file chunk by chunk, switching to fallback encoding on failure."""
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        ascii_only = True
+        while True:
+            chunk = self.fileobj.read(CHUNK_SIZE)
+            final = not chunk
+            # bytes of an incomplete character left over from the previous chunk
+            pending = decoder.getstate()[0]
+            try:
+                text = decoder.decode(chunk, final)
+            except UnicodeDecodeError as exc:
+                if self.encoding == self.fallback_encoding:
+                    raise
+                if not ascii_only:
+                    warnings.warn(
+                        "Decoding with '%s' codec failed after non-ASCII text "
+                        "was read; only the rest of the file is decoded "
+                        "with '%s'" % (self.encoding, self.fallback_encoding)
+                    )
+                else:
+                    self._warn_fallback()
+                # text before the failing byte is kept as decoded by the
+                # primary encoding; only the rest is decoded with the fallback
+                data = pending + chunk
+                text = data[: exc.start].decode(self.encoding)
+                decoder = codecs.getincrementaldecoder(self.fallback_encoding)()
+                self.encoding = self.fallback_encoding
+                text += decoder.decode(data[exc.start :], final)
+            if ascii_only:
+                ascii_only = text.isascii()
+            if text:
+                yield text
+            if final:
+                return
+
+    def _decoded_lines(self):
+        """Split decoded text into lines, keeping line endings like newline=''."""
+        pending = ""
+        for text in self._decoded_chunks():
+            pending += text
+            start = 0
+            for match in _LINE_END_RE.finditer(pending):
+                if match.end() == len(pending) and match.group() == "\r":
+                    # might be the first half of a "\r\n" split between chunks
+                    break
+                yield pending[start : match.end()]
+                start = match.end()
+            pending = pending[start:]
+        if pending:
+            yield pending
+
     def __exit__(self, type_, value, traceback):
-        self.fileobj.close()
+        self._close()
 
     def __next__(self):
         return next(self.reader)
@@ -71,23 +184,34 @@ class UnicodeWriter:
     :param filename: path to file to open
     :param dialect: a csv.Dialect instance or dialect name
     :param encoding: text encoding of file
+    :param buffer_size: size in bytes of the buffer output is collected
+        in before it is written to the file
 
     All other parameters will be passed through to csv.writer()
     """
 
     def __init__(
-        self, filename, dialect=csv.excel, encoding="utf-8", lineterminator="\n", **kwargs
+        self,
+        filename,
+        dialect=csv.excel,
+        encoding="utf-8",
+        lineterminator="\n",
+        buffer_size=WRITE_BUFFER_SIZE,
+        **kwargs,
     ):
         self.filename = filename
         self.dialect = dialect
         self.encoding = encoding
+        self.buffer_size = buffer_size
         self.lineterminator = lineterminator
         self.kwargs = kwargs
         self.writer = None
         self.fileobj = None
 
     def __enter__(self):
-        self.fileobj = open(self.filename, "wt", encoding=self.encoding, newline="")
+        self.fileobj = open(
+            self.filename, "wt", encoding=self.encoding, newline="", buffering=self.buffer_size
+        )
         self.writer = csv.writer(
             self.fileobj, dialect=self.dialect, lineterminator=self.lineterminator, **self.kwargs
         )
@@ -106,7 +230,7 @@ class UnicodeWriter:
     def writerows(self, rows):
         """Write many rows to the output.
 
-        :param rows: list of lists of cells to write
+        :param rows: iterable of lists of cells to write; consumed lazily,
+            so it can be a generator
         """
-        for row in rows:
-            self.writerow(row)
+        self.writer.writerows(rows)
@@ -0,0 +1,97 @@
+"""Cheap diagnostic dumps of SUSHI requests and responses.
+
+Payloads passed to :py:func:`dump` are only serialized when a log record
+is actually emitted, and then cut to a maximum size. Dumps can also be
+sampled, so that only a fraction of requests is dumped::
+
+    from celus_pycounter import diagnostics
+
+    diagnostics.configure(max_size=4096, sample_rate=0.1)
+"""
+
+import logging
+import random
+
+from lxml import etree
+
+DEFAULT_MAX_SIZE = 64 * 1024
+
+_settings = {"max_size": DEFAULT_MAX_SIZE, "sample_rate": 1.0}
+
+
+def configure(max_size=None, sample_rate=None):
+    """Change how payloads are dumped.
+
+    :param max_size: maximum number of characters of a payload to log;
+        0 for no limit
+
+    :param sample_rate: fraction of calls to :py:func:`dump` which are
+        actually logged, between 0 and 1
+    """
+    if max_size is not None:
+        if max_size < 0:
+            raise ValueError("max_size must not be negative")
+        _settings["max_size"] = max_size
+    if sample_rate is not None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        _settings["sample_rate"] = sample_rate
+
+
+class Payload:
+    """Payload of a log record, serialized only when the record is formatted.
+
+    :param value: bytes, str, lxml element, or callable returning one of
+        these
+
+    :param max_size: maximum number of characters to output; defaults to
+        the configured maximum size
+    """
+
+    __slots__ = ("value", "max_size")
+
+    def __init__(self, value, max_size=None):
+        self.value = value
+        self.max_size = _settings["max_size"] if max_size is None else max_size
+
+    def __str__(self):
+        value = self.value
+        if callable(value):
+            value = value()
+        if etree.iselement(value):
+            value = etree.tostring(value)
+        if isinstance(value, (bytes, bytearray)):
+            if self.max_size:
+                # a UTF-8 character is at most 4 bytes long
+                value = value[: 4 * self.max_size + 4]
+            value = value.decode("utf-8", errors="replace")
+        elif not isinstance(value, str):
+            value = repr(value)
+        return truncate(value, self.max_size)
+
+    __repr__ = __str__
+
+
+def truncate(text, max_size):
+    """Cut text to at most `max_size` characters, noting that it was cut."""
+    if not max_size or len(text) <= max_size:
+        return text
+    return text[:max_size] + "... [truncated]"
+
+
+def dump(logger, message, *payloads):
+    """Log payloads at DEBUG level, if enabled and selected by sampling.
+
+    :param logger: logger to log to
+
+    :param message: %-style format string with a placeholder for every
+        payload
+
+    :param payloads: payloads, see :class:`Payload`
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    sample_rate = _settings["sample_rate"]
+    if sample_rate < 1 and random.random() >= sample_rate:
+        return
+    logger.debug(message, *(Payload(payload) for payload in payloads))
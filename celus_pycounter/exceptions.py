@@ -10,12 +10,18 @@ class UnknownReportTypeError(PycounterException):
 
 
 class SushiException(PycounterException):
-    """Base class for SUSHI-related exceptions."""
+    """Base class for SUSHI-related exceptions.
+
+    Attributes:
+        retry_after: seconds to wait before retrying the request, if the
+            server said so in a Retry-After header
+    """
 
     def __init__(self, message, raw=None, xml=None):
         super().__init__(message)
         self.raw = raw
         self.xml = xml
+        self.retry_after = None
 
 
 class ServiceNotAvailableError(SushiException):
@@ -30,6 +36,10 @@ class TooManyRequestsError(SushiException):
     """Fatal error: The client has made too many requests to the service."""
 
 
+class CircuitOpenError(SushiException):
+    """Requests to a provider are suspended after repeated failures."""
+
+
 class RequestorNotAuthorizedError(SushiException):
     """
     Requestor is not authorized.
@@ -0,0 +1,254 @@
+"""Concurrent harvesting of many SUSHI reports.
+
+A :class:`Harvester` runs a batch of :class:`HarvestJob` in a thread pool,
+limiting both the total number of requests in flight and the number of
+requests to any single host. Failed requests are retried, and reports
+which are not ready yet are polled again later without keeping a worker
+thread waiting::
+
+    jobs = [
+        HarvestJob("https://sushi.example.com/", "JR1", start, end, params=credentials),
+        HarvestJob("https://c5.example.org/sushi", "TR_J1", start, end, release=5),
+    ]
+    for result in iter_harvest(jobs, max_workers=16, per_host=2):
+        if result.error is None:
+            store(result.job, result.report)
+"""
+
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import time
+import urllib.parse
+
+import requests
+
+import celus_pycounter.exceptions
+from celus_pycounter import sessions, sushi
+from celus_pycounter.polling import PollingStrategy
+
+logger = logging.getLogger(__name__)
+
+HarvestJob = collections.namedtuple(
+    "HarvestJob", "url report start_date end_date release params", defaults=(4, None)
+)
+HarvestJob.__doc__ = """A report to harvest.
+
+:param url: URL of the SUSHI endpoint
+:param report: report type, such as "JR1" or "TR_J1"
+:param start_date: first day of the first month of the report
+:param end_date: last day of the last month of the report
+:param release: COUNTER release, 4 or 5
+:param params: other parameters of :py:func:`celus_pycounter.sushi.get_report`,
+    such as credentials (requestor_id, customer_reference, api_key...)
+"""
+
+HarvestResult = collections.namedtuple("HarvestResult", "job report error attempts")
+HarvestResult.__doc__ = """Outcome of a :class:`HarvestJob`.
+
+Either `report` is the :class:`celus_pycounter.report.CounterReport` and
+`error` is None, or `report` is None and `error` is the exception the
+last request for the report failed with. `attempts` is the number of
+requests made.
+"""
+
+# raised for connection errors and HTTP 429, 502, 503 and 504 responses
+RETRY_EXCEPTIONS = (
+    requests.RequestException,
+    celus_pycounter.exceptions.ServiceNotAvailableError,
+    celus_pycounter.exceptions.TooManyRequestsError,
+)
+
+
+class _Task:
+    """State of a job being harvested."""
+
+    __slots__ = ("job", "host", "pending", "failures")
+
+    def __init__(self, job, pending):
+        self.job = job
+        self.host = urllib.parse.urlsplit(job.url).netloc.lower()
+        self.pending = pending
+        self.failures = 0
+
+
+class Harvester:
+    """Runs harvest jobs concurrently.
+
+    Jobs failing because requests to their provider are suspended by
+    :py:mod:`celus_pycounter.throttle` are run again once the circuit may
+    close, without counting towards `retries`.
+
+    Can be used as a context manager closing the harvester on exit.
+
+    :param max_workers: maximum number of requests in flight
+
+    :param per_host: maximum number of requests in flight to one host
+
+    :param retries: how many times to retry a job after a failed request
+
+    :param retry_on: exception classes of failures worth retrying
+
+    :param retry_strategy: a :class:`celus_pycounter.polling.PollingStrategy`
+        for delays between retries of failed requests
+
+    :param polling: a :class:`celus_pycounter.polling.PollingStrategy` for
+        polling of queued reports
+
+    :param session: :class:`requests.Session` to make requests with; by
+        default a new session with a pool of `per_host` connections per
+        host is created, which :py:meth:`close` closes
+    """
+
+    def __init__(
+        self,
+        max_workers=8,
+        per_host=2,
+        retries=2,
+        retry_on=RETRY_EXCEPTIONS,
+        retry_strategy=None,
+        polling=None,
+        session=None,
+    ):
+        # pylint: disable=too-many-arguments
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if per_host < 1:
+            raise ValueError("per_host must be at least 1")
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.retries = retries
+        self.retry_on = retry_on
+        self.retry_strategy = (
+            retry_strategy
+            if retry_strategy is not None
+            else PollingStrategy(initial_delay=5, max_delay=60, max_attempts=None)
+        )
+        self.polling = polling
+        self._owns_session = session is None
+        if session is None:
+            session = sessions.make_session(pool_maxsize=per_host)
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the session, unless it was passed to the harvester."""
+        if self._owns_session:
+            self.session.close()
+
+    def _start(self, job):
+        kwargs = dict(job.params or {})
+        kwargs.update(
+            start_date=job.start_date,
+            end_date=job.end_date,
+            report=job.report,
+            release=job.release,
+            session=self.session,
+        )
+        kwargs["url" if job.release == 5 else "wsdl_url"] = job.url
+        if self.polling is not None:
+            kwargs["polling"] = self.polling
+        return _Task(job, sushi.start_report(**kwargs))
+
+    def run(self, jobs):
+        """Harvest reports, yielding a :class:`HarvestResult` as each job finishes.
+
+        :param jobs: iterable of :class:`HarvestJob`
+        """
+        # pylint: disable=too-many-locals,too-many-branches
+        ready = collections.deque(self._start(job) for job in jobs)
+        # heap of (monotonic time, sequence number, task) of tasks to run later
+        delayed = []
+        sequence = itertools.count()
+        running = {}
+        host_running = collections.Counter()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while ready or delayed or running:
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    ready.append(heapq.heappop(delayed)[2])
+
+                blocked = []
+                while ready and len(running) < self.max_workers:
+                    task = ready.popleft()
+                    if host_running[task.host] >= self.per_host:
+                        blocked.append(task)
+                        continue
+                    host_running[task.host] += 1
+                    running[executor.submit(task.pending.poll)] = task
+                ready.extendleft(reversed(blocked))
+
+                timeout = max(0.0, delayed[0][0] - now) if delayed else None
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                done, _ = concurrent.futures.wait(
+                    running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    task = running.pop(future)
+                    host_running[task.host] -= 1
+                    try:
+                        report = future.result()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        delay = self._retry_delay(task, exc)
+                        if delay is None:
+                            yield HarvestResult(task.job, None, exc, task.pending.attempts)
+                        else:
+                            logger.info("Retrying %s in %d seconds: %s", task.job, delay, exc)
+                            entry = (time.monotonic() + delay, next(sequence), task)
+                            heapq.heappush(delayed, entry)
+                        continue
+                    if report is None:
+                        # report queued, poll it again later
+                        entry = (task.pending.next_poll, next(sequence), task)
+                        heapq.heappush(delayed, entry)
+                    else:
+                        yield HarvestResult(task.job, report, None, task.pending.attempts)
+
+    def _retry_delay(self, task, exc):
+        """Get delay before retrying a failed job, or None not to retry it."""
+        if isinstance(exc, celus_pycounter.exceptions.CircuitOpenError):
+            # no request was made; wait until the circuit may close
+            return self.retry_strategy.next_delay(task.failures + 1, retry_after=exc.retry_after)
+        if not isinstance(exc, self.retry_on) or task.failures >= self.retries:
+            return None
+        task.failures += 1
+        # SushiException carries the delay requested with Retry-After
+        retry_after = getattr(exc, "retry_after", None)
+        return self.retry_strategy.next_delay(task.failures, retry_after=retry_after)
+
+
+def iter_harvest(jobs, **options):
+    """Harvest reports, yielding a :class:`HarvestResult` as each job finishes.
+
+    :param jobs: iterable of :class:`HarvestJob`
+    :param options: passed to :class:`Harvester`
+    """
+    with Harvester(**options) as harvester:
+        yield from harvester.run(jobs)
+
+
+def harvest(jobs, callback=None, **options):
+    """Harvest reports.
+
+    :param jobs: iterable of :class:`HarvestJob`
+    :param callback: called with every :class:`HarvestResult` as soon as
+        its job finishes
+    :param options: passed to :class:`Harvester`
+    :return: list of :class:`HarvestResult`, in order of completion
+    """
+    results = []
+    for result in iter_harvest(jobs, **options):
+        if callback is not None:
+            callback(result)
+        results.append(result)
+    return results
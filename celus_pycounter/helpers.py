@@ -1,8 +1,13 @@
 """Helper functions used by pycounter."""
 
 import calendar
+import codecs
 import datetime
+import functools
+import io
+import json
 import re
+import sys
 
 import pendulum
 
@@ -50,6 +55,25 @@ def convert_date_run(datestring):
     if isinstance(datestring, datetime.date):
         return datestring
 
+    return _parse_date(datestring)
+
+
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(datestring):
+    """Parse a date string, cached as reports repeat the same few dates a lot.
+
+    Plain 'YYYY-MM-DD' dates are converted directly; anything else is left
+    to pendulum. Either way, a :class:`pendulum.Date` is returned.
+    """
+    match = _ISO_DATE_RE.fullmatch(datestring)
+    if match:
+        try:
+            return pendulum.Date(*map(int, match.groups()))
+        except ValueError:
+            pass
     return pendulum.parse(datestring, strict=False).date()
 
 
@@ -63,6 +87,11 @@ def convert_date_column(datestring):
     """
     if isinstance(datestring, datetime.datetime):
         return datestring.date()
+    return _parse_date_column(datestring)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date_column(datestring):
     try:
         return datetime.datetime.strptime(datestring.strip(), "%b-%Y").date()
     except ValueError:
@@ -111,6 +140,51 @@ def next_month(dateobj):
     return datetime.date(dateobj.year + year_delta, old_month + 1, 1)
 
 
+@functools.lru_cache(maxsize=128)
+def period_months(period):
+    """List first days of all months in a period.
+
+    Results are cached, so all resources of a report share the same
+    month grid.
+
+    :param period: tuple of datetime.date objects
+
+    :return: tuple of datetime.date
+    """
+    months = []
+    month = datetime.date(period[0].year, period[0].month, 1)
+    while month <= period[1]:
+        months.append(month)
+        month = next_month(month)
+    return tuple(months)
+
+
+def month_windows(start_date, end_date, months=1):
+    """Split a date range into consecutive windows of whole months.
+
+    :param start_date: first day of the range as datetime.date
+
+    :param end_date: last day of the range as datetime.date
+
+    :param months: number of months in a window; the last window may be
+        shorter
+
+    :return: list of (first day, last day) tuples of datetime.date
+    """
+    if months < 1:
+        raise ValueError("months must be at least 1")
+    windows = []
+    first = start_date
+    while first <= end_date:
+        last = first
+        for _ in range(months - 1):
+            last = next_month(last)
+        last = min(last_day(last), end_date)
+        windows.append((first, last))
+        first = next_month(last)
+    return windows
+
+
 def prev_month(dateobj):
     """Find the first day of the previous month before the given date.
 
@@ -144,22 +218,273 @@ def format_stat(stat):
         return 0
 
 
+def intern_string(value):
+    """Intern a string, so equal values repeated across resources share memory.
+
+    Values other than strings (such as numbers from Excel cells or None)
+    are returned unchanged.
+
+    :param value: value of a cell or XML/JSON field
+
+    :return: the interned string, or the value itself
+    """
+    if type(value) is str:  # noqa: E721 - str subclasses cannot be interned
+        return sys.intern(value)
+    return value
+
+
+SNIFF_SIZE = 8 * 1024
+
+_XML_START_RE = re.compile(rb"^(?:\xef\xbb\xbf)?\s*<")
+_JSON_START_RE = re.compile(rb"^(?:\xef\xbb\xbf)?\s*[\[{]")
+
+
+def sniff_content(prefix):
+    """Guess type of a file from the first bytes of its content.
+
+    :param prefix: first bytes of the file, such as the first
+        :py:data:`SNIFF_SIZE` bytes
+
+    :return: string, one of "xlsx" (or any other ZIP archive), "gzip",
+        "xml", "json", "tsv", "csv"
+    """
+    if prefix.startswith(b"PK"):
+        return "xlsx"
+    if prefix.startswith(b"\x1f\x8b"):
+        return "gzip"
+    if _XML_START_RE.match(prefix):
+        return "xml"
+    if _JSON_START_RE.match(prefix):
+        return "json"
+    if b"\t" in prefix:
+        return "tsv"
+    return "csv"
+
+
+def read_prefix(file_obj, size=SNIFF_SIZE):
+    """Read up to `size` bytes from a file, retrying short reads.
+
+    :param file_obj: binary file-like object
+
+    :return: bytes; shorter than `size` only at the end of the file
+    """
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = file_obj.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
 def guess_type_from_content(file_obj):
     """Guess type of a spreadsheet-like file.
 
     Defaults to assuming it's CSV, if it doesn't appear to be XLSX or TSV.
+    Only the first :py:data:`SNIFF_SIZE` bytes of the file are read.
 
     :param file_obj: file-like object of which to determine type.
 
-    :return: string, one of "xlsx", "tsv", "csv"
+    :return: string, one of the types returned by :py:func:`sniff_content`
+    """
+    return sniff_content(read_prefix(file_obj))
+
+
+class MemoryReader(io.RawIOBase):
+    """Seekable binary file object reading from a bytes-like object.
+
+    Unlike :class:`io.BytesIO`, the data is never copied as a whole, only
+    the chunks that are read.
+
+    :param data: bytes, bytearray, memoryview or any other object
+        supporting the buffer protocol
+    """
+
+    def __init__(self, data):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError("invalid whence (%r)" % whence)
+        if position < 0:
+            raise ValueError("negative seek position %d" % position)
+        self._position = position
+        return position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = len(self._view)
+        else:
+            end = min(self._position + size, len(self._view))
+        data = self._view[self._position : end].tobytes()
+        self._position = max(self._position, end)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class PrefixedReader(io.RawIOBase):
+    """Binary file object reading already-read bytes, then the rest of a file.
+
+    Used to hand bytes read while sniffing a non-seekable stream on to the
+    parser, so the stream is only read once.
+
+    :param prefix: bytes read from `file_obj` so far
+
+    :param file_obj: binary file-like object to read the rest from
+    """
+
+    def __init__(self, prefix, file_obj):
+        super().__init__()
+        self._prefix = memoryview(prefix)
+        self._file_obj = file_obj
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._file_obj.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+_JSON_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+
+
+class _JsonReader:
+    """Reads JSON values one by one from a file object, a chunk at a time."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read another chunk, dropping what was parsed already.
+
+        :return: False if the end of the stream was reached before
+        """
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        if isinstance(data, str):
+            text = data
+        else:
+            text = self.text_decoder.decode(data, final=not data)
+        self.buffer = self.buffer[self.pos :] + text
+        self.pos = 0
+        self.eof = not data
+        return True
+
+    def peek(self):
+        """Skip whitespace and get the next character; empty at the end."""
+        while True:
+            self.pos = _JSON_WHITESPACE_RE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, characters):
+        """Consume one of `characters`, which must come next."""
+        char = self.peek()
+        if not char or char not in characters:
+            raise json.JSONDecodeError(
+                "Expecting one of {!r}".format(characters), self.buffer, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number ending with the buffer may continue in the next chunk
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        """Generate values of an array whose "[" was consumed."""
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_json_object(stream, lazy_keys=(), chunk_size=JSON_CHUNK_SIZE):
+    """Parse a JSON object from a file object incrementally.
+
+    Generates (key, value) pairs of the object in the order they appear.
+    Values of `lazy_keys` that are arrays are given as iterators of their
+    items, which are decoded one by one as the iterator is consumed, so
+    only one item is in memory at a time. Iterators not consumed before
+    the next pair is requested are skipped.
+
+    :param stream: binary (UTF-8) or text file object
+    :param lazy_keys: keys whose array values are iterated lazily
+    :param chunk_size: number of bytes to read at a time
     """
-    first_bytes = file_obj.read(2)
-    if first_bytes == b"PK":
-        filetype = "xlsx"
-    else:
-        content = file_obj.read()
-        if b"\t" in content:
-            filetype = "tsv"
+    reader = _JsonReader(stream, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key in lazy_keys and reader.peek() == "[":
+            reader.pos += 1
+            items = reader.array()
+            yield key, items
+            for _ in items:
+                pass
         else:
-            filetype = "csv"
-    return filetype
+            yield key, reader.value()
+        if reader.expect(",}") == "}":
+            return
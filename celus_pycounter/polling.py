@@ -0,0 +1,212 @@
+"""Polling of SUSHI servers for reports that are not ready yet.
+
+Servers answer requests for reports they are still preparing with
+"Report Queued" (COUNTER 4), exception 1011 (COUNTER 5) or, when
+requests come too fast, exception 1020 or HTTP 429. A
+:class:`PollingStrategy` decides how long to wait before requesting such
+a report again and when to give up; a :class:`PendingReport` tracks
+polling of one report without blocking, so that a worker can poll many
+reports in turn.
+"""
+
+import datetime
+import email.utils
+import random
+import time
+
+import celus_pycounter.exceptions
+
+# COUNTER 5 exceptions after which the request should be repeated later:
+# 1011 Report Queued for Processing, 1020 Client has made too many requests
+RETRY_CODES = frozenset({1011, 1020})
+
+
+def is_retryable(exc):
+    """Check if a request that failed with an exception should be retried later."""
+    if isinstance(
+        exc,
+        (
+            celus_pycounter.exceptions.ServiceBusyError,
+            celus_pycounter.exceptions.TooManyRequestsError,
+        ),
+    ):
+        return True
+    if isinstance(exc, celus_pycounter.exceptions.Sushi5Error):
+        try:
+            return int(exc.code) in RETRY_CODES
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_retry_after(value):
+    """Convert value of a Retry-After HTTP header to seconds.
+
+    :param value: number of seconds or HTTP date, or None
+
+    :return: number of seconds (never negative), or None if `value` is
+        None or invalid
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class PollingStrategy:
+    """Exponential backoff with jitter and a limited budget.
+
+    The n-th retry waits ``initial_delay * multiplier ** (n - 1)`` seconds,
+    at most `max_delay`, randomly changed by up to `jitter` times the
+    delay in either direction. A delay requested by the server with
+    Retry-After is used instead, if it is longer and `use_retry_after` is
+    set.
+
+    :param initial_delay: seconds to wait before the first retry
+
+    :param multiplier: factor the delay grows by with every retry
+
+    :param max_delay: longest delay in seconds
+
+    :param jitter: fraction of the delay to randomly add or subtract
+
+    :param max_attempts: maximum number of requests for a report, or None
+        for no limit
+
+    :param deadline: maximum number of seconds to keep polling a report
+        for, or None for no limit
+
+    :param use_retry_after: whether to wait as long as the server asks to
+        with Retry-After
+    """
+
+    def __init__(
+        self,
+        initial_delay=60,
+        multiplier=2,
+        max_delay=15 * 60,
+        jitter=0.1,
+        max_attempts=20,
+        deadline=60 * 60,
+        use_retry_after=True,
+    ):
+        # pylint: disable=too-many-arguments
+        self.initial_delay = initial_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.use_retry_after = use_retry_after
+
+    def __repr__(self):
+        return (
+            "<PollingStrategy initial_delay={} multiplier={} max_delay={} jitter={} "
+            "max_attempts={} deadline={} use_retry_after={}>".format(
+                self.initial_delay,
+                self.multiplier,
+                self.max_delay,
+                self.jitter,
+                self.max_attempts,
+                self.deadline,
+                self.use_retry_after,
+            )
+        )
+
+    def next_delay(self, attempts, elapsed=0, retry_after=None):
+        """Get delay before the next request for a report.
+
+        :param attempts: number of requests made so far
+
+        :param elapsed: seconds since the first request
+
+        :param retry_after: delay in seconds requested by the server
+
+        :return: seconds to wait, or None if the budget is spent
+        """
+        if self.max_attempts is not None and attempts >= self.max_attempts:
+            return None
+        delay = min(self.initial_delay * self.multiplier ** (attempts - 1), self.max_delay)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        if retry_after is not None and self.use_retry_after:
+            delay = max(delay, retry_after)
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+        return delay
+
+
+# retries at once, whatever the server asks for
+NO_DELAY = PollingStrategy(initial_delay=0, jitter=0, use_retry_after=False)
+
+
+class PendingReport:
+    """A report that may have to be requested several times.
+
+    :py:meth:`poll` requests the report when it is time to, and returns
+    immediately either way::
+
+        pending = PendingReport(lambda: sushi.get_report(...))
+        while (report := pending.poll()) is None:
+            do_other_work(max_time=pending.wait_time)
+
+    :param fetch: callable requesting the report; raises an exception
+        accepted by :py:func:`is_retryable` if the report is not ready
+
+    :param strategy: a :class:`PollingStrategy`; default one if None
+    """
+
+    def __init__(self, fetch, strategy=None):
+        self.fetch = fetch
+        self.strategy = strategy if strategy is not None else PollingStrategy()
+        self.attempts = 0
+        self.started = None
+        self.next_poll = time.monotonic()
+        self.report = None
+
+    @property
+    def done(self):
+        """Whether the report was received."""
+        return self.report is not None
+
+    @property
+    def wait_time(self):
+        """Seconds until the report should be requested again."""
+        return max(0.0, self.next_poll - time.monotonic())
+
+    def poll(self):
+        """Request the report, unless it is too early to do so.
+
+        :return: the report, or None if it is not ready yet
+
+        :raises: the last exception from `fetch` once the polling budget
+            is spent; non-retryable exceptions from `fetch` immediately
+        """
+        if self.report is not None:
+            return self.report
+        now = time.monotonic()
+        if now < self.next_poll:
+            return None
+        if self.started is None:
+            self.started = now
+        self.attempts += 1
+        try:
+            self.report = self.fetch()
+        except celus_pycounter.exceptions.SushiException as exc:
+            if not is_retryable(exc):
+                raise
+            delay = self.strategy.next_delay(self.attempts, now - self.started, exc.retry_after)
+            if delay is None:
+                raise
+            self.next_poll = now + delay
+            return None
+        return self.report
@@ -1,15 +1,18 @@
 """COUNTER journal and book reports and associated functions."""
 
 import collections
+import concurrent.futures
+import contextlib
 import datetime
 import itertools
-import logging
+import json
+import mmap
+import os
 import re
+import sys
 import warnings
 
-import pendulum
-
-from celus_pycounter import csvhelper
+from celus_pycounter import columnar, csvhelper, serialization
 from celus_pycounter.constants import CODES, HEADER_FIELDS, METRICS, REPORT_DESCRIPTIONS, TOTAL_TEXT
 from celus_pycounter.exceptions import (
     PycounterException,
@@ -17,16 +20,24 @@ from celus_pycounter.exceptions import (
     UnknownReportTypeError,
 )
 from celus_pycounter.helpers import (
+    MemoryReader,
+    PrefixedReader,
     convert_covered,
     convert_date_column,
     convert_date_run,
     format_stat,
-    guess_type_from_content,
+    intern_string,
     is_first_last,
     last_day,
     next_month,
+    period_months,
+    read_prefix,
+    sniff_content,
 )
 
+# file types parse() can read
+TABULAR_TYPES = ("tsv", "xlsx", "csv")
+
 
 class CounterReport:
     """
@@ -58,6 +69,10 @@ class CounterReport:
         (applies to report BR2; should probably be None for any other report
         type)
 
+    :ivar usage_matrix: :class:`celus_pycounter.columnar.UsageMatrix`
+        holding usage of the report's resources if the report uses
+        columnar storage (see :py:meth:`to_columnar`), otherwise None
+
     """
 
     # pylint: disable=too-many-instance-attributes
@@ -90,6 +105,7 @@ class CounterReport:
         else:
             self.date_run = date_run
         self.section_type = section_type
+        self.usage_matrix = None
 
     def __repr__(self):
         return "<CounterReport {} version {} for date range {} to {}>".format(
@@ -99,16 +115,59 @@ class CounterReport:
     def __iter__(self):
         return iter(self.pubs)
 
+    @property
+    def month_grid(self):
+        """First days of all months in the report's period, as a tuple."""
+        return period_months(self.period)
+
+    def to_columnar(self, backend=None):
+        """
+        Move usage data of all resources to columnar storage.
+
+        Usage is kept in :attr:`usage_matrix` with a single month axis for
+        the whole report, and each resource reads its usage from a row of
+        the matrix. This takes much less memory for big reports.
+
+        :param backend: storage backend, "numpy" or "array". Defaults to
+            NumPy if it is installed.
+        :return: the report itself
+        """
+        if self.usage_matrix is None:
+            self.usage_matrix = columnar.UsageMatrix(self.month_grid, backend)
+        for pub in self.pubs:
+            self.bind_usage(pub)
+        return self
+
+    def bind_usage(self, resource):
+        """
+        Move usage data of a resource to the report's columnar storage.
+
+        :param resource: a CounterEresource subclass instance
+        """
+        if self.usage_matrix is None:
+            return
+        data = resource._full_data  # pylint: disable=protected-access
+        if isinstance(data, columnar.UsageRow) and data.matrix is self.usage_matrix:
+            return
+        row = self.usage_matrix.add_row(data)
+        resource._full_data = self.usage_matrix.view(row)  # pylint: disable=protected-access
+
     def write_to_file(self, path, format_):
         """
         Output report to a file.
 
         :param path: location to write file
-        :param format_: file format. Currently supports 'tsv'
+        :param format_: file format, one of 'tsv', 'csv', 'xlsx' and 'jsonl'
         :return:
         """
         if format_ == "tsv":
             self.write_tsv(path)
+        elif format_ == "csv":
+            self.write_csv(path)
+        elif format_ == "xlsx":
+            self.write_xlsx(path)
+        elif format_ == "jsonl":
+            self.write_jsonl(path)
         else:
             raise PycounterException("unknown file type %s" % format_)
 
@@ -118,9 +177,54 @@ class CounterReport:
 
         :param path: location to write file
         """
-        lines = self.as_generic()
         with csvhelper.UnicodeWriter(path, delimiter="\t") as writer:
-            writer.writerows(lines)
+            writer.writerows(self.iter_generic())
+
+    def write_csv(self, path):
+        """
+        Output report to a COUNTER 4 CSV file.
+
+        :param path: location to write file
+        """
+        with csvhelper.UnicodeWriter(path) as writer:
+            writer.writerows(self.iter_generic())
+
+    def write_xlsx(self, path):
+        """
+        Output report to a COUNTER 4 XLSX file, with usage as numbers.
+
+        The workbook is written in openpyxl's write-only mode, so rows are
+        not kept in memory.
+
+        :param path: location to write file
+        """
+        from openpyxl import Workbook  # pylint: disable=import-outside-toplevel
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        for line in self.iter_generic(typed=True):
+            worksheet.append(line)
+        workbook.save(path)
+
+    def write_jsonl(self, path):
+        """
+        Output resources of the report to a JSON Lines file.
+
+        Every line is a JSON object mapping column names of the COUNTER
+        table to cells of one resource, with usage as integers. The first
+        column, which is unnamed in book reports, is named "Title" there.
+
+        :param path: location to write file
+        """
+        fields = list(HEADER_FIELDS[self.report_type])
+        fields[0] = fields[0] or "Title"
+        with open(path, "w", encoding="utf-8", buffering=csvhelper.WRITE_BUFFER_SIZE) as out:
+            for pub in self._sorted_pubs():
+                # resources may have other cells than the table header
+                # (COUNTER 5 metrics, months outside the report period)
+                record = zip(pub.generic_columns(fields), pub.as_generic(typed=True), strict=True)
+                out.write(json.dumps(dict(record)))
+                out.write("\n")
 
     def as_generic(self):
         """
@@ -129,7 +233,16 @@ class CounterReport:
         Nested list will contain cells that would appear
         in COUNTER report (suitable for writing as CSV, TSV, etc.)
         """
-        output_lines = []
+        return list(self.iter_generic())
+
+    def iter_generic(self, typed=False):
+        """
+        Generate lines of the report, like :py:meth:`as_generic`.
+
+        Lines of resources are built one at a time as they are consumed.
+
+        :param typed: give usage as ints instead of strings
+        """
         report_type1, report_type2 = self.report_type[:2], self.report_type[2:]
         if report_type2 == "1GOA":
             # JR1GOA is written together in requests, but with a space in output tables
@@ -141,90 +254,124 @@ class CounterReport:
             report_type2,
             self.report_version,
         )
-        output_lines.append([report_name, REPORT_DESCRIPTIONS[self.report_type]])
+        yield [report_name, REPORT_DESCRIPTIONS[self.report_type]]
         if self.report_type == "BR2":
-            output_lines.append([self.customer, "Section Type:"])
-            output_lines.append([self.institutional_identifier, self.section_type])
+            yield [self.customer, "Section Type:"]
+            yield [self.institutional_identifier, self.section_type]
         else:
-            output_lines.append([self.customer])
-            output_lines.append([self.institutional_identifier])
-        output_lines.append(["Period covered by Report:"])
+            yield [self.customer]
+            yield [self.institutional_identifier]
+        yield ["Period covered by Report:"]
         period = "{} to {}".format(
             self.period[0].strftime("%Y-%m-%d"), self.period[1].strftime("%Y-%m-%d")
         )
-        output_lines.append([period])
-        output_lines.append(["Date run:"])
-        output_lines.append([self.date_run.strftime("%Y-%m-%d")])
-        output_lines.append(self._table_header())
-        if self.report_type in ("JR1", "JR1a", "JR1GOA", "BR1", "BR2", "DB2", "JR2", "BR3", "MR1"):
-            output_lines.extend(self._totals_lines())
-        elif self.report_type.startswith("DB"):
+        yield [period]
+        yield ["Date run:"]
+        yield [self.date_run.strftime("%Y-%m-%d")]
+        yield self._table_header()
+        if self._has_totals():
+            yield from self._totals_lines(typed)
+        for pub in self._sorted_pubs():
+            yield pub.as_generic(typed)
+
+    def _has_totals(self):
+        return self.report_type in (
+            "JR1",
+            "JR1a",
+            "JR1GOA",
+            "BR1",
+            "BR2",
+            "DB2",
+            "JR2",
+            "BR3",
+            "MR1",
+        )
+
+    def _sorted_pubs(self):
+        """Get resources in the order they are output in."""
+        if not self._has_totals() and self.report_type.startswith("DB"):
             self._ensure_required_metrics()
             try:
                 self.pubs.sort(key=lambda x: METRICS[self.report_type].index(x.metric))
             except ValueError:  # pragma: nocover
                 pass
+        return sorted(self.pubs, key=lambda x: x.title or "")
 
-        for pub in sorted(self.pubs, key=lambda x: x.title or ""):
-            output_lines.append(pub.as_generic())
+    def _totals_lines(self, typed=False):
+        """Generate Totals for COUNTER report, as list of lists of cells.
 
-        return output_lines
+        Totals of all metrics are computed in a single pass over the
+        report's resources. Usage in months outside the report's period is
+        left out, as the table has no column for it.
 
-    def _totals_lines(self):
-        """Generate Totals for COUNTER report, as list of lists of cells."""
-        total_lines = []
-        metrics = {resource.metric for resource in self.pubs}
+        :param typed: give usage as ints instead of strings
+        """
+        cell = int if typed else str
+        with_html_pdf = self.report_type in ("JR1", "JR1a", "JR1GOA")
+        months = self.month_grid
+        month_index = {month: idx for idx, month in enumerate(months)}
+
+        publishers = set()
+        platforms = set()
+        # metric -> [total usage, HTML usage, PDF usage, usage per month]
+        metric_totals = {}
+        # metric -> rows of resources with usage in self.usage_matrix
+        matrix_rows = collections.defaultdict(list)
+        for pub in self.pubs:
+            publishers.add(pub.publisher)
+            platforms.add(pub.platform)
+            totals = metric_totals.get(pub.metric)
+            if totals is None:
+                totals = metric_totals[pub.metric] = [0, 0, 0, [0] * len(months)]
+            if with_html_pdf:
+                totals[1] += pub.html_total  # pytype: disable=attribute-error
+                totals[2] += pub.pdf_total  # pytype: disable=attribute-error
+            data = pub._full_data  # pylint: disable=protected-access
+            if isinstance(data, columnar.UsageRow) and data.matrix is self.usage_matrix:
+                matrix_rows[pub.metric].append(data.row)
+                continue
+            month_data = totals[3]
+            for month, usage in data:
+                idx = month_index.get(month)
+                if idx is not None:
+                    totals[0] += usage
+                    month_data[idx] += usage
+
+        for metric, rows in matrix_rows.items():
+            totals = metric_totals[metric]
+            for month, usage in zip(self.usage_matrix.months, self.usage_matrix.month_totals(rows)):
+                idx = month_index.get(month)
+                if idx is not None:
+                    totals[0] += usage
+                    totals[3][idx] += usage
+
+        common_cells = [
+            TOTAL_TEXT[self.report_type],
+            publishers.pop() if len(publishers) == 1 else "",
+            platforms.pop() if len(platforms) == 1 else "",
+        ]
+        if self.report_type in ("JR1", "JR1a", "JR1GOA", "BR1", "BR2", "JR2", "BR3"):
+            common_cells.extend([""] * 4)
 
-        for metric in sorted(metrics):
-            total_lines.append(self._totals_line(metric))
+        total_lines = []
+        for metric in sorted(metric_totals):
+            total_usage, html_usage, pdf_usage, month_data = metric_totals[metric]
+            total_cells = list(common_cells)
+            if self.report_type in ("DB2", "JR2", "BR3"):
+                total_cells.append(metric)
+            total_cells.append(cell(total_usage))
+            if with_html_pdf:
+                total_cells.append(cell(html_usage))
+                total_cells.append(cell(pdf_usage))
+            total_cells.extend(cell(d) for d in month_data)
+            total_lines.append(total_cells)
 
         return total_lines
 
-    def _totals_line(self, metric):
-        """Generate Totals for a given metric."""
-        total_cells = [TOTAL_TEXT[self.report_type]]
-        publishers = {resource.publisher for resource in self.pubs}
-        if len(publishers) == 1:
-            total_cells.append(publishers.pop())
-        else:
-            total_cells.append("")
-        platforms = {resource.platform for resource in self.pubs}
-        if len(platforms) == 1:
-            total_cells.append(platforms.pop())
-        else:
-            total_cells.append("")
-        if self.report_type in ("JR1", "JR1a", "JR1GOA", "BR1", "BR2", "JR2", "BR3"):
-            total_cells.extend([""] * 4)
-        if self.report_type in ("DB2", "JR2", "BR3"):
-            total_cells.append(metric)
-        total_usage = 0
-        pdf_usage = 0
-        html_usage = 0
-
-        start_month_first_day = datetime.date(self.period[0].year, self.period[0].month, 1)
-        months = list(pendulum.Interval(start_month_first_day, self.period[1]).range("months"))
-        month_data = [0] * len(months)
-        for pub in self.pubs:
-            if pub.metric != metric:
-                continue
-            if self.report_type in ("JR1", "JR1a", "JR1GOA"):
-                pdf_usage += pub.pdf_total  # pytype: disable=attribute-error
-                html_usage += pub.html_total  # pytype: disable=attribute-error
-            for data in pub:
-                total_usage += data[2]
-                month_data[months.index(data[0])] += data[2]
-        total_cells.append(str(total_usage))
-        if self.report_type in ("JR1", "JR1a", "JR1GOA"):
-            total_cells.append(str(html_usage))
-            total_cells.append(str(pdf_usage))
-        total_cells.extend(str(d) for d in month_data)
-        return total_cells
-
     def _table_header(self):
         """Generate header for COUNTER table for report, as list of cells."""
         header_cells = list(HEADER_FIELDS[self.report_type])
-        start_month_first_day = datetime.date(self.period[0].year, self.period[0].month, 1)
-        for d_obj in pendulum.Interval(start_month_first_day, self.period[1]).range("months"):
+        for d_obj in self.month_grid:
             header_cells.append(d_obj.strftime("%b-%Y"))
         return header_cells
 
@@ -259,6 +406,54 @@ class CounterReport:
                 )
 
 
+class CounterReportStream:
+    """
+    a COUNTER report whose resources are parsed on demand.
+
+    Created by :py:func:`iter_parse`. The report header is parsed when the
+    stream is created and is available as :attr:`report`, a
+    :class:`CounterReport <CounterReport>` with no resources. Iterate over
+    the stream to get the report's rows one at a time.
+
+    Must be closed after use (or used as a context manager) to release
+    the underlying file.
+
+    :param rows: context manager yielding the report's rows as lists of
+        cells
+    """
+
+    def __init__(self, rows):
+        self._exit_stack = contextlib.ExitStack()
+        try:
+            report_reader = self._exit_stack.enter_context(rows)
+            self.report, self._last_col, self._report_reader = _parse_header(report_reader)
+        except BaseException:
+            # let `rows` see the error, see _sniffed_source
+            if not self._exit_stack.__exit__(*sys.exc_info()):
+                raise
+
+    def __repr__(self):
+        return "<CounterReportStream {} version {} for date range {} to {}>".format(
+            self.report.report_type,
+            self.report.report_version,
+            self.report.period[0],
+            self.report.period[1],
+        )
+
+    def __iter__(self):
+        return _iter_resources(self._report_reader, self.report, self._last_col)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the underlying file."""
+        self._exit_stack.close()
+
+
 MonthsUsage = collections.namedtuple("MonthsUsage", "month metric usage")
 
 
@@ -285,6 +480,8 @@ class CounterEresource:
 
     """
 
+    __slots__ = ("period", "metric", "_full_data", "title", "platform", "publisher")
+
     def __init__(
         self,
         period=None,
@@ -311,18 +508,28 @@ class CounterEresource:
             for item in self._full_data:
                 yield MonthsUsage(item[0], self.metric, item[1])
 
+    def generic_columns(self, fields):
+        """Get names of the cells of :py:meth:`as_generic`.
+
+        :param fields: names of the cells before usage of months, from
+            :py:data:`celus_pycounter.constants.HEADER_FIELDS`
+        """
+        self._fill_months()
+        return list(fields) + [month.strftime("%b-%Y") for month, _, _ in self]
+
     def _fill_months(self):
         """Ensure each month in period represented and zero fill if not."""
-        start_month_first_day = datetime.date(self.period[0].year, self.period[0].month, 1)
-        start, end = start_month_first_day, self.period[1]
-        try:
-            for d_obj in pendulum.Interval(start, end).range("months"):
-                if d_obj not in (x[0] for x in self._full_data):
-                    self._full_data.append((d_obj, 0))
-        except IndexError:  # pragma: nocover
-            pass
-        else:
-            self._full_data.sort()
+        if isinstance(self._full_data, columnar.UsageRow):
+            # rows of a usage matrix always hold all months
+            return
+        month_grid = period_months(self.period)
+        if len(self._full_data) == len(month_grid) and all(
+            item[0] == month for item, month in zip(self._full_data, month_grid)
+        ):
+            return
+        present = {item[0] for item in self._full_data}
+        self._full_data.extend((month, 0) for month in month_grid if month not in present)
+        self._full_data.sort()
 
 
 class CounterJournal(CounterEresource):
@@ -355,6 +562,16 @@ class CounterJournal(CounterEresource):
 
     """
 
+    __slots__ = (
+        "html_total",
+        "pdf_total",
+        "doi",
+        "proprietary_id",
+        "isbn",
+        "issn",
+        "eissn",
+    )
+
     def __init__(
         self,
         period=None,
@@ -396,8 +613,24 @@ class CounterJournal(CounterEresource):
             self.platform,
         )
 
-    def as_generic(self):
-        """Get data for this line as list of COUNTER report cells."""
+    def generic_columns(self, fields):
+        """Get names of the cells of :py:meth:`as_generic`.
+
+        :param fields: names of the cells before usage of months, from
+            :py:data:`celus_pycounter.constants.HEADER_FIELDS`
+        """
+        if self.metric.startswith("Access"):
+            totals = ["Access Denied Category", "Reporting Period Total"]
+        else:
+            totals = ["Reporting Period Total", "Reporting Period HTML", "Reporting Period PDF"]
+        return super().generic_columns(list(fields[:7]) + totals)
+
+    def as_generic(self, typed=False):
+        """Get data for this line as list of COUNTER report cells.
+
+        :param typed: give usage as ints instead of strings
+        """
+        cell = int if typed else str
         self._fill_months()  # Ensure fill all months with zero at least
         data_line = [
             self.title,
@@ -412,13 +645,13 @@ class CounterJournal(CounterEresource):
         month_data = []
         for data in self:
             total_usage += data[2]
-            month_data.append(str(data[2]))
+            month_data.append(cell(data[2]))
         if self.metric.startswith("Access"):
             data_line.append(self.metric)
-        data_line.append(str(total_usage))
+        data_line.append(cell(total_usage))
         if not self.metric.startswith("Access"):
-            data_line.append(str(self.html_total))
-            data_line.append(str(self.pdf_total))
+            data_line.append(cell(self.html_total))
+            data_line.append(cell(self.pdf_total))
         data_line.extend(month_data)
         return data_line
 
@@ -442,6 +675,16 @@ class CounterBook(CounterEresource):
 
     """
 
+    __slots__ = (
+        "eissn",
+        "doi",
+        "proprietary_id",
+        "_isbn",
+        "print_isbn",
+        "online_isbn",
+        "issn",
+    )
+
     def __init__(
         self,
         period=None,
@@ -494,8 +737,24 @@ class CounterBook(CounterEresource):
         """
         return self._isbn or self.online_isbn or self.print_isbn or ""
 
-    def as_generic(self):
-        """Get data for this line as list of COUNTER report cells."""
+    def generic_columns(self, fields):
+        """Get names of the cells of :py:meth:`as_generic`.
+
+        :param fields: names of the cells before usage of months, from
+            :py:data:`celus_pycounter.constants.HEADER_FIELDS`
+        """
+        columns = list(fields[:7])
+        if self.metric and self.metric.startswith("Access"):
+            columns.append("Access Denied Category")
+        columns.append("Reporting Period Total")
+        return super().generic_columns(columns)
+
+    def as_generic(self, typed=False):
+        """Get data for this line as list of COUNTER report cells.
+
+        :param typed: give usage as ints instead of strings
+        """
+        cell = int if typed else str
         self._fill_months()  # Ensure fill all months with zero at least
         data_line = [
             self.title,
@@ -510,10 +769,10 @@ class CounterBook(CounterEresource):
         month_data = []
         for data in self:
             total_usage += data[2]
-            month_data.append(str(data[2]))
+            month_data.append(cell(data[2]))
         if self.metric and self.metric.startswith("Access"):
             data_line.append(self.metric)
-        data_line.append(str(total_usage))
+        data_line.append(cell(total_usage))
         data_line.extend(month_data)
         return data_line
 
@@ -521,6 +780,8 @@ class CounterBook(CounterEresource):
 class CounterDatabase(CounterEresource):
     """a COUNTER database report line."""
 
+    __slots__ = ("isbn",)
+
     def __init__(
         self,
         period=None,
@@ -533,8 +794,12 @@ class CounterDatabase(CounterEresource):
         super().__init__(period, metric, month_data, title, platform, publisher)
         self.isbn = None
 
-    def as_generic(self):
-        """Return data for this line as list of COUNTER report cells."""
+    def as_generic(self, typed=False):
+        """Return data for this line as list of COUNTER report cells.
+
+        :param typed: give usage as ints instead of strings
+        """
+        cell = int if typed else str
         self._fill_months()
 
         data_line = [self.title, self.publisher, self.platform, self.metric]
@@ -543,9 +808,9 @@ class CounterDatabase(CounterEresource):
 
         for data in self:
             total_usage += data[2]
-            month_data.append(str(data[2]))
+            month_data.append(cell(data[2]))
 
-        data_line.append(str(total_usage))
+        data_line.append(cell(total_usage))
         data_line.extend(month_data)
 
         return data_line
@@ -554,6 +819,8 @@ class CounterDatabase(CounterEresource):
 class CounterPlatform(CounterEresource):
     """a COUNTER platform report line."""
 
+    __slots__ = ("isbn",)
+
     def __init__(self, period=None, metric=None, month_data=None, platform="", publisher=""):
         super().__init__(
             period=period,
@@ -565,8 +832,12 @@ class CounterPlatform(CounterEresource):
         )
         self.isbn = None
 
-    def as_generic(self):
-        """Return data for this line as list of COUNTER report cells."""
+    def as_generic(self, typed=False):
+        """Return data for this line as list of COUNTER report cells.
+
+        :param typed: give usage as ints instead of strings
+        """
+        cell = int if typed else str
         self._fill_months()
 
         data_line = [self.platform, self.publisher, self.metric]
@@ -575,9 +846,9 @@ class CounterPlatform(CounterEresource):
 
         for data in self:
             total_usage += data[2]
-            month_data.append(str(data[2]))
+            month_data.append(cell(data[2]))
 
-        data_line.append(str(total_usage))
+        data_line.append(cell(total_usage))
         data_line.extend(month_data)
 
         return data_line
@@ -586,6 +857,8 @@ class CounterPlatform(CounterEresource):
 class CounterMultimedia(CounterEresource):
     """a COUNTER multimedia report line."""
 
+    __slots__ = ("collection", "content_provider")
+
     def __init__(
         self,
         period=None,
@@ -606,8 +879,12 @@ class CounterMultimedia(CounterEresource):
         self.collection = collection
         self.content_provider = content_provider
 
-    def as_generic(self):
-        """Return data for this line as list of COUNTER report cells."""
+    def as_generic(self, typed=False):
+        """Return data for this line as list of COUNTER report cells.
+
+        :param typed: give usage as ints instead of strings
+        """
+        cell = int if typed else str
         self._fill_months()
 
         data_line = [self.collection, self.content_provider, self.platform]
@@ -616,20 +893,110 @@ class CounterMultimedia(CounterEresource):
 
         for data in self:
             total_usage += data[2]
-            month_data.append(str(data[2]))
+            month_data.append(cell(data[2]))
 
-        data_line.append(str(total_usage))
+        data_line.append(cell(total_usage))
         data_line.extend(month_data)
 
         return data_line
 
 
-def parse(filename, filetype=None, encoding="utf-8", fallback_encoding="latin-1"):
+# resource attributes holding totals over the report's period
+_TOTAL_FIELDS = ("html_total", "pdf_total")
+
+
+def _date_run_key(date_run):
+    """Get a comparable value of a date, naive (local) or aware datetime."""
+    if not isinstance(date_run, datetime.datetime):
+        date_run = datetime.datetime.combine(date_run, datetime.time())
+    return date_run.astimezone()
+
+
+def merge_reports(reports):
+    """Merge reports of consecutive periods into one report.
+
+    Resources with the same attributes (title, identifiers, metric...)
+    are merged into one resource holding usage of all months; totals such
+    as HTML and PDF requests of journals are added up. The header is taken
+    from the earliest report, with the period covering all reports and
+    the latest date run.
+
+    :param reports: iterable of :class:`CounterReport` of the same type
+    :return: a new :class:`CounterReport`
+    """
+    # pylint: disable=protected-access
+    reports = sorted(reports, key=lambda report: report.period[0])
+    if not reports:
+        raise ValueError("no reports to merge")
+    first = reports[0]
+    for report in reports[1:]:
+        if (report.report_type, report.report_version) != (
+            first.report_type,
+            first.report_version,
+        ):
+            raise ValueError(
+                "cannot merge {} version {} with {} version {}".format(
+                    report.report_type,
+                    report.report_version,
+                    first.report_type,
+                    first.report_version,
+                )
+            )
+
+    merged = CounterReport(
+        report_type=first.report_type,
+        report_version=first.report_version,
+        metric=first.metric,
+        customer=first.customer,
+        institutional_identifier=first.institutional_identifier,
+        period=(first.period[0], max(report.period[1] for report in reports)),
+        date_run=max((report.date_run for report in reports), key=_date_run_key),
+        section_type=first.section_type,
+    )
+    resources = {}
+    for report in reports:
+        for pub in report.pubs:
+            state = serialization.resource_state(pub)
+            totals = {name: state.pop(name) for name in _TOTAL_FIELDS if name in state}
+            key = (type(pub), tuple(sorted(state.items())))
+            target = resources.get(key)
+            if target is None:
+                target = type(pub).__new__(type(pub))
+                for name, value in state.items():
+                    setattr(target, name, value)
+                for name, value in totals.items():
+                    setattr(target, name, value)
+                target.period = merged.period
+                target._full_data = []
+                resources[key] = target
+                merged.pubs.append(target)
+            else:
+                for name, value in totals.items():
+                    setattr(target, name, getattr(target, name) + value)
+            target._full_data.extend(pub._full_data)
+    for pub in merged.pubs:
+        pub._full_data.sort()
+    if first.usage_matrix is not None:
+        merged.to_columnar(first.usage_matrix.backend)
+    return merged
+
+
+def parse(
+    filename,
+    filetype=None,
+    encoding="utf-8",
+    fallback_encoding="latin-1",
+    use_mmap=False,
+    use_columnar=False,
+):
     """Parse a COUNTER file, first attempting to determine type.
 
     Returns a :class:`CounterReport <CounterReport>` object.
 
-    :param filename: path to COUNTER report to load and parse.
+    :param filename: COUNTER report to load and parse. Either a path, the
+        report's content as ``bytes``, ``bytearray`` or ``memoryview``, or
+        a binary file object. File objects that are not seekable are read
+        as a stream, except XLSX files, which are read into memory first.
     :param filetype: type of file provided, one of "csv", "tsv", "xlsx".
         If set to None (the default), an attempt will be made to
         detect the correct type, first from the file extension, then from
@@ -640,55 +1007,243 @@ def parse(filename, filetype=None, encoding="utf-8", fallback_encoding="latin-1"
         the file if the primary encoding fails. This defaults to 'latin-1',
         which will accept any bytes (possibly producing junk results...)
         Ignored for XLSX files.
+    :param use_mmap: memory-map the file instead of reading it through
+        a buffer. Only used when `filename` is a path.
+    :param use_columnar: store usage data in columnar storage (see
+        :py:meth:`CounterReport.to_columnar`)
+
+    """
+    with _sniffed_source(filename, filetype, use_mmap) as (source, filetype):
+        if filetype == "tsv":
+            return parse_separated(
+                source, "\t", encoding, fallback_encoding, use_mmap, use_columnar
+            )
+        if filetype == "xlsx":
+            return parse_xlsx(source, use_mmap, use_columnar)
+        if filetype == "csv":
+            return parse_separated(source, ",", encoding, fallback_encoding, use_mmap, use_columnar)
+    raise PycounterException("Unknown file type %s" % filetype)
+
+
+ParseResult = collections.namedtuple("ParseResult", "filename report error")
+
+
+def parse_many(filenames, workers=None, **kwargs):
+    """Parse many COUNTER files in parallel worker processes.
+
+    Yields a :class:`ParseResult` for each file as soon as it is parsed,
+    so results come in order of completion, not in the order of
+    `filenames`. ``ParseResult.report`` is the parsed
+    :class:`CounterReport <CounterReport>` and ``ParseResult.error`` is
+    None, or ``report`` is None and ``error`` is the exception raised while
+    parsing the file.
+
+    Reports are sent back from the workers in the compact form of
+    :py:mod:`celus_pycounter.serialization`.
+
+    :param filenames: iterable of COUNTER reports to parse (anything
+        accepted by :py:func:`parse`, except file objects)
+    :param workers: number of worker processes. Defaults to the number of
+        CPUs.
+    :param kwargs: passed to :py:func:`parse`
 
     """
-    if filetype is None:
-        if filename.endswith(".tsv"):
-            filetype = "tsv"
-        elif filename.endswith(".xlsx"):
-            filetype = "xlsx"
-        elif filename.endswith(".csv"):
-            filetype = "csv"
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_parse_serialized, filename, kwargs): filename for filename in filenames
+        }
+        for future in concurrent.futures.as_completed(futures):
+            filename = futures[future]
+            try:
+                report = serialization.loads(future.result())
+            except Exception as exc:  # pylint: disable=broad-except
+                yield ParseResult(filename, None, exc)
+            else:
+                yield ParseResult(filename, report, None)
+
+
+def _parse_serialized(filename, kwargs):
+    """Parse a report in a worker process of :py:func:`parse_many`."""
+    return serialization.dumps(parse(filename, **kwargs))
+
+
+def iter_parse(
+    filename, filetype=None, encoding="utf-8", fallback_encoding="latin-1", use_mmap=False
+):
+    """Parse a COUNTER file lazily, one resource at a time.
+
+    Unlike :py:func:`parse`, rows are not collected in a
+    :class:`CounterReport <CounterReport>`; the report header is parsed
+    immediately and resources are yielded as the file is read, so memory
+    use does not grow with the number of rows.
+
+    Returns a :class:`CounterReportStream <CounterReportStream>`, which
+    should be used as a context manager to make sure the file is closed::
+
+        with iter_parse("JR1.csv") as stream:
+            print(stream.report.customer)
+            for journal in stream:
+                pass  # do things with journal
+
+    Parameters are the same as for :py:func:`parse`.
+
+    """
+    return CounterReportStream(
+        _sniffed_rows(filename, filetype, encoding, fallback_encoding, use_mmap)
+    )
+
+
+@contextlib.contextmanager
+def _sniffed_rows(filename, filetype, encoding, fallback_encoding, use_mmap):
+    """Context manager yielding rows of a COUNTER file of possibly unknown type."""
+    with _sniffed_source(filename, filetype, use_mmap) as (source, filetype):
+        with _open_rows(source, filetype, encoding, fallback_encoding, use_mmap) as rows:
+            yield rows
+
+
+@contextlib.contextmanager
+def _sniffed_source(source, filetype=None, use_mmap=False):
+    """Context manager yielding a report source and its type.
+
+    The type is determined first from the file extension, then from the
+    first bytes of the content (see :py:func:`celus_pycounter.helpers.sniff_content`).
+    Sniffed bytes are handed on with the yielded source, so that files and
+    streams are only opened and read once. Streams that are not seekable
+    are read into memory if they turn out to be XLSX.
+
+    Content that looks like XML, JSON or gzip is still parsed as CSV (or
+    TSV), as tables may happen to start like these; if that fails, a
+    :class:`PycounterException` naming the sniffed type is raised.
+    """
+    if filetype is None and _is_path(source):
+        filetype = _filetype_from_extension(os.fspath(source))
+    if filetype is not None:
+        if filetype == "xlsx" and hasattr(source, "read") and not source.seekable():
+            source = source.read()
+        yield source, filetype
+        return
+    with _open_binary(source, use_mmap) as file_obj:
+        if file_obj.seekable():
+            position = file_obj.tell()
+            prefix = read_prefix(file_obj)
+            filetype = sniff_content(prefix)
+            file_obj.seek(position)
         else:
-            with open(filename, "rb") as file_obj:
-                filetype = guess_type_from_content(file_obj)
+            prefix = read_prefix(file_obj)
+            filetype = sniff_content(prefix)
+            file_obj = PrefixedReader(prefix, file_obj)
+            if filetype == "xlsx":
+                file_obj = file_obj.read()
+        if filetype in TABULAR_TYPES:
+            yield file_obj, filetype
+            return
+        sniffed = filetype
+        try:
+            yield file_obj, "tsv" if b"\t" in prefix else "csv"
+        except Exception as exc:  # pylint: disable=broad-except
+            raise PycounterException(
+                "File content looks like %s, not a COUNTER report table" % sniffed.upper()
+            ) from exc
+
 
+def _filetype_from_extension(path):
+    for extension in TABULAR_TYPES:
+        if path.endswith("." + extension):
+            return extension
+    return None
+
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+@contextlib.contextmanager
+def _open_binary(source, use_mmap=False):
+    """Context manager yielding a binary file object for a report source.
+
+    Paths are opened (and closed again), file objects are used as they are
+    and bytes-like objects are read without copying them.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with MemoryReader(source) as reader:
+            yield reader
+    elif hasattr(source, "read"):
+        yield source
+    else:
+        with open(source, "rb") as file_obj:
+            if use_mmap and os.fstat(file_obj.fileno()).st_size:
+                with mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with MemoryReader(mapped) as reader:
+                        yield reader
+            else:
+                yield file_obj
+
+
+def _open_rows(filename, filetype, encoding="utf-8", fallback_encoding="latin-1", use_mmap=False):
+    """Get a context manager yielding rows of a tabular COUNTER file."""
     if filetype == "tsv":
-        return parse_separated(filename, "\t", encoding, fallback_encoding)
+        return _separated_rows(filename, "\t", encoding, fallback_encoding, use_mmap)
     if filetype == "xlsx":
-        return parse_xlsx(filename)
+        return _xlsx_rows(filename, use_mmap)
     if filetype == "csv":
-        return parse_separated(filename, ",", encoding, fallback_encoding)
+        return _separated_rows(filename, ",", encoding, fallback_encoding, use_mmap)
     raise PycounterException("Unknown file type %s" % filetype)
 
 
-def parse_xlsx(filename):
+def parse_xlsx(filename, use_mmap=False, use_columnar=False):
     """Parse a COUNTER file in Excel format.
 
     Invoked automatically by ``parse``.
 
-    :param filename: path to XLSX-format COUNTER report file.
+    :param filename: XLSX-format COUNTER report; a path, bytes-like
+        object or seekable binary file object.
+
+    :param use_mmap: memory-map the file if `filename` is a path.
+
+    :param use_columnar: store usage data in columnar storage
 
     """
-    from openpyxl import load_workbook  # pylint: disable=import-outside-toplevel
+    with _xlsx_rows(filename, use_mmap) as split_row_list:
+        return parse_generic(split_row_list, use_columnar)
 
-    with open(filename, "rb") as xlsx_file:
-        workbook = load_workbook(xlsx_file)
-        worksheet = workbook[workbook.sheetnames[0]]
-        row_it = worksheet.iter_rows()
-        split_row_list = (
-            [cell.value if cell.value is not None else "" for cell in row] for row in row_it
-        )
 
-    return parse_generic(split_row_list)
+@contextlib.contextmanager
+def _xlsx_rows(filename, use_mmap=False):
+    """Context manager yielding rows of the first sheet of an XLSX file.
 
+    The workbook is opened in read-only mode, so rows are read from the
+    sheet's XML as they are consumed instead of loading the whole workbook.
+    """
+    from openpyxl import load_workbook  # pylint: disable=import-outside-toplevel
 
-def parse_separated(filename, delimiter, encoding="utf-8", fallback_encoding="latin-1"):
+    with _open_binary(filename, use_mmap) as xlsx_file:
+        workbook = load_workbook(xlsx_file, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[workbook.sheetnames[0]]
+            if (worksheet.max_row, worksheet.max_column) == (1, 1):
+                # some writers declare a bogus "A1" dimension, which would
+                # truncate every row to its first cell
+                worksheet.reset_dimensions()
+            row_it = worksheet.iter_rows(values_only=True)
+            yield ([value if value is not None else "" for value in row] for row in row_it)
+        finally:
+            workbook.close()
+
+
+def parse_separated(
+    filename,
+    delimiter,
+    encoding="utf-8",
+    fallback_encoding="latin-1",
+    use_mmap=False,
+    use_columnar=False,
+):
     r"""Open COUNTER CSV/TSV report and parse into a CounterReport.
 
     Invoked automatically by :py:func:`parse`.
 
-    :param filename: path to delimited COUNTER report file.
+    :param filename: delimited COUNTER report; a path, bytes-like object
+        or binary file object.
 
     :param delimiter: character (such as ',' or '\\t') used as the
         delimiter for this file
@@ -698,24 +1253,60 @@ def parse_separated(filename, delimiter, encoding="utf-8", fallback_encoding="la
     :param fallback_encoding: alternative encoding to try to decode if
         default fails. Throws a warning if used.
 
+    :param use_mmap: memory-map the file if `filename` is a path.
+
+    :param use_columnar: store usage data in columnar storage
+
     :return: CounterReport object
     """
-    with csvhelper.UnicodeReader(
-        filename,
-        delimiter=delimiter,
-        fallback_encoding=fallback_encoding,
-        encoding=encoding,
+    with _separated_rows(
+        filename, delimiter, encoding, fallback_encoding, use_mmap
     ) as report_reader:
-        return parse_generic(report_reader)
+        return parse_generic(report_reader, use_columnar)
+
+
+@contextlib.contextmanager
+def _separated_rows(filename, delimiter, encoding, fallback_encoding, use_mmap=False):
+    """Context manager yielding rows of a delimited file."""
+    with _open_binary(filename, use_mmap) as file_obj:
+        with csvhelper.UnicodeReader(
+            file_obj,
+            delimiter=delimiter,
+            fallback_encoding=fallback_encoding,
+            encoding=encoding,
+            incremental=True,
+        ) as report_reader:
+            yield report_reader
 
 
-def parse_generic(report_reader):
+def parse_generic(report_reader, use_columnar=False):
     """Parse COUNTER report rows into a CounterReport.
 
     :param report_reader: a iterable object that yields lists COUNTER
         data formatted as tabular lists
+    :param use_columnar: store usage data in columnar storage (see
+        :py:meth:`CounterReport.to_columnar`)
     :return: CounterReport object
 
+    """
+    report, last_col, report_reader = _parse_header(report_reader)
+    if use_columnar:
+        report.to_columnar()
+    for pub in _iter_resources(report_reader, report, last_col):
+        report.bind_usage(pub)
+        report.pubs.append(pub)
+    return report
+
+
+def _parse_header(report_reader):
+    """Parse the header of a COUNTER report and skip its totals lines.
+
+    :param report_reader: a iterable object that yields lists COUNTER
+        data formatted as tabular lists
+    :return: tuple of a CounterReport object with no resources, the last
+        column number containing data and an iterator over the remaining
+        rows (None if the report contains no records)
+
     """
     # pylint: disable=too-many-branches
     report = CounterReport()
@@ -817,14 +1408,26 @@ def parse_generic(report_reader):
             report_reader = itertools.chain([peek], report_reader)
     except StopIteration:
         # No record present in the report
-        return report
+        return report, last_col, None
+
+    return report, last_col, report_reader
+
+
+def _iter_resources(report_reader, report, last_col):
+    """Yield resources parsed from the data rows of a report.
 
+    :param report_reader: iterator over data rows, as returned by
+        :py:func:`_parse_header`
+    :param report: CounterReport the rows came from
+    :param last_col: last column number containing data
+    """
+    if report_reader is None:
+        return
+    parse_line = _RowPlan(report, last_col)
     for line in report_reader:
         if not line:
             continue
-        report.pubs.append(_parse_line(line, report, last_col))
-
-    return report
+        yield parse_line(line)
 
 
 def _get_first_month_idx(report_type: str):
@@ -834,118 +1437,180 @@ def _get_first_month_idx(report_type: str):
         return 5
 
 
-def _parse_line(line, report, last_col):
-    """Parse a single line from a report.
+class _RowPlan:
+    """Layout of the data rows of a report.
+
+    Built once per report, so parsing a row only picks cells out of it
+    instead of working out the layout again. Call the plan with a row
+    (sequence of cells) to get an appropriate CounterResource subclass
+    instance.
 
-    :param line: sequence of cells in a report line
-    :param report: a CounterReport the line came from
+    :param report: a CounterReport (with parsed header) the rows come from
     :param last_col: last column number containing data
-    :return: an appropriate CounterResource subclass instance
     """
-    # pylint: disable=too-many-locals
-    issn = None
-    eissn = None
-    isbn = None
-    html_total = 0
-    pdf_total = 0
-    doi = ""
-    prop_id = ""
-
-    metric = report.metric
-    if (
-        report.report_type.startswith("JR1")
-        or report.report_type == "TR_J1"
-        or report.report_type == "TR_J2"
-    ):
-        old_line = line
-        line = line[0:3] + line[5:7] + line[10:last_col]
-        doi = old_line[3]
-        prop_id = old_line[4]
-        html_total = format_stat(old_line[8])
-        pdf_total = format_stat(old_line[9])
-        issn = line[3].strip()
-        eissn = line[4].strip()
-        if report.report_type.startswith("TR"):
-            metric = old_line[9]
-
-    elif report.report_type in ("BR1", "BR2"):
-        prop_id = line[4]
-        line = line[0:3] + line[5:7] + line[8:last_col]
-        isbn = line[3].strip()
-        issn = line[4].strip()
-
-    elif report.report_type in ("BR3", "JR2"):
-        metric = line[7]
-        doi = line[3]
-        prop_id = line[4]
-        line = line[0:3] + line[5:7] + line[9:last_col]
-        eissn = line[4].strip()
-        if report.report_type == "BR3":
-            isbn = line[3].strip()
+
+    def __init__(self, report, last_col):
+        report_type = report.report_type
+        self.report_type = report_type
+        self.metric = report.metric
+        self.period = report.period
+
+        last_month_col = last_col
+        if report_type.startswith("JR1") or report_type in ("TR_J1", "TR_J2"):
+            first_month_col = 10
+            self._build = self._usage_journal
+        elif report_type in ("BR1", "BR2"):
+            first_month_col = 8
+            self._build = self._usage_book
+        elif report_type in ("BR3", "JR2"):
+            first_month_col = 9
+            self._build = self._turnaway_book if report_type == "BR3" else self._turnaway_journal
         else:
-            issn = line[3].strip()
-    # For DB1 and DB2, nothing additional to do here
-
-    logging.debug(line)
-    common_args = {
-        "title": line[0],
-        "publisher": line[1],
-        "platform": line[2],
-        "period": report.period,
-    }
-    month_data = []
-    curr_month = datetime.date(report.period[0].year, report.period[0].month, 1)
-    months_start_idx = _get_first_month_idx(report.report_type)
-    for data in line[months_start_idx:]:
-        month_data.append((curr_month, format_stat(data)))
-        curr_month = next_month(curr_month)
-    if (
-        report.report_type.startswith("JR")
-        or report.report_type == "TR_J1"
-        or report.report_type == "TR_J2"
-    ):
+            first_month_col = _get_first_month_idx(report_type)
+            last_month_col = None
+            if report_type.startswith("JR"):
+                self._build = self._journal
+            elif report_type.startswith("BR"):
+                self._build = self._book
+            elif report_type.startswith("DB"):
+                self._build = self._database
+            elif report_type == "PR1":
+                self._build = self._platform
+            elif report_type == "MR1":
+                self._build = self._multimedia
+            else:
+                self._build = self._unreachable
+        self._month_cols = slice(first_month_col, last_month_col)
+
+        self._months = []
+        if last_month_col is not None:
+            self._extend_months(last_month_col - first_month_col)
+
+    def __call__(self, line):
+        month_cells = line[self._month_cols]
+        if len(month_cells) > len(self._months):
+            self._extend_months(len(month_cells))
+        month_data = list(zip(self._months, map(format_stat, month_cells)))
+        return self._build(line, month_data)
+
+    def _extend_months(self, count):
+        """Make sure dates are known for the first `count` months."""
+        if self._months:
+            curr_month = next_month(self._months[-1])
+        else:
+            curr_month = datetime.date(self.period[0].year, self.period[0].month, 1)
+        while len(self._months) < count:
+            self._months.append(curr_month)
+            curr_month = next_month(curr_month)
+
+    def _usage_journal(self, line, month_data):
         return CounterJournal(
-            metric=metric,
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=intern_string(line[9]) if self.report_type.startswith("TR") else self.metric,
             month_data=month_data,
-            doi=doi,
-            issn=issn,
-            eissn=eissn,
-            proprietary_id=prop_id,
-            html_total=html_total,
-            pdf_total=pdf_total,
-            **common_args,
+            doi=line[3],
+            issn=line[5].strip(),
+            eissn=line[6].strip(),
+            proprietary_id=line[4],
+            html_total=format_stat(line[8]),
+            pdf_total=format_stat(line[9]),
         )
-    if report.report_type.startswith("BR"):
+
+    def _usage_book(self, line, month_data):
         return CounterBook(
-            metric=metric,
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=self.metric,
+            month_data=month_data,
+            issn=line[6].strip(),
+            isbn=line[5].strip(),
+            proprietary_id=line[4],
+        )
+
+    def _turnaway_book(self, line, month_data):
+        return CounterBook(
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=intern_string(line[7]),
             month_data=month_data,
-            doi=doi,
-            issn=issn,
-            isbn=isbn,
-            proprietary_id=prop_id,
-            **common_args,
+            doi=line[3],
+            isbn=line[5].strip(),
+            proprietary_id=line[4],
         )
-    if report.report_type.startswith("DB"):
-        return CounterDatabase(metric=line[3], month_data=month_data, **common_args)
-    if report.report_type == "PR1":
+
+    def _turnaway_journal(self, line, month_data):
+        return CounterJournal(
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=intern_string(line[7]),
+            month_data=month_data,
+            doi=line[3],
+            issn=line[5].strip(),
+            eissn=line[6].strip(),
+            proprietary_id=line[4],
+        )
+
+    def _journal(self, line, month_data):
+        return CounterJournal(
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=self.metric,
+            month_data=month_data,
+        )
+
+    def _book(self, line, month_data):
+        return CounterBook(
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=self.metric,
+            month_data=month_data,
+        )
+
+    def _database(self, line, month_data):
+        return CounterDatabase(
+            title=line[0],
+            publisher=intern_string(line[1]),
+            platform=intern_string(line[2]),
+            period=self.period,
+            metric=intern_string(line[3]),
+            month_data=month_data,
+        )
+
+    def _platform(self, line, month_data):
         # there is no title in the PR1 report
         return CounterPlatform(
-            metric=line[2],
+            metric=intern_string(line[2]),
             month_data=month_data,
-            platform=line[0],
-            publisher=line[1],
-            period=report.period,
+            platform=intern_string(line[0]),
+            publisher=intern_string(line[1]),
+            period=self.period,
         )
-    elif report.report_type == "MR1":
+
+    def _multimedia(self, line, month_data):
         return CounterMultimedia(
-            metric=metric,
-            period=report.period,
+            metric=self.metric,
+            period=self.period,
             month_data=month_data,
             collection=line[0],
-            content_provider=line[1],
-            platform=line[2],
+            content_provider=intern_string(line[1]),
+            platform=intern_string(line[2]),
         )
-    raise PycounterException("Should be unreachable")  # pragma: no cover
+
+    def _unreachable(self, line, month_data):
+        raise PycounterException("Should be unreachable")  # pragma: no cover
 
 
 def _get_type_and_version(specifier):
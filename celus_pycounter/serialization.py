@@ -0,0 +1,125 @@
+"""Compact serialization of COUNTER reports.
+
+Pickling a :class:`celus_pycounter.report.CounterReport` directly stores
+a full object graph: every resource with its attribute names, its own
+copy of the report period and a list of ``(date, usage)`` tuples. The
+compact form instead keeps the header once, attribute names once per
+resource class, months as indices into a single month axis and usage as
+plain integers, which is much smaller and faster to pickle.
+
+The compact form is still a pickle, so :py:func:`loads` can run arbitrary
+code: only load data from trusted sources.
+"""
+
+import datetime
+import pickle
+
+import celus_pycounter.report
+
+FORMAT_VERSION = 2
+
+
+def report_state(report):
+    """Get attributes of a report, except its resources and usage matrix.
+
+    Besides the header, this includes attributes set by some parsers only,
+    such as `year` of COUNTER 4 reports.
+
+    :param report: a :class:`celus_pycounter.report.CounterReport`
+    :return: dict of attribute names and values
+    """
+    state = dict(vars(report))
+    state.pop("pubs", None)
+    state.pop("usage_matrix", None)
+    return state
+
+
+def resource_state(resource):
+    """Get attributes of a resource, except period and usage.
+
+    :param resource: a :class:`celus_pycounter.report.CounterResource`
+    :return: dict of attribute names and values
+    """
+    state = dict(getattr(resource, "__dict__", {}))
+    for cls in type(resource).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name != "__weakref__" and hasattr(resource, name):
+                state[name] = getattr(resource, name)
+    state.pop("period", None)
+    state.pop("_full_data", None)
+    return state
+
+
+def to_compact(report):
+    """Convert a report to a compact structure of builtin types.
+
+    :param report: a :class:`celus_pycounter.report.CounterReport`
+    :return: tuple suitable for pickling
+    """
+    header = report_state(report)
+    months = {}
+    classes = {}
+    resources = []
+    for pub in report.pubs:
+        state = resource_state(pub)
+        names = tuple(sorted(state))
+        class_key = (type(pub).__name__, names)
+        class_idx = classes.setdefault(class_key, len(classes))
+        usage = []
+        for month, count in pub._full_data:  # pylint: disable=protected-access
+            usage.append(months.setdefault(month, len(months)))
+            usage.append(count)
+        resources.append((class_idx, tuple(state[name] for name in names), usage))
+    backend = report.usage_matrix.backend if report.usage_matrix is not None else None
+    return (
+        FORMAT_VERSION,
+        header,
+        tuple(month.toordinal() for month in months),
+        tuple(classes),
+        resources,
+        backend,
+    )
+
+
+def from_compact(data):
+    """Rebuild a report from the structure returned by :py:func:`to_compact`.
+
+    :param data: tuple returned by :py:func:`to_compact`
+    :return: a :class:`celus_pycounter.report.CounterReport`
+    """
+    version, header, month_ordinals, classes, resources, backend = data
+    if version != FORMAT_VERSION:
+        raise ValueError("unsupported compact report format %s" % version)
+    report = celus_pycounter.report.CounterReport()
+    for name, value in header.items():
+        setattr(report, name, value)
+    months = [datetime.date.fromordinal(ordinal) for ordinal in month_ordinals]
+    resource_classes = [
+        (getattr(celus_pycounter.report, class_name), names) for class_name, names in classes
+    ]
+    for class_idx, values, usage in resources:
+        cls, names = resource_classes[class_idx]
+        pub = cls.__new__(cls)
+        for name, value in zip(names, values):
+            setattr(pub, name, value)
+        pub.period = report.period
+        pub._full_data = [  # pylint: disable=protected-access
+            (months[usage[idx]], usage[idx + 1]) for idx in range(0, len(usage), 2)
+        ]
+        report.pubs.append(pub)
+    if backend is not None:
+        report.to_columnar(backend)
+    return report
+
+
+def dumps(report):
+    """Serialize a report to bytes in compact form."""
+    return pickle.dumps(to_compact(report), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    """Load a report serialized with :py:func:`dumps`.
+
+    The data is unpickled, so it must come from a trusted source.
+    """
+    return from_compact(pickle.loads(data))
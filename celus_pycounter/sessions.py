@@ -0,0 +1,98 @@
+"""Pooled HTTP sessions for SUSHI requests.
+
+Requests made through the same :class:`requests.Session` reuse open
+connections (and TLS sessions) to a host, instead of setting up a new
+connection for every report.
+
+The default session is shared by all SUSHI servers and all threads of the
+process, so it keeps no cookies: a cookie set by one provider would
+otherwise be sent along with requests to every other one.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+
+import celus_pycounter.exceptions
+from celus_pycounter.polling import parse_retry_after
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+# HTTP statuses of servers (or gateways in front of them) which are down
+UNAVAILABLE_STATUSES = frozenset({502, 503, 504})
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+class DiscardingCookieJar(RequestsCookieJar):
+    """Cookie jar which drops all cookies set in it.
+
+    Cookies passed with a single request (or set while following its
+    redirects) are still sent, as requests keeps them in a jar of their own.
+    """
+
+    def set_cookie(self, cookie, *args, **kwargs):
+        return None
+
+
+def make_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """Create a session with connection pools of the given size.
+
+    :param pool_connections: number of hosts to keep connection pools for
+
+    :param pool_maxsize: maximum number of connections kept open per host
+
+    :return: a :class:`requests.Session`
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def default_session():
+    """Get the session shared by module-level SUSHI functions.
+
+    The session is created on first use. It is shared by all threads, which
+    only works because it is never changed after being created: connection
+    pools of requests are thread-safe, and the session keeps no cookies (see
+    :class:`DiscardingCookieJar`). Do not set headers, auth or cookies on it;
+    pass a session of your own to SUSHI functions instead.
+    """
+    global _default_session  # pylint: disable=global-statement
+    if _default_session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                session = make_session()
+                session.cookies = DiscardingCookieJar()
+                _default_session = session
+    return _default_session
+
+
+def raise_for_status(response):
+    """Raise an exception if a SUSHI server refused a request as overloaded.
+
+    Other error statuses are left to the caller, as SUSHI errors come with
+    them in the body of the response.
+
+    :param response: HTTP response, from requests or httpx
+
+    :raises: :class:`celus_pycounter.exceptions.TooManyRequestsError` for
+        HTTP 429, :class:`celus_pycounter.exceptions.ServiceNotAvailableError`
+        for HTTP 502, 503 and 504; the delay requested with Retry-After is
+        in their `retry_after`
+    """
+    if response.status_code == 429:
+        exc_class = celus_pycounter.exceptions.TooManyRequestsError
+    elif response.status_code in UNAVAILABLE_STATUSES:
+        exc_class = celus_pycounter.exceptions.ServiceNotAvailableError
+    else:
+        return
+    exc = exc_class(f"HTTP {response.status_code} from {response.url}", raw=response.content)
+    exc.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    raise exc
@@ -1,25 +1,31 @@
 """NISO SUSHI support."""
 
 import collections
+import concurrent.futures
 import datetime
+import inspect
+import io
+import json
 import logging
 import time
 import uuid
 import warnings
 
 import pendulum
-import requests
 from lxml import etree, objectify
 
 import celus_pycounter.constants
 import celus_pycounter.exceptions
 import celus_pycounter.report
-from celus_pycounter import sushi5
-from celus_pycounter.helpers import convert_date_run
+from celus_pycounter import diagnostics, polling, sessions, sushi5, throttle
+from celus_pycounter.helpers import convert_date_run, intern_string, month_windows
 
 logger = logging.getLogger(__name__)
 NS = celus_pycounter.constants.NS
 
+# windows of a report requested at once by get_report(..., chunk_months=...)
+CHUNK_WORKERS = 4
+
 
 def get_sushi_stats_raw(
     wsdl_url,
@@ -35,6 +41,7 @@ def get_sushi_stats_raw(
     sushi_dump=False,
     dump_file=None,
     verify=True,
+    session=None,
     **extra_params,
 ):
     """Get SUSHI stats for a given site in raw XML format.
@@ -66,10 +73,97 @@ def get_sushi_stats_raw(
 
     :param verify: bool: whether to verify SSL certificates
 
+    :param session: :class:`requests.Session` to make the request with;
+        defaults to a pooled session shared by all requests
+
     :param extra_params: extra params are passed to requests.post
 
     """
-    # pylint: disable=too-many-locals
+    # pylint: disable=too-many-arguments
+    return _get_sushi_stats_response(
+        wsdl_url,
+        start_date,
+        end_date,
+        requestor_id,
+        requestor_email,
+        requestor_name,
+        customer_reference,
+        customer_name,
+        report,
+        release,
+        sushi_dump,
+        dump_file,
+        verify,
+        session,
+        **extra_params,
+    ).content
+
+
+def _get_sushi_stats_response(
+    wsdl_url,
+    start_date,
+    end_date,
+    requestor_id=None,
+    requestor_email=None,
+    requestor_name=None,
+    customer_reference=None,
+    customer_name=None,
+    report="JR1",
+    release=4,
+    sushi_dump=False,
+    dump_file=None,
+    verify=True,
+    session=None,
+    **extra_params,
+):
+    """Request a report like :py:func:`get_sushi_stats_raw`, returning the HTTP response."""
+    # pylint: disable=too-many-arguments
+    payload, headers = _report_request(
+        start_date,
+        end_date,
+        requestor_id,
+        requestor_email,
+        requestor_name,
+        customer_reference,
+        customer_name,
+        report,
+        release,
+    )
+    if session is None:
+        session = sessions.default_session()
+    with throttle.guard(wsdl_url) as guard:
+        response = session.post(
+            url=wsdl_url, headers=headers, data=payload, verify=verify, **extra_params
+        )
+        guard.check(response)
+        sessions.raise_for_status(response)
+
+    if dump_file:
+        dump_file.write(response.content)
+
+    if sushi_dump:
+        diagnostics.dump(
+            logger, "SUSHI DUMP: request: %s \n\n response: %s", payload, response.content
+        )
+    return response
+
+
+def _report_request(
+    start_date,
+    end_date,
+    requestor_id,
+    requestor_email,
+    requestor_name,
+    customer_reference,
+    customer_name,
+    report,
+    release,
+):
+    """Build a SUSHI report request.
+
+    :return: tuple of request body and HTTP headers
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
     root = etree.Element("{%(SOAP-ENV)s}Envelope" % NS, nsmap=NS)
     body = etree.SubElement(root, "{%(SOAP-ENV)s}Body" % NS)
     timestamp = pendulum.now("UTC").isoformat()
@@ -115,24 +209,15 @@ def get_sushi_stats_raw(
         "Content-Length": str(len(payload)),
     }
 
-    response = requests.post(
-        url=wsdl_url, headers=headers, data=payload, verify=verify, **extra_params
-    )
+    return payload, headers
 
-    if dump_file:
-        dump_file.write(response.content)
 
-    if sushi_dump:
-        logger.debug("SUSHI DUMP: request: %s \n\n response: %s", payload, response.content)
-    return response.content
-
-
-def get_status(url: str, release: int) -> str:
+def get_status(url: str, release: int, session=None) -> str:
     """Request SUSHI server status."""
     if release != 5:
         raise NotImplementedError(f"Status for COUNTER {release} is not implemented.")
 
-    return sushi5.get_status(url)
+    return sushi5.get_status(url, session=session)
 
 
 def get_report(*args, **kwargs):
@@ -140,33 +225,175 @@ def get_report(*args, **kwargs):
 
     returns a :class:`celus_pycounter.report.CounterReport` object.
 
+    Reports which are not ready yet are requested again, as decided by
+    the polling strategy.
+
     parameters: see get_sushi_stats_raw
 
-    :param no_delay: don't delay in retrying Report Queued
+    :param no_delay: don't delay in retrying Report Queued, even if the
+        server asks for a delay with Retry-After
+
+    :param polling: a :class:`celus_pycounter.polling.PollingStrategy`;
+        overrides `no_delay`
+
+    :param chunk_months: if set, split the date range into windows of this
+        many months, request them concurrently and merge them into one
+        report (see :py:func:`celus_pycounter.report.merge_reports`)
+
+    :param chunk_workers: maximum number of windows requested at once
+
+    :param cache: a :class:`celus_pycounter.cache.ResponseCache` to look
+        the response up in before requesting it; responses for complete
+        past months are stored in it
+    """
+    chunk_months = kwargs.pop("chunk_months", None)
+    chunk_workers = kwargs.pop("chunk_workers", CHUNK_WORKERS)
+    if chunk_months:
+        return _get_report_chunked(args, kwargs, chunk_months, chunk_workers)
+    pending = start_report(*args, **kwargs)
+    while True:
+        report = pending.poll()
+        if report is not None:
+            return report
+        wait_time = pending.wait_time
+        logger.info("Service busy, retrying in %d seconds", wait_time)
+        if wait_time:
+            time.sleep(wait_time)
+
+
+def _get_report_chunked(args, kwargs, chunk_months, chunk_workers):
+    """Get a report in windows of `chunk_months` months and merge them."""
+    windows = _report_windows(args, kwargs, chunk_months)
+    if len(windows) == 1:
+        return get_report(*args, **kwargs)
+
+    def get_window(window):
+        window_args, window_kwargs = _window_arguments(args, kwargs, window)
+        return get_report(*window_args, **window_kwargs)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=chunk_workers) as executor:
+        reports = list(executor.map(get_window, windows))
+    return celus_pycounter.report.merge_reports(reports)
+
+
+def _report_windows(args, kwargs, chunk_months):
+    """Split the date range of report request parameters into windows."""
+    # start_date and end_date are the second and third parameter of
+    # get_sushi_stats_raw in both COUNTER 4 and 5
+    start_date = args[1] if len(args) > 1 else kwargs["start_date"]
+    end_date = args[2] if len(args) > 2 else kwargs["end_date"]
+    return month_windows(start_date, end_date, chunk_months)
+
+
+def _window_arguments(args, kwargs, window):
+    """Get copies of report request parameters with the dates of a window."""
+    window_args = list(args)
+    window_kwargs = dict(kwargs)
+    for idx, (name, value) in enumerate(zip(("start_date", "end_date"), window), 1):
+        if len(window_args) > idx:
+            window_args[idx] = value
+        else:
+            window_kwargs[name] = value
+    return window_args, window_kwargs
+
+
+def start_report(*args, **kwargs):
+    """Start getting a usage report from a SUSHI server without blocking.
+
+    Takes the same parameters as :py:func:`get_report`.
+
+    :return: a :class:`celus_pycounter.polling.PendingReport`; the report
+        is requested on its first :py:meth:`poll()
+        <celus_pycounter.polling.PendingReport.poll>`
     """
     if kwargs.get("release") == 5:
         gssr = sushi5.get_sushi_stats_raw
         rtf = sushi5.raw_to_full
 
     else:
-        gssr = get_sushi_stats_raw
-        rtf = raw_to_full
-        if "api_key" in kwargs:
-            if kwargs["api_key"] is not None:
-                warnings.warn(
-                    celus_pycounter.exceptions.SushiWarning("api_key only supported in COUNTER 5")
-                )
-            kwargs.pop("api_key", None)
+        # the response is kept for its headers, see _sushi4_response_to_full
+        gssr = _get_sushi_stats_response
+        rtf = _sushi4_response_to_full
+        _drop_api_key(kwargs)
+
+    strategy = _polling_strategy(kwargs)
+    cache = kwargs.pop("cache", None)
+
+    def fetch():
+        # errors found while parsing the response count as failed requests
+        with throttle.deferred():
+            if cache is None:
+                return rtf(gssr(*args, **kwargs))
+            return _fetch_cached(cache, gssr, rtf, args, kwargs)
+
+    return polling.PendingReport(fetch, strategy)
+
+
+def _fetch_cached(cache, gssr, rtf, args, kwargs):
+    """Get a report from a response cache, or request it and cache the response."""
+    arguments = _bind_arguments(gssr, args, kwargs)
+    release = arguments["release"]
+    key = _cache_key(cache, arguments)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug("Using cached response for %s", key)
+        return rtf(json.loads(cached) if release == 5 else cached)
+
+    raw_report = gssr(*args, **kwargs)
+    # only successful responses get this far
+    report = rtf(raw_report)
+    # streamed responses are consumed by parsing and cannot be stored
+    if cache.is_cacheable(arguments["end_date"]) and not hasattr(raw_report, "read"):
+        cache.set(
+            key, json.dumps(raw_report).encode("utf-8") if release == 5 else raw_report.content
+        )
+    return report
+
+
+def _bind_arguments(gssr, args, kwargs):
+    """Get all parameters, with defaults, of a call to a raw report function."""
+    arguments = inspect.signature(gssr).bind(*args, **kwargs)
+    arguments.apply_defaults()
+    return arguments.arguments
+
+
+def _cache_key(cache, arguments):
+    """Get the response cache key for bound raw report parameters."""
+    return cache.key(
+        arguments.get("url") or arguments["wsdl_url"],
+        arguments["report"],
+        arguments["release"],
+        arguments["customer_reference"],
+        arguments["requestor_id"],
+        arguments["start_date"],
+        arguments["end_date"],
+    )
+
 
+def _sushi4_response_to_full(response):
+    """Convert a COUNTER 4 response, or its cached content, to CounterReport."""
+    if isinstance(response, bytes):
+        return raw_to_full(response)
+    return raw_to_full(response.content, headers=response.headers)
+
+
+def _polling_strategy(kwargs):
+    """Remove polling parameters from request parameters and get the strategy."""
     no_delay = kwargs.pop("no_delay", False)
-    delay_amount = 0 if no_delay else 60
-    while True:
-        try:
-            raw_report = gssr(*args, **kwargs)
-            return rtf(raw_report)
-        except celus_pycounter.exceptions.ServiceBusyError:
-            logger.info("Service busy, retrying in %d seconds", delay_amount)
-            time.sleep(delay_amount)
+    strategy = kwargs.pop("polling", None)
+    if strategy is None and no_delay:
+        strategy = polling.NO_DELAY
+    return strategy
+
+
+def _drop_api_key(kwargs):
+    """Remove api_key, only used by COUNTER 5, from request parameters."""
+    if "api_key" in kwargs:
+        if kwargs["api_key"] is not None:
+            warnings.warn(
+                celus_pycounter.exceptions.SushiWarning("api_key only supported in COUNTER 5")
+            )
+        kwargs.pop("api_key", None)
 
 
 def ns(namespace, name):
@@ -178,68 +405,186 @@ def ns(namespace, name):
     return "{" + NS[namespace] + "}" + name
 
 
-def raw_to_full(raw_report):
+def raw_to_full(raw_report, headers=None):
     """Convert a raw report to CounterReport.
 
+    The XML is parsed in a single pass; report items are converted to
+    resources as soon as they are parsed and then dropped from the tree.
+
     :param raw_report: raw XML report
+    :param headers: HTTP headers of the response, for the delay requested
+        with Retry-After when the service is busy
     :return: a :class:`celus_pycounter.report.CounterReport`
     """
-    # pylint: disable=too-many-statements,too-many-branches,too-many-locals
+    retry_after = polling.parse_retry_after((headers or {}).get("Retry-After"))
+    raw_bytes = raw_report.encode("utf-8") if isinstance(raw_report, str) else raw_report
+    header = {}
+    report = None
+    path = []
+    c_report = None
+    customer = None
     try:
-        root = etree.fromstring(raw_report)
+        context = etree.iterparse(io.BytesIO(raw_bytes), events=("start", "end"))
+        for event, elem in context:
+            if event == "start":
+                path.append(elem.tag)
+                if c_report is None and _is_report_path(path):
+                    c_report = elem
+                elif customer is None and elem.tag == _CUSTOMER and elem.getparent() is c_report:
+                    customer = elem
+                _read_header_start(header, elem)
+                continue
+            path.pop()
+            _read_header_end(header, elem)
+            if elem.tag == _REPORT_ITEMS and customer is not None and elem.getparent() is customer:
+                if report is None:
+                    report = _report_from_header(header)
+                _add_report_item(report, elem)
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del customer[0]
     except etree.XMLSyntaxError:
-        logger.error("XML syntax error: %s", raw_report)
+        logger.error("XML syntax error: %s", diagnostics.Payload(raw_report))
         raise celus_pycounter.exceptions.SushiException(message="XML syntax error", raw=raw_report)
-    o_root = objectify.fromstring(raw_report)
-    rep = None
+
+    if c_report is None:
+        if b"Report Queued" in raw_bytes:
+            exc = celus_pycounter.exceptions.ServiceBusyError("Report Queued")
+            exc.retry_after = retry_after
+            raise exc
+        # callers navigate the tree by attribute access, as objectify allows
+        xml = objectify.fromstring(raw_bytes)
+        busy_exc = _busy_exception(xml, raw_report)
+        if busy_exc is not None:
+            busy_exc.retry_after = retry_after
+            raise busy_exc
+        logger.error("report not found in XML: %s", diagnostics.Payload(raw_report))
+        raise celus_pycounter.exceptions.SushiException(
+            message="report not found in XML", raw=raw_report, xml=xml
+        )
+    # report items were dropped while parsing, so the report element is
+    # parsed again, but only if the dump is actually logged
+    diagnostics.dump(logger, "COUNTER report: %s", lambda: _find_report(raw_bytes))
+    if report is None:
+        # no report items
+        report = _report_from_header(header)
+    return report
+
+
+_BEGIN = ns("sushi", "Begin")
+_END = ns("sushi", "End")
+_REPORT_DEFINITION = ns("sushi", "ReportDefinition")
+_REPORT = ns("counter", "Report")
+_REPORTS = ns("counter", "Reports")
+_CUSTOMER = ns("counter", "Customer")
+_NAME = ns("counter", "Name")
+_ID = ns("counter", "ID")
+_REPORT_ITEMS = ns("counter", "ReportItems")
+
+
+def _is_report_path(path):
+    """Check if tags from the root to an element lead to the COUNTER report.
+
+    The report is either ``Body/ReportResponse/Report/Report`` or
+    ``Body/ReportResponse/Report/Reports/Report``.
+    """
+    if len(path) not in (5, 6) or path[-1] != _REPORT:
+        return False
+    envelope_ns = path[0][: path[0].index("}") + 1] if path[0].startswith("{") else ""
+    if path[1:4] != [
+        envelope_ns + "Body",
+        ns("sushicounter", "ReportResponse"),
+        ns("sushicounter", "Report"),
+    ]:
+        return False
+    return len(path) == 5 or path[4] == _REPORTS
+
+
+_BUSY_EXCEPTIONS = {
+    1000: celus_pycounter.exceptions.ServiceNotAvailableError,
+    1010: celus_pycounter.exceptions.ServiceBusyError,
+    1020: celus_pycounter.exceptions.TooManyRequestsError,
+}
+
+
+def _busy_exception(xml, raw_report):
+    """Get exception for a SUSHI exception telling that the service is overloaded, or None.
+
+    The exception number is kept in `code` of the exception, like in
+    :class:`celus_pycounter.exceptions.Sushi5Error`.
+    """
+    sushi_exc = xml.find(".//" + ns("sushi", "Exception"))
+    if sushi_exc is None:
+        return None
     try:
-        rep = o_root.Body[ns("sushicounter", "ReportResponse")]
-        c_report = rep.Report[ns("counter", "Report")]
-    except AttributeError:
-        try:
-            c_report = rep.Report[ns("counter", "Reports")].Report
-        except AttributeError:
-            if b"Report Queued" in raw_report:
-                raise celus_pycounter.exceptions.ServiceBusyError("Report Queued")
-            logger.error("report not found in XML: %s", raw_report)
-            raise celus_pycounter.exceptions.SushiException(
-                message="report not found in XML", raw=raw_report, xml=o_root
-            )
-    logger.debug("COUNTER report: %s", etree.tostring(c_report))
-    start_date = datetime.datetime.strptime(
-        root.find(".//%s" % ns("sushi", "Begin")).text, "%Y-%m-%d"
-    ).date()
+        code = int(sushi_exc.findtext(ns("sushi", "Number")))
+    except (TypeError, ValueError):
+        return None
+    if code not in _BUSY_EXCEPTIONS:
+        return None
+    message = sushi_exc.findtext(ns("sushi", "Message")) or "Service busy"
+    exc = _BUSY_EXCEPTIONS[code](message=message, raw=raw_report, xml=xml)
+    exc.code = code
+    return exc
+
+
+def _find_report(raw_bytes):
+    """Get the COUNTER report element of a raw report, or None."""
+    root = etree.fromstring(raw_bytes)
+    envelope_ns = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    response = root.find(
+        "{}Body/{}/{}".format(
+            envelope_ns, ns("sushicounter", "ReportResponse"), ns("sushicounter", "Report")
+        )
+    )
+    if response is None:
+        return None
+    report = response.find(_REPORT)
+    if report is None:
+        report = response.find("{}/{}".format(_REPORTS, _REPORT))
+    return report
+
+
+def _read_header_start(header, elem):
+    """Collect report header data from attributes of an element."""
+    if elem.tag == _REPORT_DEFINITION:
+        header.setdefault("definition", elem)
+    elif elem.tag == _REPORT:
+        header.setdefault("created", elem.get("Created"))
+    elif elem.tag == _CUSTOMER:
+        header.setdefault("customer", elem)
+
+
+def _read_header_end(header, elem):
+    """Collect report header data from text of an element."""
+    if elem.tag in (_BEGIN, _END):
+        header.setdefault(elem.tag, elem.text)
+    elif elem.tag in (_NAME, _ID) and "customer" in header:
+        customer = header["customer"]
+        if elem.tag not in header and any(parent is customer for parent in elem.iterancestors()):
+            header[elem.tag] = elem.text
 
-    end_date = datetime.datetime.strptime(
-        root.find(".//%s" % ns("sushi", "End")).text, "%Y-%m-%d"
-    ).date()
+
+def _report_from_header(header):
+    """Create a report without resources from data collected from XML."""
+    start_date = datetime.datetime.strptime(header[_BEGIN], "%Y-%m-%d").date()
+    end_date = datetime.datetime.strptime(header[_END], "%Y-%m-%d").date()
 
     report_data = {"period": (start_date, end_date)}
 
-    rep_def = root.find(".//%s" % ns("sushi", "ReportDefinition"))
+    rep_def = header["definition"]
     report_data["report_version"] = int(rep_def.get("Release"))
 
     report_data["report_type"] = rep_def.get("Name")
 
-    customer = root.find(".//%s" % ns("counter", "Customer"))
-    try:
-        report_data["customer"] = customer.find(".//%s" % ns("counter", "Name")).text
-    except AttributeError:
-        report_data["customer"] = ""
-
-    try:
-        inst_id = customer.find(".//%s" % ns("counter", "ID")).text
-    except AttributeError:
-        inst_id = ""
-    report_data["institutional_identifier"] = inst_id
-
-    rep_root = root.find(".//%s" % ns("counter", "Report"))
+    report_data["customer"] = header.get(_NAME) or ""
+    report_data["institutional_identifier"] = header.get(_ID) or ""
 
     # Set date run based on current time
     # and override it if `Created` attribute is
     # extracted from xml and properly parsed
     report_data["date_run"] = datetime.datetime.now()
-    created_string = rep_root.get("Created")
+    created_string = header.get("created")
     if created_string is not None:
         try:
             report_data["date_run"] = pendulum.parse(created_string)
@@ -249,188 +594,195 @@ def raw_to_full(raw_report):
     report = celus_pycounter.report.CounterReport(**report_data)
 
     report.metric = celus_pycounter.constants.METRICS.get(report_data["report_type"])
+    return report
 
-    # Missing some mandatory field to extract data ->
-    # exit right away
-    if (
-        not c_report
-        or not hasattr(c_report, "Customer")
-        or not hasattr(c_report.Customer, "ReportItems")
-    ):
-        return report
 
-    for item in c_report.Customer.ReportItems:
-        try:
-            publisher_name = item.ItemPublisher.text
-        except AttributeError:
-            publisher_name = ""
-        title = item.ItemName.text
-        platform = item.ItemPlatform.text
-
-        eissn = issn = ""
-        print_isbn = None
-        online_isbn = None
-        doi = ""
-        prop_id = ""
+def _child_text(elem, name):
+    """Get text of the first child of an element in the COUNTER namespace.
 
-        try:
-            for identifier in item.ItemIdentifier:
-                if identifier.Type == "Print_ISSN":
-                    issn = identifier.Value.text
-                    if issn is None:
-                        issn = ""
-                elif identifier.Type == "Online_ISSN":
-                    eissn = identifier.Value.text
-                    if eissn is None:
-                        eissn = ""
-                elif identifier.Type == "Online_ISBN":
-                    online_isbn = identifier.Value.text
-                elif identifier.Type == "Print_ISBN":
-                    print_isbn = identifier.Value.text
-                elif identifier.Type == "DOI":
-                    doi = identifier.Value.text
-                elif identifier.Type == "Proprietary":
-                    prop_id = identifier.Value.text
-
-        except AttributeError:
-            pass
+    :raises AttributeError: if there is no such child
+    """
+    child = elem.find(ns("counter", name))
+    if child is None:
+        raise AttributeError(name)
+    return child.text
+
+
+def _add_report_item(report, item):
+    """Convert a ReportItems element to resources and add them to a report."""
+    # pylint: disable=too-many-statements,too-many-branches,too-many-locals
+    try:
+        publisher_name = intern_string(_child_text(item, "ItemPublisher"))
+    except AttributeError:
+        publisher_name = ""
+    title = _child_text(item, "ItemName")
+    platform = intern_string(_child_text(item, "ItemPlatform"))
+
+    eissn = issn = ""
+    print_isbn = None
+    online_isbn = None
+    doi = ""
+    prop_id = ""
+
+    try:
+        for identifier in item.iterchildren(ns("counter", "ItemIdentifier")):
+            id_type = _child_text(identifier, "Type")
+            if id_type == "Print_ISSN":
+                issn = _child_text(identifier, "Value")
+                if issn is None:
+                    issn = ""
+            elif id_type == "Online_ISSN":
+                eissn = _child_text(identifier, "Value")
+                if eissn is None:
+                    eissn = ""
+            elif id_type == "Online_ISBN":
+                online_isbn = _child_text(identifier, "Value")
+            elif id_type == "Print_ISBN":
+                print_isbn = _child_text(identifier, "Value")
+            elif id_type == "DOI":
+                doi = _child_text(identifier, "Value")
+            elif id_type == "Proprietary":
+                prop_id = _child_text(identifier, "Value")
 
-        month_data = []
-        html_usage = 0
-        pdf_usage = 0
-
-        metrics_for_db = collections.OrderedDict()
-
-        for perform_item in item.ItemPerformance:
-            item_date = convert_date_run(perform_item.Period.Begin.text)
-            logger.debug("perform_item date: %r", item_date)
-            usage = None
-            if hasattr(perform_item, "Instance"):
-                for inst in perform_item.Instance:
-                    if inst.MetricType == "ft_total":
-                        usage = str(inst.Count)
-                    elif inst.MetricType == "ft_pdf":
-                        pdf_usage += int(inst.Count)
-                    elif inst.MetricType == "ft_html":
-                        html_usage += int(inst.Count)
-                    elif inst.MetricType == "multimedia":
-                        usage = int(inst.Count)
-                    elif report.report_type.startswith("DB") or report.report_type in (
-                        "PR1",
-                        "JR2",
-                        "BR3",
-                    ):
-                        metrics_for_db.setdefault(inst.MetricType, []).append(
-                            (item_date, int(inst.Count))
-                        )
-            if usage is not None:
-                month_data.append((item_date, int(usage)))
-
-        if report.report_type:
-            if report.report_type in ["JR1", "JR1a", "JR1GOA"]:
+    except AttributeError:
+        pass
+
+    month_data = []
+    html_usage = 0
+    pdf_usage = 0
+
+    metrics_for_db = collections.OrderedDict()
+
+    for perform_item in item.iterchildren(ns("counter", "ItemPerformance")):
+        item_date = convert_date_run(
+            _child_text(perform_item.find(ns("counter", "Period")), "Begin")
+        )
+        logger.debug("perform_item date: %r", item_date)
+        usage = None
+        for inst in perform_item.iterchildren(ns("counter", "Instance")):
+            metric_type = _child_text(inst, "MetricType")
+            if metric_type == "ft_total":
+                usage = _child_text(inst, "Count")
+            elif metric_type == "ft_pdf":
+                pdf_usage += int(_child_text(inst, "Count"))
+            elif metric_type == "ft_html":
+                html_usage += int(_child_text(inst, "Count"))
+            elif metric_type == "multimedia":
+                usage = int(_child_text(inst, "Count"))
+            elif report.report_type.startswith("DB") or report.report_type in (
+                "PR1",
+                "JR2",
+                "BR3",
+            ):
+                metrics_for_db.setdefault(metric_type, []).append(
+                    (item_date, int(_child_text(inst, "Count")))
+                )
+        if usage is not None:
+            month_data.append((item_date, int(usage)))
+
+    if report.report_type:
+        if report.report_type in ["JR1", "JR1a", "JR1GOA"]:
+            report.pubs.append(
+                celus_pycounter.report.CounterJournal(
+                    title=title,
+                    platform=platform,
+                    publisher=publisher_name,
+                    period=report.period,
+                    metric=report.metric,
+                    issn=issn,
+                    eissn=eissn,
+                    doi=doi,
+                    proprietary_id=prop_id,
+                    month_data=month_data,
+                    html_total=html_usage,
+                    pdf_total=pdf_usage,
+                )
+            )
+        elif report.report_type == "BR3":
+            for metric_code, month_data in metrics_for_db.items():
+                metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
                 report.pubs.append(
-                    celus_pycounter.report.CounterJournal(
+                    celus_pycounter.report.CounterBook(
                         title=title,
                         platform=platform,
                         publisher=publisher_name,
                         period=report.period,
-                        metric=report.metric,
+                        metric=metric,
                         issn=issn,
-                        eissn=eissn,
+                        print_isbn=print_isbn,
+                        online_isbn=online_isbn,
                         doi=doi,
                         proprietary_id=prop_id,
                         month_data=month_data,
-                        html_total=html_usage,
-                        pdf_total=pdf_usage,
                     )
                 )
-            elif report.report_type == "BR3":
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        celus_pycounter.report.CounterBook(
-                            title=title,
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            issn=issn,
-                            print_isbn=print_isbn,
-                            online_isbn=online_isbn,
-                            doi=doi,
-                            proprietary_id=prop_id,
-                            month_data=month_data,
-                        )
-                    )
-            elif report.report_type.startswith("BR"):
-                # BR1, BR2
+        elif report.report_type.startswith("BR"):
+            # BR1, BR2
+            report.pubs.append(
+                celus_pycounter.report.CounterBook(
+                    title=title,
+                    platform=platform,
+                    publisher=publisher_name,
+                    period=report.period,
+                    metric=report.metric,
+                    issn=issn,
+                    doi=doi,
+                    proprietary_id=prop_id,
+                    print_isbn=print_isbn,
+                    online_isbn=online_isbn,
+                    month_data=month_data,
+                )
+            )
+        elif report.report_type.startswith("DB"):
+            for metric_code, month_data in metrics_for_db.items():
+                metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
                 report.pubs.append(
-                    celus_pycounter.report.CounterBook(
+                    celus_pycounter.report.CounterDatabase(
                         title=title,
                         platform=platform,
                         publisher=publisher_name,
                         period=report.period,
-                        metric=report.metric,
-                        issn=issn,
-                        doi=doi,
-                        proprietary_id=prop_id,
-                        print_isbn=print_isbn,
-                        online_isbn=online_isbn,
+                        metric=metric,
                         month_data=month_data,
                     )
                 )
-            elif report.report_type.startswith("DB"):
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        celus_pycounter.report.CounterDatabase(
-                            title=title,
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            month_data=month_data,
-                        )
-                    )
-            elif report.report_type == "PR1":
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        celus_pycounter.report.CounterPlatform(
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            month_data=month_data,
-                        )
-                    )
-            elif report.report_type == "JR2":
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        celus_pycounter.report.CounterJournal(
-                            title=title,
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            issn=issn,
-                            eissn=eissn,
-                            doi=doi,
-                            proprietary_id=prop_id,
-                            month_data=month_data,
-                        )
+        elif report.report_type == "PR1":
+            for metric_code, month_data in metrics_for_db.items():
+                metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
+                report.pubs.append(
+                    celus_pycounter.report.CounterPlatform(
+                        platform=platform,
+                        publisher=publisher_name,
+                        period=report.period,
+                        metric=metric,
+                        month_data=month_data,
                     )
-            elif report.report_type == "MR1":
+                )
+        elif report.report_type == "JR2":
+            for metric_code, month_data in metrics_for_db.items():
+                metric = celus_pycounter.constants.DB_METRIC_MAP[metric_code]
                 report.pubs.append(
-                    celus_pycounter.report.CounterMultimedia(
-                        collection=title,
+                    celus_pycounter.report.CounterJournal(
+                        title=title,
                         platform=platform,
-                        content_provider=publisher_name,
+                        publisher=publisher_name,
                         period=report.period,
-                        metric=report.metric,
+                        metric=metric,
+                        issn=issn,
+                        eissn=eissn,
+                        doi=doi,
+                        proprietary_id=prop_id,
                         month_data=month_data,
                     )
                 )
-
-    return report
+        elif report.report_type == "MR1":
+            report.pubs.append(
+                celus_pycounter.report.CounterMultimedia(
+                    collection=title,
+                    platform=platform,
+                    content_provider=publisher_name,
+                    period=report.period,
+                    metric=report.metric,
+                    month_data=month_data,
+                )
+            )
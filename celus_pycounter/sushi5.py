@@ -1,16 +1,21 @@
 """COUNTER 5 SUSHI support."""
 
 import collections
+import contextlib
 import datetime
+import io
+import json
 import logging
+import tempfile
 import warnings
 
 import pendulum
-import requests
 
 import celus_pycounter.exceptions
 import celus_pycounter.report
-from celus_pycounter.helpers import convert_date_run
+from celus_pycounter import diagnostics, sessions, throttle
+from celus_pycounter.helpers import convert_date_run, intern_string, iter_json_object
+from celus_pycounter.polling import parse_retry_after
 
 DEPRECATED_KEYS = {"requestor_email", "requestor_name", "customer_name"}
 
@@ -71,16 +76,80 @@ def _get_identifiers(item):
 def raw_to_full(raw_report):
     """Convert a raw report to CounterReport.
 
-    :param raw_report: raw report as dict decoded from JSON
+    :param raw_report: raw report as dict decoded from JSON, or a binary
+        file object to read the JSON from (such as the result of
+        ``get_sushi_stats_raw(..., stream=True)`` or a dump file); file
+        objects are parsed incrementally, one report item at a time. A
+        :class:`ResponseStream` is closed once parsed, even if parsing
+        fails; other file objects are left open
     :return: a :class:`celus_pycounter.report.CounterReport`
     """
-    # pylint: disable=too-many-locals
-    header = raw_report["Report_Header"]
+    if isinstance(raw_report, ResponseStream):
+        with raw_report:
+            return _stream_to_full(raw_report)
+    if hasattr(raw_report, "read"):
+        return _stream_to_full(raw_report)
+    report = _report_from_header(raw_report["Report_Header"], raw_report.get("Release", 5))
+    for item in raw_report["Report_Items"]:
+        _add_report_item(report, item)
+    return report
+
+
+def _stream_to_full(stream):
+    """Convert a raw report read from a binary file object to CounterReport.
+
+    Report items usually come after the report header. Items coming before
+    it cannot be converted yet, so they are kept in a temporary file until
+    the header is read, rather than in memory.
+    """
+    report = None
+    header = None
+    release = 5
+    # other members, of a response with an exception instead of a report
+    other = {}
+    with contextlib.ExitStack() as stack:
+        pending_items = None
+        for key, value in iter_json_object(stream, lazy_keys=("Report_Items",)):
+            if key == "Report_Header":
+                header = value
+                _check_report_exceptions({"Report_Header": header}, getattr(stream, "headers", {}))
+            elif key == "Release":
+                release = value
+            elif key == "Report_Items":
+                if header is None:
+                    pending_items = stack.enter_context(tempfile.TemporaryFile())
+                    for item in value:
+                        # JSON escapes newlines, so every item takes one line
+                        pending_items.write(json.dumps(item).encode("utf-8") + b"\n")
+                    continue
+                report = _report_from_header(header, release)
+                for item in value:
+                    _add_report_item(report, item)
+            else:
+                other[key] = value
+        if header is None:
+            _check_report_exceptions(other, getattr(stream, "headers", {}))
+        if report is None:
+            report = _report_from_header(header, release)
+        if pending_items is not None:
+            pending_items.seek(0)
+            for line in pending_items:
+                _add_report_item(report, json.loads(line))
+    return report
+
+
+def _report_from_header(header, release=5):
+    """Create an empty CounterReport from a report header.
+
+    :param header: Report_Header of a raw report
+    :param release: top-level Release of the raw report, used if the header
+        has none
+    """
     period = _dates_from_filters(header["Report_Filters"])
     date_run = header.get("Created")
-    report = celus_pycounter.report.CounterReport(
+    return celus_pycounter.report.CounterReport(
         period=period,
-        report_version=int(header.get("Release", raw_report.get("Release", 5))),
+        report_version=int(header.get("Release", release)),
         report_type=header["Report_ID"],
         customer=header.get("Institution_Name", ""),
         institutional_identifier=header.get("Customer_ID", ""),
@@ -88,76 +157,78 @@ def raw_to_full(raw_report):
         date_run=pendulum.parse(date_run) if date_run else datetime.datetime.now(),
     )
 
-    for item in raw_report["Report_Items"]:
-        publisher_name = item.get("Publisher", "")
-        platform = item.get("Platform", "")
-        title = item["Title"]
-
-        identifiers = _get_identifiers(item)
-
-        metrics_data = collections.OrderedDict()
 
-        for perform_item in item["Performance"]:
-            item_date = convert_date_run(perform_item["Period"]["Begin_Date"])
-            for inst in perform_item["Instance"]:
-                usage = inst["Count"]
-                metrics_data.setdefault(inst["Metric_Type"], []).append((item_date, int(usage)))
-
-        if report.report_type == "TR_J1":
+def _add_report_item(report, item):
+    """Add resources for an item of Report_Items to a report."""
+    publisher_name = intern_string(item.get("Publisher", ""))
+    platform = intern_string(item.get("Platform", ""))
+    title = item["Title"]
+
+    identifiers = _get_identifiers(item)
+
+    metrics_data = collections.OrderedDict()
+
+    for perform_item in item["Performance"]:
+        item_date = convert_date_run(perform_item["Period"]["Begin_Date"])
+        for inst in perform_item["Instance"]:
+            usage = inst["Count"]
+            metrics_data.setdefault(inst["Metric_Type"], []).append((item_date, int(usage)))
+
+    if report.report_type == "TR_J1":
+        report.pubs.append(
+            celus_pycounter.report.CounterJournal(
+                title=title,
+                platform=platform,
+                publisher=publisher_name,
+                period=report.period,
+                metric="Total_Item_Requests",
+                issn=identifiers["issn"],
+                eissn=identifiers["eissn"],
+                doi=identifiers["doi"],
+                proprietary_id=identifiers["prop_id"],
+                month_data=metrics_data["Total_Item_Requests"],
+            )
+        )
+    elif report.report_type == "TR_J2":
+        for metric, data in metrics_data.items():
             report.pubs.append(
                 celus_pycounter.report.CounterJournal(
                     title=title,
                     platform=platform,
                     publisher=publisher_name,
                     period=report.period,
-                    metric="Total_Item_Requests",
+                    metric=metric,
                     issn=identifiers["issn"],
                     eissn=identifiers["eissn"],
                     doi=identifiers["doi"],
                     proprietary_id=identifiers["prop_id"],
-                    month_data=metrics_data["Total_Item_Requests"],
+                    month_data=data,
                 )
             )
-        elif report.report_type == "TR_J2":
-            for metric, data in metrics_data.items():
-                report.pubs.append(
-                    celus_pycounter.report.CounterJournal(
-                        title=title,
-                        platform=platform,
-                        publisher=publisher_name,
-                        period=report.period,
-                        metric=metric,
-                        issn=identifiers["issn"],
-                        eissn=identifiers["eissn"],
-                        doi=identifiers["doi"],
-                        proprietary_id=identifiers["prop_id"],
-                        month_data=data,
-                    )
-                )
-        elif report.report_type.startswith("TR_B"):
-            report.pubs.append(
-                celus_pycounter.report.CounterBook(
-                    title=title,
-                    platform=platform,
-                    publisher=publisher_name,
-                    period=report.period,
-                    metric="Total_Item_Requests",
-                    issn=identifiers["issn"],
-                    isbn=identifiers["isbn"],
-                    doi=identifiers["doi"],
-                    proprietary_id=identifiers["prop_id"],
-                    month_data=metrics_data["Total_Item_Requests"],
-                )
+    elif report.report_type.startswith("TR_B"):
+        report.pubs.append(
+            celus_pycounter.report.CounterBook(
+                title=title,
+                platform=platform,
+                publisher=publisher_name,
+                period=report.period,
+                metric="Total_Item_Requests",
+                issn=identifiers["issn"],
+                isbn=identifiers["isbn"],
+                doi=identifiers["doi"],
+                proprietary_id=identifiers["prop_id"],
+                month_data=metrics_data["Total_Item_Requests"],
             )
-        else:
-            raise celus_pycounter.exceptions.UnknownReportTypeError
-
-    return report
+        )
+    else:
+        raise celus_pycounter.exceptions.UnknownReportTypeError
 
 
-def get_status(url: str) -> str:
+def get_status(url: str, session=None) -> str:
     """Request SUSHI server status."""
-    response = requests.get(f"{url}/status")
+    if session is None:
+        session = sessions.default_session()
+    response = session.get(f"{url}/status")
     return response.content
 
 
@@ -174,6 +245,8 @@ def get_sushi_stats_raw(
     verify=True,
     url=None,
     api_key=None,
+    session=None,
+    stream=False,
     **kwargs,
 ):
     """Get SUSHI stats for a given site in dict (decoded from JSON) format.
@@ -205,6 +278,16 @@ def get_sushi_stats_raw(
     :param api_key: str: API key for SUSHI provider (not used by all vendors; see
         vendor instructions to determine if this is needed)
 
+    :param session: :class:`requests.Session` to make the request with;
+        defaults to a pooled session shared by all requests
+
+    :param stream: return a binary file object reading the response
+        instead of decoding it, to be parsed incrementally by
+        :py:func:`raw_to_full`; exceptions in the report header are only
+        raised by :py:func:`raw_to_full` then, and `sushi_dump` is ignored;
+        parse it in a :py:func:`celus_pycounter.throttle.deferred` block for
+        them to count as failed requests
+
     """
     # pylint: disable=too-many-locals
     _check_params(kwargs, release)
@@ -215,6 +298,84 @@ def get_sushi_stats_raw(
             )
         )
         url = wsdl_url
+    url_full, req_params = _report_request(
+        url, report, customer_reference, start_date, end_date, requestor_id, api_key
+    )
+    logger.debug("Making request to %s with params %s", url_full, req_params)
+    if session is None:
+        session = sessions.default_session()
+    with throttle.guard(url_full) as guard:
+        response = session.get(
+            url_full,
+            params=req_params,
+            headers=_headers(),
+            verify=verify,
+            stream=stream,
+        )
+        guard.check(response)
+        sessions.raise_for_status(response)
+        if stream:
+            return ResponseStream(response, dump_file)
+
+        if dump_file:
+            dump_file.write(response.content)
+
+        if sushi_dump:  # pragma: no cover
+            diagnostics.dump(
+                logger,
+                "SUSHI DUMP: request: %s \n\n response: %s",
+                lambda: vars(response.request),
+                response.content,
+            )
+
+        response_data = response.json()
+        _check_report_exceptions(response_data, response.headers)
+    return response_data
+
+
+class ResponseStream(io.RawIOBase):
+    """Binary file object reading the body of a streamed response.
+
+    :param response: :class:`requests.Response` of a request made with
+        ``stream=True``
+    :param dump_file: file to write the body to as it is read
+
+    :ivar headers: HTTP headers of the response
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, response, dump_file=None):
+        super().__init__()
+        self.response = response
+        self.headers = response.headers
+        self.dump_file = dump_file
+        self._chunks = response.iter_content(self.CHUNK_SIZE)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._pending:
+            self._pending = next(self._chunks, b"")
+            if self.dump_file and self._pending:
+                self.dump_file.write(self._pending)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        if not size:
+            self.close()
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.response.close()
+        super().close()
+
+
+def _report_request(url, report, customer_reference, start_date, end_date, requestor_id, api_key):
+    """Get URL and query parameters of a report request."""
     url_params = {"url": url, "report": report}
     req_params = {
         "customer_id": customer_reference,
@@ -225,35 +386,43 @@ def get_sushi_stats_raw(
     if api_key:
         req_params["api_key"] = api_key
 
-    url_full = "{url}/reports/{report}".format(**url_params)
-    logger.debug(f"Making request to {url_full} with params {req_params}")
-    response = requests.get(
-        url_full,
-        params=req_params,
-        headers={"User-Agent": "celus_pycounter/%s" % celus_pycounter.__version__},
-        verify=verify,
-    )
+    return "{url}/reports/{report}".format(**url_params), req_params
 
-    if dump_file:
-        dump_file.write(response.content)
 
-    if sushi_dump:  # pragma: no cover
-        logger.debug(
-            "SUSHI DUMP: request: %s \n\n response: %s",
-            vars(response.request),
-            response.content,
-        )
+def _headers():
+    return {"User-Agent": "celus_pycounter/%s" % celus_pycounter.__version__}
 
-    response_data = response.json()
 
-    if "Exceptions" in response_data["Report_Header"]:
-        raise celus_pycounter.exceptions.Sushi5Error(
-            message=response_data["Report_Header"]["Exceptions"][0]["Message"],
-            severity=response_data["Report_Header"]["Exceptions"][0]["Severity"],
-            code=response_data["Report_Header"]["Exceptions"][0]["Code"],
-        )
+def _check_report_exceptions(response_data, headers):
+    """Raise exception reported in the header of a report.
 
-    return response_data
+    Some servers answer with the exception alone, or a list of exceptions,
+    instead of a report; these are raised as well.
+
+    :param response_data: decoded JSON response
+    :param headers: HTTP headers of the response
+    """
+    if isinstance(response_data, list):
+        exceptions = response_data
+    elif "Report_Header" in response_data:
+        exceptions = response_data["Report_Header"].get("Exceptions")
+    elif "Exceptions" in response_data:
+        exceptions = response_data["Exceptions"]
+    elif "Code" in response_data:
+        exceptions = [response_data]
+    else:
+        raise celus_pycounter.exceptions.SushiException(
+            "Report_Header not found in report", raw=response_data
+        )
+    if not exceptions:
+        return
+    exc = celus_pycounter.exceptions.Sushi5Error(
+        message=exceptions[0].get("Message", ""),
+        severity=exceptions[0].get("Severity"),
+        code=exceptions[0].get("Code"),
+    )
+    exc.retry_after = parse_retry_after(headers.get("Retry-After"))
+    raise exc
 
 
 def _check_params(kwargs, release):
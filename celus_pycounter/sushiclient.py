@@ -32,7 +32,7 @@ from celus_pycounter.helpers import convert_date_run, last_day, prev_month
     "format_",
     default="tsv",
     help="Output format (default tsv)",
-    type=click.Choice(["tsv"]),
+    type=click.Choice(["tsv", "csv", "xlsx", "jsonl"]),
 )
 @click.option(
     "--output_file",
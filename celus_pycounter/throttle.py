@@ -0,0 +1,336 @@
+"""Rate limiting and circuit breaking of SUSHI requests per provider.
+
+Throttling is off until :py:func:`configure` is called. From then on, all
+SUSHI requests made in the process, from any thread or task, share one
+token bucket and one circuit breaker per host::
+
+    from celus_pycounter import throttle
+
+    throttle.configure(rate=2, burst=5, failure_threshold=5, reset_timeout=300)
+
+The token bucket lets through at most `rate` requests per second to a
+host, after a burst of `burst` requests. The circuit breaker counts
+consecutive failed requests to a host: HTTP 429 and 5xx responses,
+connection errors (of requests and httpx) and COUNTER 5 "service busy"
+exceptions. After `failure_threshold` of them, requests to the host fail
+immediately with :class:`celus_pycounter.exceptions.CircuitOpenError` for
+`reset_timeout` seconds; then one trial request is let through, which
+closes the circuit again if it succeeds. Cancelled requests are not
+counted either way.
+
+Some failures only show once the response is parsed, such as exceptions
+in the header of a streamed COUNTER 5 report or in a COUNTER 4 report.
+Requests made inside a :py:func:`deferred` block are recorded only when
+the block ends, so that errors raised while parsing count too::
+
+    with throttle.deferred():
+        report = sushi.raw_to_full(sushi.get_sushi_stats_raw(...))
+"""
+
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+import urllib.parse
+
+import requests
+
+import celus_pycounter.exceptions
+
+# COUNTER 5 exceptions telling that the service is unhealthy or
+# overloaded: 1000 Service Not Available, 1010 Service Busy,
+# 1020 Client has made too many requests
+BUSY_CODES = frozenset({1000, 1010, 1020})
+
+UNHEALTHY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    celus_pycounter.exceptions.ServiceNotAvailableError,
+    celus_pycounter.exceptions.TooManyRequestsError,
+)
+
+_throttle = None
+
+# guards of requests made in the current deferred() block
+_deferred_guards = contextvars.ContextVar("deferred_guards", default=None)
+
+
+def is_failure(exc):
+    """Check if an exception from a request means that the provider is unhealthy."""
+    if isinstance(exc, UNHEALTHY_EXCEPTIONS):
+        return True
+    # errors of the asyncio client; httpx is optional and can only have
+    # raised if it was imported
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, celus_pycounter.exceptions.SushiException):
+        # SUSHI exception number, of COUNTER 5 or COUNTER 4 errors
+        try:
+            return int(getattr(exc, "code", None)) in BUSY_CODES
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    :param rate: tokens added per second
+
+    :param burst: maximum number of tokens
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token.
+
+        Tokens may be taken before they are available, in which case the
+        caller has to wait before using it.
+
+        :return: seconds to wait before the token can be used
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker.
+
+    :param failure_threshold: number of consecutive failures opening the
+        circuit
+
+    :param reset_timeout: seconds to keep the circuit open before letting a
+        trial request through
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = None
+        self.lock = threading.Lock()
+
+    def check(self, host=None):
+        """Let a request through, or fail fast.
+
+        :raises: :class:`celus_pycounter.exceptions.CircuitOpenError` if
+            the circuit is open, or half-open with a trial request running
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                return
+        exc = celus_pycounter.exceptions.CircuitOpenError(
+            f"Requests to {host or 'provider'} suspended after repeated failures"
+        )
+        exc.retry_after = max(0.0, remaining)
+        raise exc
+
+    def record_success(self):
+        """Record a successful request."""
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_abandoned(self):
+        """Record a request which ended without an outcome, such as a cancelled one.
+
+        The circuit is left as it was, except that a trial request in
+        progress no longer keeps other trial requests out.
+        """
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_failure(self):
+        """Record a failed request."""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened = time.monotonic()
+
+
+class Throttle:
+    """Token buckets and circuit breakers of all hosts.
+
+    :param rate: requests per second allowed to a host, or None for no
+        limit
+
+    :param burst: number of requests allowed to a host at once
+
+    :param failure_threshold: consecutive failures opening the circuit to
+        a host, or None to never open it
+
+    :param reset_timeout: seconds to keep the circuit to a host open
+    """
+
+    def __init__(self, rate=None, burst=1, failure_threshold=5, reset_timeout=60):
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.buckets = {}
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        """Get the token bucket of a host, or None if rate is not limited."""
+        if self.rate is None:
+            return None
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def breaker(self, host):
+        """Get the circuit breaker of a host, or None if circuits never open."""
+        if self.failure_threshold is None:
+            return None
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def guard(self, url, blocking=True):
+        """Get a :class:`Guard` for a request to `url`."""
+        return Guard(self, url, blocking)
+
+
+class Guard:
+    """Context manager around one request.
+
+    On entry, fails fast if the circuit to the host is open, and takes a
+    token from the host's bucket, waiting for it if `blocking` is true;
+    otherwise the caller has to wait :py:attr:`delay` seconds before
+    making the request. On exit, records the outcome of the request.
+
+    :param throttle: a :class:`Throttle`, or None not to throttle
+
+    :param url: URL of the request
+
+    :param blocking: whether to wait for a token on entry
+    """
+
+    def __init__(self, throttle, url, blocking=True):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        self.host = host
+        self.bucket = throttle.bucket(host) if throttle is not None else None
+        self.breaker = throttle.breaker(host) if throttle is not None else None
+        self.blocking = blocking
+        self.delay = 0.0
+        self.failed = False
+
+    def __enter__(self):
+        if self.breaker is not None:
+            self.breaker.check(self.host)
+        if self.bucket is not None:
+            self.delay = self.bucket.reserve()
+            if self.blocking and self.delay:
+                time.sleep(self.delay)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_value is not None and not isinstance(exc_value, Exception):
+            # cancelled or interrupted; says nothing about the provider
+            if self.breaker is not None:
+                self.breaker.record_abandoned()
+            return
+        if exc_value is not None and is_failure(exc_value):
+            self.failed = True
+        guards = _deferred_guards.get()
+        if guards is not None:
+            guards.append(self)
+        else:
+            self.record()
+
+    def record(self, exc=None):
+        """Record the outcome of the request with the circuit breaker.
+
+        :param exc: exception raised after the request, if any
+        """
+        if self.breaker is None:
+            return
+        if exc is not None and not isinstance(exc, Exception):
+            self.breaker.record_abandoned()
+            return
+        if self.failed or (exc is not None and is_failure(exc)):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def check(self, response):
+        """Record an HTTP 429 or 5xx response as a failure."""
+        if response.status_code == 429 or response.status_code >= 500:
+            self.failed = True
+
+
+@contextlib.contextmanager
+def deferred():
+    """Record outcomes of requests made in the block only when it ends.
+
+    A request then fails if the block raises an exception which means
+    that the provider is unhealthy, even after the response was received.
+    Outcomes of requests are not recorded if the block is cancelled or
+    interrupted (raises a :class:`BaseException` which is not an
+    :class:`Exception`).
+    """
+    guards = []
+    token = _deferred_guards.set(guards)
+    try:
+        yield
+    except BaseException as exc:
+        for guard in guards:
+            guard.record(exc)
+        raise
+    else:
+        for guard in guards:
+            guard.record()
+    finally:
+        _deferred_guards.reset(token)
+
+
+def configure(rate=None, burst=1, failure_threshold=5, reset_timeout=60):
+    """Throttle all SUSHI requests of the process.
+
+    Replaces the previous configuration, see :class:`Throttle` for the
+    parameters.
+
+    :return: the new :class:`Throttle`
+    """
+    global _throttle  # pylint: disable=global-statement
+    _throttle = Throttle(rate, burst, failure_threshold, reset_timeout)
+    return _throttle
+
+
+def disable():
+    """Stop throttling SUSHI requests."""
+    global _throttle  # pylint: disable=global-statement
+    _throttle = None
+
+
+def guard(url, blocking=True):
+    """Get a :class:`Guard` for a request to `url` under the process-wide configuration."""
+    return Guard(_throttle, url, blocking)
@@ -8,9 +8,20 @@ import celus_pycounter.sushi
 from celus_pycounter import csvhelper, report
 
 
+def data_path(*path):
+    """Get path of a test data file, relative to the tests directory."""
+    return os.path.join(os.path.dirname(__file__), *path)
+
+
+def read_data(*path):
+    """Read a test data file, given relative to the tests directory, as bytes."""
+    with open(data_path(*path), "rb") as datafile:
+        return datafile.read()
+
+
 def parsedata(filename):
     """Helper function returns a report from a filename relative to data directory."""
-    return report.parse(os.path.join(os.path.dirname(__file__), "data", filename))
+    return report.parse(data_path("data", filename))
 
 
 @pytest.fixture(params=["csvC4JR1", "C4JR1.csv", "C4JR1_bad.csv", "C4JR1GOA.csv"])
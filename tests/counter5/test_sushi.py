@@ -1,12 +1,20 @@
 """Tests for COUNTER 5 SUSHI support."""
 
+import datetime
+import io
+import json
 import os
+import urllib.parse
 
+import mock
 import pytest
 from httmock import HTTMock, all_requests
 
 import celus_pycounter.exceptions
+import celus_pycounter.sushi
 import celus_pycounter.sushi5
+from celus_pycounter import polling, serialization
+from tests.conftest import read_data
 
 
 def test_report_type(sushi5_report_trj1):
@@ -60,3 +68,171 @@ def test_bk_data(sushi5_report_trb1):
     publication = next(iter(sushi5_report_trb1))
     data = [month[2] for month in publication]
     assert data[0] == 22
+
+
+@all_requests
+def monthly_mock(url, request_unused):
+    """Mocked SUSHI service answering with the requested months only."""
+    params = urllib.parse.parse_qs(url.query)
+    begin, end = params["begin_date"][0], params["end_date"][0]
+    monthly_mock.requests.append((begin, end))
+    data = json.loads(read_data("counter5", "data", "sushi_simple.json"))
+    data["Report_Header"]["Report_Filters"] = [
+        {"Name": "Begin_Date", "Value": begin},
+        {"Name": "End_Date", "Value": end},
+    ]
+    for item in data["Report_Items"]:
+        item["Performance"] = [
+            perf for perf in item["Performance"] if begin <= perf["Period"]["Begin_Date"] <= end
+        ]
+    return json.dumps(data)
+
+
+def test_get_report_chunked():
+    kwargs = {
+        "url": "https://example.com/sushi",
+        "start_date": datetime.date(2019, 1, 1),
+        "end_date": datetime.date(2019, 2, 28),
+        "release": 5,
+    }
+    monthly_mock.requests = []
+    with HTTMock(monthly_mock):
+        whole = celus_pycounter.sushi.get_report(**kwargs)
+        chunked = celus_pycounter.sushi.get_report(chunk_months=1, **kwargs)
+    assert sorted(monthly_mock.requests) == [
+        ("2019-01-01", "2019-01-31"),
+        ("2019-01-01", "2019-02-28"),
+        ("2019-02-01", "2019-02-28"),
+    ]
+    assert chunked.period == whole.period
+    assert chunked.as_generic() == whole.as_generic()
+
+
+def test_get_report_chunked_positional_dates():
+    monthly_mock.requests = []
+    with HTTMock(monthly_mock), pytest.deprecated_call():
+        report = celus_pycounter.sushi.get_report(
+            "https://example.com/sushi",
+            datetime.date(2019, 1, 1),
+            datetime.date(2019, 2, 28),
+            release=5,
+            chunk_months=1,
+        )
+    assert len(monthly_mock.requests) == 2
+    assert report.period == (datetime.date(2019, 1, 1), datetime.date(2019, 2, 28))
+
+
+def _generic(report):
+    pubs = [(type(pub), serialization.resource_state(pub), list(pub)) for pub in report]
+    return report.period, report.report_type, report.customer, pubs
+
+
+@pytest.mark.parametrize("filename", ["sushi_simple.json", "sushi_book.json"])
+def test_raw_to_full_stream(filename):
+    raw = read_data("counter5", "data", filename)
+    streamed = celus_pycounter.sushi5.raw_to_full(io.BytesIO(raw))
+    assert _generic(streamed) == _generic(celus_pycounter.sushi5.raw_to_full(json.loads(raw)))
+
+
+def test_raw_to_full_stream_items_first():
+    data = json.loads(read_data("counter5", "data", "sushi_simple.json"))
+    reordered = {"Report_Items": data["Report_Items"], "Report_Header": data["Report_Header"]}
+    streamed = celus_pycounter.sushi5.raw_to_full(io.BytesIO(json.dumps(reordered).encode()))
+    assert _generic(streamed) == _generic(celus_pycounter.sushi5.raw_to_full(data))
+
+
+def test_raw_to_full_stream_exception():
+    with pytest.raises(celus_pycounter.exceptions.Sushi5Error) as exception:
+        celus_pycounter.sushi5.raw_to_full(
+            io.BytesIO(read_data("counter5", "data", "not_authorized.json"))
+        )
+    assert exception.value.code == 2000
+
+
+def test_raw_to_full_stream_no_header():
+    with pytest.raises(celus_pycounter.exceptions.SushiException):
+        celus_pycounter.sushi5.raw_to_full(io.BytesIO(b'{"Report_Items": []}'))
+
+
+@all_requests
+def simple_mock(url_unused, request_unused):
+    return {"status_code": 200, "content": read_data("counter5", "data", "sushi_simple.json")}
+
+
+def test_get_report_stream():
+    kwargs = {
+        "url": "https://example.com/sushi",
+        "start_date": datetime.date(2019, 1, 1),
+        "end_date": datetime.date(2019, 2, 28),
+        "release": 5,
+    }
+    dump_file = io.BytesIO()
+    with HTTMock(simple_mock):
+        raw = celus_pycounter.sushi5.get_sushi_stats_raw(stream=True, **kwargs)
+        assert isinstance(raw, celus_pycounter.sushi5.ResponseStream)
+        raw.close()
+        streamed = celus_pycounter.sushi.get_report(stream=True, dump_file=dump_file, **kwargs)
+        whole = celus_pycounter.sushi.get_report(**kwargs)
+    assert _generic(streamed) == _generic(whole)
+    assert dump_file.getvalue() == read_data("counter5", "data", "sushi_simple.json")
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_too_many_requests(stream):
+    @all_requests
+    def busy_mock(url_unused, request_unused):
+        return {"status_code": 429, "content": b"", "headers": {"Retry-After": "30"}}
+
+    with HTTMock(busy_mock):
+        with pytest.raises(celus_pycounter.exceptions.TooManyRequestsError) as exception:
+            celus_pycounter.sushi5.get_sushi_stats_raw(
+                url="https://example.com/sushi",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 1, 31),
+                stream=stream,
+            )
+    assert exception.value.retry_after == 30
+
+
+def test_response_without_header():
+    @all_requests
+    def error_mock(url_unused, request_unused):
+        return {"status_code": 400, "content": {"error": "bad request"}}
+
+    with HTTMock(error_mock):
+        with pytest.raises(celus_pycounter.exceptions.SushiException) as exception:
+            celus_pycounter.sushi5.get_sushi_stats_raw(
+                url="https://example.com/sushi",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 1, 31),
+            )
+    assert exception.value.raw == {"error": "bad request"}
+
+
+def test_get_report_stream_closed_on_error():
+    queued = json.loads(read_data("counter5", "data", "not_authorized.json"))
+    queued["Report_Header"]["Exceptions"][0]["Code"] = 1011
+    streams = []
+
+    class RecordingStream(celus_pycounter.sushi5.ResponseStream):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            streams.append(self)
+
+    @all_requests
+    def queued_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": queued}
+
+    with HTTMock(queued_mock):
+        with mock.patch("celus_pycounter.sushi5.ResponseStream", RecordingStream):
+            with pytest.raises(celus_pycounter.exceptions.Sushi5Error):
+                celus_pycounter.sushi.get_report(
+                    url="https://example.com/sushi",
+                    start_date=datetime.date(2019, 1, 1),
+                    end_date=datetime.date(2019, 1, 31),
+                    release=5,
+                    stream=True,
+                    polling=polling.PollingStrategy(initial_delay=0, jitter=0, max_attempts=3),
+                )
+    assert len(streams) == 3
+    assert all(stream.closed for stream in streams)
@@ -0,0 +1,221 @@
+"""Tests for the asyncio SUSHI client."""
+
+import asyncio
+import datetime
+import json
+import urllib.parse
+
+import httpx
+import pytest
+
+import celus_pycounter.exceptions
+from celus_pycounter import aio, cache, sushi, throttle
+from tests.conftest import read_data
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.headers = {}
+        self.status_code = 200
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeClient:
+    """Stands in for httpx.AsyncClient, returning prepared responses in order."""
+
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.requests = []
+        self.closed = False
+
+    async def _request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return FakeResponse(self.contents.pop(0))
+
+    async def get(self, url, **kwargs):
+        return await self._request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self._request("POST", url, **kwargs)
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _get_report(client, **kwargs):
+    async def get():
+        async with aio.AsyncSushiClient(client=client) as async_client:
+            return await async_client.get_report(
+                "http://www.example.com/Sushi",
+                datetime.date(2015, 1, 1),
+                datetime.date(2015, 1, 31),
+                **kwargs,
+            )
+
+    return asyncio.run(get())
+
+
+def test_get_report():
+    raw = read_data("data", "sushi_simple.xml")
+    client = FakeClient(raw)
+    rpt = _get_report(client)
+    assert rpt.as_generic() == sushi.raw_to_full(raw).as_generic()
+    method, url, kwargs = client.requests[0]
+    assert (method, url) == ("POST", "http://www.example.com/Sushi")
+    assert b"<sushi:Begin>2015-01-01</sushi:Begin>" in kwargs["content"]
+    # clients passed in are not closed
+    assert not client.closed
+
+
+def test_get_report_queued():
+    client = FakeClient(
+        read_data("data", "sushi_queued.xml"), read_data("data", "sushi_simple.xml")
+    )
+    rpt = _get_report(client, no_delay=True)
+    assert rpt.report_type == "JR1"
+    assert len(client.requests) == 2
+
+
+def test_get_report_error():
+    client = FakeClient(read_data("data", "sushi_error.xml"))
+    with pytest.raises(celus_pycounter.exceptions.SushiException):
+        _get_report(client)
+
+
+def test_get_report_sushi5():
+    client = FakeClient(read_data("counter5", "data", "sushi_simple.json"))
+    rpt = _get_report(client, release=5, report="TR_J1", customer_reference="abc")
+    assert rpt.report_type == "TR_J1"
+    method, url, kwargs = client.requests[0]
+    assert (method, url) == ("GET", "http://www.example.com/Sushi/reports/TR_J1")
+    assert kwargs["params"] == {
+        "customer_id": "abc",
+        "begin_date": "2015-01-01",
+        "end_date": "2015-01-31",
+    }
+
+
+def test_get_report_sushi5_error():
+    client = FakeClient(read_data("counter5", "data", "not_authorized.json"))
+    with pytest.raises(celus_pycounter.exceptions.Sushi5Error):
+        _get_report(client, release=5)
+
+
+def test_default_client():
+    async def create():
+        async with aio.AsyncSushiClient() as client:
+            return client.client
+
+    assert asyncio.run(create()).is_closed
+
+
+def test_httpx_client():
+    content = read_data("counter5", "data", "sushi_simple.json")
+    received = []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(200, content=content)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    report = _get_report(client, release=5, report="TR_J1")
+    assert report.report_type == "TR_J1"
+    assert received[0].url.path == "/Sushi/reports/TR_J1"
+    assert client.is_closed is False
+
+
+def test_connection_errors_open_circuit():
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    throttle.configure(failure_threshold=1)
+    try:
+        with pytest.raises(httpx.ConnectError):
+            _get_report(client, release=5)
+        with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+            _get_report(client, release=5)
+    finally:
+        throttle.disable()
+
+
+class MonthlyHandler:
+    """httpx transport handler answering COUNTER 5 requests with the requested months only."""
+
+    def __init__(self):
+        self.requests = []
+        self.params = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        params = urllib.parse.parse_qs(request.url.query.decode("ascii"))
+        begin, end = params["begin_date"][0], params["end_date"][0]
+        self.requests.append((begin, end))
+        self.params.update(params)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        data = json.loads(read_data("counter5", "data", "sushi_simple.json"))
+        data["Report_Header"]["Report_Filters"] = [
+            {"Name": "Begin_Date", "Value": begin},
+            {"Name": "End_Date", "Value": end},
+        ]
+        for item in data["Report_Items"]:
+            item["Performance"] = [
+                perf for perf in item["Performance"] if begin <= perf["Period"]["Begin_Date"] <= end
+            ]
+        return httpx.Response(200, json=data)
+
+
+def _get_report_2019(client, **kwargs):
+    async def get():
+        async with aio.AsyncSushiClient(client=client) as async_client:
+            return await async_client.get_report(
+                url="http://www.example.com/Sushi",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 2, 28),
+                release=5,
+                **kwargs,
+            )
+
+    return asyncio.run(get())
+
+
+def test_get_report_chunked():
+    handler = MonthlyHandler()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    whole = _get_report_2019(client)
+    chunked = _get_report_2019(client, chunk_months=1)
+    assert sorted(handler.requests) == [
+        ("2019-01-01", "2019-01-31"),
+        ("2019-01-01", "2019-02-28"),
+        ("2019-02-01", "2019-02-28"),
+    ]
+    assert chunked.period == whole.period
+    assert chunked.as_generic() == whole.as_generic()
+    assert handler.max_in_flight == 2
+    assert not {"chunk_months", "chunk_workers"} & handler.params
+
+
+def test_get_report_chunk_workers():
+    handler = MonthlyHandler()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    _get_report_2019(client, chunk_months=1, chunk_workers=1)
+    assert len(handler.requests) == 2
+    assert handler.max_in_flight == 1
+
+
+def test_get_report_cached(tmp_path):
+    handler = MonthlyHandler()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    response_cache = cache.ResponseCache(str(tmp_path))
+    first = _get_report_2019(client, cache=response_cache)
+    second = _get_report_2019(client, cache=response_cache)
+    assert len(handler.requests) == 1
+    assert "cache" not in handler.params
+    assert second.as_generic() == first.as_generic()
@@ -0,0 +1,235 @@
+"""Tests for on-disk caches."""
+
+import datetime
+import io
+import json
+import os
+import time
+
+import mock
+import pytest
+from httmock import HTTMock, all_requests
+
+from celus_pycounter import cache, report, serialization, sushi, sushi5
+from tests.conftest import data_path, read_data
+
+
+def _age(disk_cache, key, seconds):
+    """Make an entry look stored and last used `seconds` ago."""
+    when = time.time() - seconds
+    os.utime(disk_cache.path(key), (when, when))
+
+
+def test_get_set(tmp_path):
+    disk_cache = cache.DiskCache(str(tmp_path))
+    assert disk_cache.get("a") is None
+    disk_cache.set("a", b"x" * 1000)
+    assert disk_cache.get("a") == b"x" * 1000
+    # stored compressed
+    assert 0 < disk_cache.size < 1000
+    # size is known to a new cache on the same directory
+    assert cache.DiskCache(str(tmp_path)).size == disk_cache.size
+
+
+def test_overwrite(tmp_path):
+    disk_cache = cache.DiskCache(str(tmp_path))
+    disk_cache.set("a", b"first")
+    disk_cache.set("a", b"second")
+    assert disk_cache.get("a") == b"second"
+    assert disk_cache.size == os.path.getsize(disk_cache.path("a"))
+
+
+def test_ttl(tmp_path):
+    disk_cache = cache.DiskCache(str(tmp_path), ttl=60)
+    disk_cache.set("old", b"1")
+    disk_cache.set("new", b"2")
+    _age(disk_cache, "old", 120)
+    assert disk_cache.get("old") is None
+    assert not os.path.exists(disk_cache.path("old"))
+    assert disk_cache.get("new") == b"2"
+
+
+def test_lru_eviction(tmp_path):
+    values = {key: os.urandom(1000) for key in "abc"}
+    disk_cache = cache.DiskCache(str(tmp_path), max_size=2500)
+    for age, key in ((300, "a"), (200, "b")):
+        disk_cache.set(key, values[key])
+        _age(disk_cache, key, age)
+    # using "a" makes "b" the least recently used entry
+    assert disk_cache.get("a") == values["a"]
+    disk_cache.set("c", values["c"])
+    assert disk_cache.get("b") is None
+    assert disk_cache.get("a") == values["a"]
+    assert disk_cache.get("c") == values["c"]
+    assert disk_cache.size <= 2500
+
+
+def test_unreadable_entry(tmp_path):
+    disk_cache = cache.DiskCache(str(tmp_path))
+    disk_cache.set("a", b"value")
+    with open(disk_cache.path("a"), "wb") as cache_file:
+        cache_file.write(b"not compressed")
+    assert disk_cache.get("a") is None
+    assert disk_cache.size == 0
+
+
+def test_clear(tmp_path):
+    disk_cache = cache.DiskCache(str(tmp_path))
+    disk_cache.set("a", b"value")
+    disk_cache.clear()
+    assert disk_cache.get("a") is None
+    assert disk_cache.size == 0
+
+
+@pytest.mark.parametrize(
+    "end_date,cacheable",
+    [
+        (datetime.date(2020, 2, 29), True),
+        ("2020-02-29", True),
+        (datetime.date(2020, 3, 31), False),
+        ("not a date", False),
+    ],
+)
+def test_is_cacheable(end_date, cacheable):
+    today = datetime.date(2020, 3, 15)
+    assert cache.ResponseCache.is_cacheable(end_date, today=today) is cacheable
+
+
+@all_requests
+def counting_mock(url_unused, request_unused):
+    counting_mock.count += 1
+    return {"status_code": 200, "content": counting_mock.content}
+
+
+def _get_report(response_cache, end_date=datetime.date(2015, 1, 31), **kwargs):
+    return sushi.get_report(
+        "http://www.example.com/Sushi",
+        datetime.date(2015, 1, 1),
+        end_date,
+        requestor_id="requestor",
+        customer_reference="customer",
+        cache=response_cache,
+        **kwargs,
+    )
+
+
+def test_get_report_cached(tmp_path):
+    response_cache = cache.ResponseCache(str(tmp_path))
+    counting_mock.count = 0
+    counting_mock.content = read_data("data", "sushi_simple.xml")
+    with HTTMock(counting_mock):
+        first = _get_report(response_cache)
+        second = _get_report(response_cache)
+        _get_report(response_cache, report="DB1")
+    assert counting_mock.count == 2
+    assert second.as_generic() == first.as_generic()
+
+
+def test_get_report_cached_sushi5(tmp_path):
+    response_cache = cache.ResponseCache(str(tmp_path))
+    counting_mock.count = 0
+    counting_mock.content = read_data("counter5", "data", "sushi_simple.json")
+    with HTTMock(counting_mock):
+        reports = [
+            sushi.get_report(
+                url="http://www.example.com/Sushi",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 2, 28),
+                release=5,
+                cache=response_cache,
+            )
+            for _ in range(2)
+        ]
+    assert counting_mock.count == 1
+    assert reports[0].as_generic() == reports[1].as_generic()
+
+
+def test_get_report_errors_not_cached(tmp_path):
+    response_cache = cache.ResponseCache(str(tmp_path))
+    counting_mock.count = 0
+    counting_mock.content = read_data("data", "sushi_error.xml")
+    with HTTMock(counting_mock):
+        for _ in range(2):
+            with pytest.raises(Exception):
+                _get_report(response_cache)
+    assert counting_mock.count == 2
+    assert response_cache.size == 0
+
+
+def test_get_report_current_month_not_cached(tmp_path):
+    response_cache = cache.ResponseCache(str(tmp_path))
+    counting_mock.count = 0
+    counting_mock.content = read_data("data", "sushi_simple.xml")
+    with HTTMock(counting_mock):
+        _get_report(response_cache, end_date=datetime.date.today())
+    assert response_cache.size == 0
+
+
+def _generic(rpt):
+    return serialization.report_state(rpt), rpt.as_generic()
+
+
+@pytest.mark.parametrize("filename", ["C4JR1.csv", "C4DB1.tsv", "JR1.xlsx"])
+def test_report_cache_parse(tmp_path, filename):
+    path = data_path("data", filename)
+    report_cache = cache.ReportCache(str(tmp_path))
+    with mock.patch("celus_pycounter.report.parse", wraps=report.parse) as parse:
+        first = report_cache.parse(path)
+        second = report_cache.parse(path)
+        # same content from another source is found too
+        third = report_cache.parse(read_data("data", filename), filetype=filename.split(".")[1])
+    assert parse.call_count == 1
+    assert _generic(second) == _generic(first) == _generic(report.parse(path))
+    assert _generic(third) == _generic(first)
+
+
+def test_report_cache_options(tmp_path):
+    path = data_path("data", "C4JR1.csv")
+    report_cache = cache.ReportCache(str(tmp_path))
+    assert report_cache.parse(path).usage_matrix is None
+    assert report_cache.parse(path, use_columnar=True).usage_matrix is not None
+
+
+def test_report_cache_version(tmp_path):
+    path = data_path("data", "C4JR1.csv")
+    report_cache = cache.ReportCache(str(tmp_path))
+    report_cache.parse(path)
+    with mock.patch("celus_pycounter.__version__", "0.0.0"):
+        with mock.patch("celus_pycounter.report.parse", wraps=report.parse) as parse:
+            report_cache.parse(path)
+    assert parse.call_count == 1
+
+
+def test_report_cache_raw_to_full(tmp_path):
+    report_cache = cache.ReportCache(str(tmp_path))
+    raw = read_data("data", "sushi_simple.xml")
+    raw5 = json.loads(read_data("counter5", "data", "sushi_simple.json"))
+    with mock.patch("celus_pycounter.sushi.raw_to_full", wraps=sushi.raw_to_full) as rtf:
+        first = report_cache.raw_to_full(raw)
+        second = report_cache.raw_to_full(raw.decode("utf-8"))
+    assert rtf.call_count == 1
+    assert _generic(second) == _generic(first)
+    with mock.patch("celus_pycounter.sushi5.raw_to_full", wraps=sushi5.raw_to_full) as rtf:
+        first = report_cache.raw_to_full(raw5, release=5)
+        second = report_cache.raw_to_full(raw5, release=5)
+    assert rtf.call_count == 1
+    assert _generic(second) == _generic(first)
+
+
+def test_report_cache_raw_to_full_stream(tmp_path):
+    report_cache = cache.ReportCache(str(tmp_path))
+    raw5 = read_data("counter5", "data", "sushi_simple.json")
+    streams = [io.BytesIO(raw5), io.BytesIO(raw5)]
+    with mock.patch("celus_pycounter.sushi5.raw_to_full", wraps=sushi5.raw_to_full) as rtf:
+        first, second = (report_cache.raw_to_full(stream, release=5) for stream in streams)
+    assert rtf.call_count == 1
+    assert _generic(second) == _generic(first)
+    assert _generic(first) == _generic(sushi5.raw_to_full(json.loads(raw5)))
+    # files of the caller are left open
+    assert not any(stream.closed for stream in streams)
+
+
+def test_report_cache_size_limit(tmp_path):
+    report_cache = cache.ReportCache(str(tmp_path), max_size=1)
+    report_cache.parse(data_path("data", "C4JR1.csv"))
+    assert report_cache.size == 0
@@ -2,6 +2,8 @@
 
 import datetime
 
+import pytest
+
 from celus_pycounter import report
 
 
@@ -19,3 +21,73 @@ def test_report_gaps():
     output_data = journal.as_generic()
     assert output_data[11] == "0"
     assert output_data[12] == "99"
+
+
+def test_resources_have_no_dict():
+    for cls in (
+        report.CounterJournal,
+        report.CounterBook,
+        report.CounterDatabase,
+        report.CounterPlatform,
+        report.CounterMultimedia,
+    ):
+        assert not hasattr(cls(), "__dict__")
+
+
+def test_parsed_strings_are_interned(csv_jr1_report_common_data):
+    first, second = csv_jr1_report_common_data.pubs[:2]
+    assert first.platform is second.platform
+
+
+def _jr1(period, *journals):
+    rpt = report.CounterReport(report_type="JR1", period=period, date_run=period[1])
+    for title, month_data, html_total in journals:
+        rpt.pubs.append(
+            report.CounterJournal(
+                period=period,
+                title=title,
+                issn="1234-5678",
+                month_data=month_data,
+                html_total=html_total,
+            )
+        )
+    return rpt
+
+
+def test_merge_reports():
+    jan = datetime.date(2018, 1, 1)
+    feb = datetime.date(2018, 2, 1)
+    second = _jr1((feb, datetime.date(2018, 2, 28)), ("A", [(feb, 2)], 1), ("B", [(feb, 5)], 3))
+    first = _jr1((jan, datetime.date(2018, 1, 31)), ("A", [(jan, 1)], 1))
+    merged = report.merge_reports([second, first])
+
+    assert merged.period == (jan, datetime.date(2018, 2, 28))
+    assert merged.date_run == datetime.date(2018, 2, 28)
+    assert [pub.title for pub in merged] == ["A", "B"]
+    journal_a, journal_b = merged.pubs
+    assert [usage for _, _, usage in journal_a] == [1, 2]
+    assert journal_a.html_total == 2
+    assert journal_b.as_generic()[-2:] == ["0", "5"]
+    # the merged reports are left alone
+    assert [pub.title for pub in second] == ["A", "B"]
+    assert len(list(first.pubs[0])) == 1
+
+
+def test_merge_reports_mixed_date_run():
+    jan = (datetime.date(2018, 1, 1), datetime.date(2018, 1, 31))
+    feb = (datetime.date(2018, 2, 1), datetime.date(2018, 2, 28))
+    mar = (datetime.date(2018, 3, 1), datetime.date(2018, 3, 31))
+    reports = [_jr1(jan), _jr1(feb), _jr1(mar)]
+    reports[0].date_run = datetime.datetime(2018, 4, 1, 12, 0)
+    latest = datetime.datetime(2018, 4, 2, 8, 0, tzinfo=datetime.timezone.utc)
+    reports[1].date_run = latest
+    reports[2].date_run = datetime.date(2018, 4, 1)
+    assert report.merge_reports(reports).date_run == latest
+
+
+def test_merge_reports_of_other_types():
+    jan = (datetime.date(2018, 1, 1), datetime.date(2018, 1, 31))
+    with pytest.raises(ValueError):
+        report.merge_reports([_jr1(jan), report.CounterReport(report_type="BR1", period=jan)])
+    with pytest.raises(ValueError):
+        report.merge_reports([])
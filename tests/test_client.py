@@ -0,0 +1,83 @@
+"""Tests for the SUSHI client and pooled sessions."""
+
+import datetime
+
+import mock
+import requests
+from httmock import HTTMock, all_requests
+
+from celus_pycounter import sessions, sushi
+from celus_pycounter.client import SushiClient
+from tests.conftest import read_data
+
+
+@all_requests
+def sushi_mock(url_unused, request_unused):
+    return read_data("data", "sushi_simple.xml").decode("utf-8")
+
+
+@all_requests
+def status_mock(url, request_unused):
+    return {"status_code": 200, "content": url.path.encode("utf-8")}
+
+
+def test_default_session_shared():
+    assert sessions.default_session() is sessions.default_session()
+
+
+def test_default_session_keeps_no_cookies():
+    sent = []
+
+    @all_requests
+    def cookie_mock(url_unused, request):
+        sent.append(request.headers.get("Cookie"))
+        return {"status_code": 200, "content": b"", "headers": {"Set-Cookie": "vendor=1; Path=/"}}
+
+    session = sessions.default_session()
+    with HTTMock(cookie_mock):
+        session.get("http://www.example.com/sushi/status")
+        session.get("http://www.example.com/sushi/status")
+    assert sent == [None, None]
+    assert not session.cookies
+
+
+def test_make_session_pool_size():
+    session = sessions.make_session(pool_connections=3, pool_maxsize=7)
+    adapter = session.get_adapter("https://www.example.com/")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+
+
+def test_client_get_report():
+    with HTTMock(sushi_mock):
+        with SushiClient() as client:
+            with mock.patch.object(client.session, "post", wraps=client.session.post) as post:
+                rpt = client.get_report(
+                    "http://www.example.com/Sushi",
+                    datetime.date(2015, 1, 1),
+                    datetime.date(2015, 1, 31),
+                )
+    assert post.call_count == 1
+    assert rpt.report_type == "JR1"
+
+
+def test_client_get_status():
+    session = requests.Session()
+    with HTTMock(status_mock), mock.patch.object(session, "close") as close:
+        with SushiClient(session=session) as client:
+            assert client.get_status("http://www.example.com/sushi", 5) == b"/sushi/status"
+    # sessions passed to the client are not closed by it
+    assert not close.called
+
+
+def test_module_functions_use_session():
+    session = requests.Session()
+    with HTTMock(sushi_mock):
+        with mock.patch.object(session, "post", wraps=session.post) as post:
+            sushi.get_report(
+                "http://www.example.com/Sushi",
+                datetime.date(2015, 1, 1),
+                datetime.date(2015, 1, 31),
+                session=session,
+            )
+    assert post.call_count == 1
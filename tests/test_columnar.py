@@ -0,0 +1,103 @@
+"""Tests for columnar storage of usage data."""
+
+import datetime
+import glob
+import os
+
+import pytest
+
+from celus_pycounter import columnar, report
+from tests.conftest import data_path
+
+BACKENDS = [
+    "array",
+    pytest.param(
+        "numpy",
+        marks=pytest.mark.skipif(columnar.numpy is None, reason="NumPy not installed"),
+    ),
+]
+
+
+TABULAR_FILES = sorted(
+    path
+    for directory in (
+        data_path("data"),
+        data_path("counter5", "data"),
+    )
+    for path in glob.glob(os.path.join(directory, "*"))
+    if not path.endswith((".xml", ".json"))
+)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("filename", ["C4BR2.tsv", "C4DB2.tsv", "C4JR1my.csv", "PR1.tsv"])
+def test_same_output(filename, backend):
+    expected = report.parse(data_path("data", filename)).as_generic()
+    rpt = report.parse(data_path("data", filename)).to_columnar(backend)
+    assert rpt.usage_matrix.backend == backend
+    assert rpt.as_generic() == expected
+
+
+def test_parse_columnar():
+    rpt = report.parse(data_path("data", "C4JR1.csv"), use_columnar=True)
+    assert len(rpt.usage_matrix) == len(rpt.pubs)
+    assert rpt.as_generic() == report.parse(data_path("data", "C4JR1.csv")).as_generic()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_matrix(backend):
+    jan, feb, mar = (datetime.date(2020, month, 1) for month in (1, 2, 3))
+    matrix = columnar.UsageMatrix([jan, mar], backend)
+    rows = [matrix.add_row([(jan, 1), (mar, 2)]) for _ in range(20)]
+    matrix.view(rows[1]).append((feb, 5))
+    assert matrix.months == [jan, feb, mar]
+    assert list(matrix.view(rows[0])) == [(jan, 1), (feb, 0), (mar, 2)]
+    assert list(matrix.view(rows[1])) == [(jan, 1), (feb, 5), (mar, 2)]
+    assert matrix.row_totals()[:3] == [3, 8, 3]
+    assert matrix.month_totals(rows[:2]) == [2, 5, 4]
+    assert matrix.month_totals() == [20, 5, 40]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_row_indexing(backend):
+    jan, feb, mar = (datetime.date(2020, month, 1) for month in (1, 2, 3))
+    matrix = columnar.UsageMatrix([jan, feb, mar], backend)
+    matrix.add_row([(jan, 7)])
+    view = matrix.view(matrix.add_row([(jan, 1), (feb, 2), (mar, 3)]))
+    assert view[0] == (jan, 1)
+    assert view[-1] == (mar, 3)
+    assert type(view[1][1]) is int
+    assert view[1:] == [(feb, 2), (mar, 3)]
+    assert view[::-2] == [(mar, 3), (jan, 1)]
+    with pytest.raises(IndexError):
+        view[3]
+    with pytest.raises(IndexError):
+        view[-4]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("path", TABULAR_FILES, ids=os.path.basename)
+def test_same_output_all_files(path, backend):
+    expected = report.parse(path).as_generic()
+    assert report.parse(path).to_columnar(backend).as_generic() == expected
+    if backend == columnar.UsageMatrix([]).backend:
+        assert report.parse(path, use_columnar=True).as_generic() == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_matrix_zero_usage_outside_axis(backend):
+    jan, feb = datetime.date(2020, 1, 1), datetime.date(2020, 2, 1)
+    matrix = columnar.UsageMatrix([feb], backend)
+    row = matrix.add_row([(jan, 0), (feb, 3)])
+    assert list(matrix.view(row)) == [(jan, 0), (feb, 3)]
+
+
+def test_array_matrix_fills_allocated_rows():
+    months = [datetime.date(2020, month, 1) for month in (1, 2)]
+    matrix = columnar.UsageMatrix(months, "array")
+    for idx in range(40):
+        matrix.add_row([(months[0], idx)])
+        assert len(matrix._data) == matrix._capacity * len(matrix.months)
+    matrix.add(0, datetime.date(2020, 3, 1), 1)
+    assert len(matrix._data) == matrix._capacity * len(matrix.months)
+    assert matrix.row_totals() == [1] + list(range(1, 40))
@@ -0,0 +1,83 @@
+"""Tests for the csvhelper module"""
+
+import io
+import warnings
+
+import pytest
+
+from celus_pycounter import csvhelper
+from tests.conftest import data_path
+
+
+def _read(filename, **kwargs):
+    with csvhelper.UnicodeReader(filename, **kwargs) as reader:
+        return list(reader)
+
+
+@pytest.mark.parametrize("filename", ["C4BR1.tsv", "C4BR3.csv", "C4JR1.csv", "simpleJR1.tsv"])
+@pytest.mark.parametrize("chunk_size", [7, csvhelper.CHUNK_SIZE])
+def test_incremental_same_as_eager(filename, chunk_size, monkeypatch):
+    monkeypatch.setattr(csvhelper, "CHUNK_SIZE", chunk_size)
+    path = data_path("data", filename)
+    delimiter = "\t" if filename.endswith(".tsv") else ","
+    assert _read(path, delimiter=delimiter, incremental=True) == _read(path, delimiter=delimiter)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1024])
+def test_incremental_line_endings(tmp_path, chunk_size, monkeypatch):
+    monkeypatch.setattr(csvhelper, "CHUNK_SIZE", chunk_size)
+    path = tmp_path / "lines.csv"
+    path.write_bytes(b'a,b\r\nc,"d\r\ne"\rf,g\nh,i')
+    assert _read(str(path), incremental=True) == [
+        ["a", "b"],
+        ["c", "d\r\ne"],
+        ["f", "g"],
+        ["h", "i"],
+    ]
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_fallback_encoding(tmp_path, incremental, monkeypatch):
+    monkeypatch.setattr(csvhelper, "CHUNK_SIZE", 4)
+    path = tmp_path / "latin.csv"
+    path.write_bytes("Title,Publisher\nCafé,Björk\n".encode("latin-1"))
+    reader = csvhelper.UnicodeReader(str(path), incremental=incremental)
+    with pytest.warns(UserWarning, match="falling back"):
+        with reader:
+            rows = list(reader)
+    assert rows == [["Title", "Publisher"], ["Café", "Björk"]]
+    assert reader.encoding == "latin-1"
+
+
+def test_incremental_no_fallback_needed(tmp_path):
+    path = tmp_path / "utf8.csv"
+    path.write_bytes("Title\nCafé\n".encode("utf-8"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert _read(str(path), incremental=True) == [["Title"], ["Café"]]
+
+
+@pytest.mark.parametrize("chunk_size", [5, 1024])
+def test_fallback_after_utf8_in_same_chunk(tmp_path, chunk_size, monkeypatch):
+    monkeypatch.setattr(csvhelper, "CHUNK_SIZE", chunk_size)
+    path = tmp_path / "mixed.csv"
+    path.write_bytes("Café,Müller\n".encode("utf-8") + "Björk\n".encode("latin-1"))
+    with pytest.warns(UserWarning):
+        rows = _read(str(path), incremental=True)
+    assert rows == [["Café", "Müller"], ["Björk"]]
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+@pytest.mark.parametrize("encoding", ["utf-8", "latin-1"])
+def test_file_object_read_from_position(incremental, encoding):
+    fileobj = io.BytesIO(b"preamble\n" + "Title\nCaf\u00e9\n".encode(encoding))
+    fileobj.readline()
+    reader = csvhelper.UnicodeReader(fileobj, incremental=incremental)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with reader:
+            rows = list(reader)
+    assert rows == [["Title"], ["Caf\u00e9"]]
+    assert reader.encoding == encoding
+    # file objects passed in are left open
+    assert not fileobj.closed
@@ -0,0 +1,50 @@
+"""Tests for diagnostic dumps."""
+
+import logging
+
+import pytest
+from lxml import etree
+
+from celus_pycounter import diagnostics
+
+
+@pytest.fixture(autouse=True)
+def reset_settings():
+    yield
+    diagnostics.configure(max_size=diagnostics.DEFAULT_MAX_SIZE, sample_rate=1.0)
+
+
+def test_not_serialized_when_disabled(caplog):
+    def payload():
+        raise AssertionError("payload serialized")
+
+    caplog.set_level(logging.INFO)
+    diagnostics.dump(logging.getLogger("test"), "dump: %s", payload)
+    assert not caplog.records
+
+
+def test_dump(caplog):
+    caplog.set_level(logging.DEBUG)
+    diagnostics.dump(logging.getLogger("test"), "dump: %s %s", b"abc", etree.fromstring("<a/>"))
+    assert caplog.messages == ["dump: abc <a/>"]
+
+
+def test_truncated(caplog):
+    diagnostics.configure(max_size=5)
+    caplog.set_level(logging.DEBUG)
+    diagnostics.dump(logging.getLogger("test"), "dump: %s", "x" * 100)
+    assert caplog.messages == ["dump: xxxxx... [truncated]"]
+    assert str(diagnostics.Payload(b"\xc3\xa9" * 10, max_size=2)) == "\xe9\xe9... [truncated]"
+
+
+def test_sampled(caplog):
+    diagnostics.configure(sample_rate=0)
+    caplog.set_level(logging.DEBUG)
+    diagnostics.dump(logging.getLogger("test"), "dump: %s", b"abc")
+    assert not caplog.records
+
+
+@pytest.mark.parametrize("kwargs", [{"max_size": -1}, {"sample_rate": 2}])
+def test_configure_invalid(kwargs):
+    with pytest.raises(ValueError):
+        diagnostics.configure(**kwargs)
@@ -0,0 +1,214 @@
+"""Tests for concurrent harvesting of reports."""
+
+import datetime
+import threading
+import time
+
+import mock
+import pytest
+import requests
+from httmock import HTTMock, all_requests
+
+import celus_pycounter.exceptions
+from celus_pycounter import harvest, polling, throttle
+from tests.conftest import read_data
+
+SIMPLE = read_data("data", "sushi_simple.xml")
+QUEUED = read_data("data", "sushi_queued.xml")
+ERROR = read_data("data", "sushi_error.xml")
+SIMPLE5 = read_data("counter5", "data", "sushi_simple.json")
+
+NO_WAIT = polling.PollingStrategy(initial_delay=0, jitter=0)
+
+
+def _job(url, report="JR1", **kwargs):
+    return harvest.HarvestJob(
+        url, report, datetime.date(2015, 1, 1), datetime.date(2015, 1, 31), **kwargs
+    )
+
+
+class Server:
+    """Mock SUSHI servers counting concurrent requests per host."""
+
+    def __init__(self, responses=None, delay=0.02):
+        # host -> list of responses to give before SIMPLE
+        self.responses = responses or {}
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.max_active = {}
+        self.max_total = 0
+
+    def __call__(self, url, request_unused):
+        host = url.netloc
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+            self.max_total = max(self.max_total, sum(self.active.values()))
+            queue = self.responses.get(host)
+            response = queue.pop(0) if queue else SIMPLE
+        try:
+            time.sleep(self.delay)
+            if isinstance(response, Exception):
+                raise response
+            if isinstance(response, int):
+                # HTTP error status
+                return {"status_code": response, "content": b""}
+            return {"status_code": 200, "content": response}
+        finally:
+            with self.lock:
+                self.active[host] -= 1
+
+
+def test_harvest_limits_concurrency():
+    server = Server()
+    jobs = [_job(f"http://sushi{host}.example.com/") for host in range(3) for _ in range(4)]
+    with HTTMock(all_requests(server)):
+        results = harvest.harvest(jobs, max_workers=4, per_host=2)
+    assert len(results) == 12
+    assert all(result.error is None for result in results)
+    assert {result.report.report_type for result in results} == {"JR1"}
+    assert max(server.max_active.values()) <= 2
+    assert server.max_total <= 4
+
+
+def test_harvest_callback():
+    seen = []
+    with HTTMock(all_requests(Server(delay=0))):
+        results = harvest.harvest(
+            [_job("http://a.example.com/"), _job("http://b.example.com/")], callback=seen.append
+        )
+    assert seen == results
+
+
+def test_harvest_retries():
+    server = Server(
+        {"a.example.com": [requests.ConnectionError("reset"), requests.ConnectionError("reset")]},
+        delay=0,
+    )
+    with HTTMock(all_requests(server)):
+        (result,) = harvest.harvest(
+            [_job("http://a.example.com/")], retries=2, retry_strategy=NO_WAIT
+        )
+    assert result.error is None
+    assert result.attempts == 3
+
+
+def test_harvest_gives_up():
+    server = Server({"a.example.com": [requests.ConnectionError("reset")] * 3}, delay=0)
+    with HTTMock(all_requests(server)):
+        (result,) = harvest.harvest(
+            [_job("http://a.example.com/")], retries=1, retry_strategy=NO_WAIT
+        )
+    assert result.report is None
+    assert isinstance(result.error, requests.ConnectionError)
+    assert result.attempts == 2
+
+
+def test_harvest_no_retry_of_errors():
+    server = Server({"a.example.com": [ERROR]}, delay=0)
+    with HTTMock(all_requests(server)):
+        (result,) = harvest.harvest([_job("http://a.example.com/")], retry_strategy=NO_WAIT)
+    assert isinstance(result.error, celus_pycounter.exceptions.SushiException)
+    assert result.attempts == 1
+
+
+def test_harvest_queued():
+    server = Server({"a.example.com": [QUEUED, QUEUED]}, delay=0)
+    with HTTMock(all_requests(server)):
+        (result,) = harvest.harvest([_job("http://a.example.com/")], polling=NO_WAIT)
+    assert result.report.report_type == "JR1"
+    assert result.attempts == 3
+
+
+def test_iter_harvest_streams_results():
+    server = Server({"slow.example.com": [QUEUED]}, delay=0)
+    jobs = [
+        _job("http://slow.example.com/"),
+        _job("http://fast.example.com/"),
+    ]
+    with HTTMock(all_requests(server)):
+        results = list(
+            harvest.iter_harvest(jobs, polling=polling.PollingStrategy(initial_delay=0.2, jitter=0))
+        )
+    # the queued report does not hold up the other one
+    assert [result.job for result in results] == [jobs[1], jobs[0]]
+
+
+def test_harvest_sushi5():
+    @all_requests
+    def sushi5_mock(url, request_unused):
+        assert url.path == "/sushi/reports/TR_J1"
+        return {"status_code": 200, "content": SIMPLE5}
+
+    job = _job(
+        "http://c5.example.com/sushi",
+        "TR_J1",
+        release=5,
+        params={"customer_reference": "abc", "requestor_id": "def"},
+    )
+    with HTTMock(sushi5_mock):
+        (result,) = harvest.harvest([job])
+    assert result.error is None
+    assert result.report.report_type == "TR_J1"
+
+
+def test_harvest_hosts_case_insensitive():
+    server = Server()
+    jobs = [_job("http://A.example.com/"), _job("http://a.example.com/")] * 2
+    with HTTMock(all_requests(server)):
+        harvest.harvest(jobs, max_workers=4, per_host=1)
+    assert server.max_total == 1
+
+
+def test_harvest_retries_busy_responses():
+    server = Server({"a.example.com": [503, 429]}, delay=0)
+    with HTTMock(all_requests(server)):
+        (result,) = harvest.harvest(
+            [_job("http://a.example.com/")], retries=2, retry_strategy=NO_WAIT, polling=NO_WAIT
+        )
+    assert result.error is None
+    assert result.report.report_type == "JR1"
+
+
+def test_harvest_retries_open_circuit():
+    throttle.configure(failure_threshold=1, reset_timeout=0.05)
+    server = Server({"a.example.com": [503]}, delay=0)
+    try:
+        with HTTMock(all_requests(server)):
+            (result,) = harvest.harvest(
+                [_job("http://a.example.com/")],
+                retries=1,
+                retry_strategy=NO_WAIT,
+            )
+    finally:
+        throttle.disable()
+    # 503, then the open circuit, which does not use up the retry
+    assert result.error is None
+    assert result.attempts == 3
+
+
+def test_harvester_closes_own_session():
+    with harvest.Harvester() as harvester:
+        session = harvester.session
+    with mock.patch.object(session, "close") as close:
+        harvester.close()
+    close.assert_called_once_with()
+
+    session = requests.Session()
+    with mock.patch.object(session, "close") as close:
+        with harvest.Harvester(session=session):
+            pass
+    close.assert_not_called()
+
+
+def test_iter_harvest_closes_session():
+    with mock.patch("celus_pycounter.sessions.make_session") as make_session:
+        assert list(harvest.iter_harvest([])) == []
+    make_session.return_value.close.assert_called_once_with()
+
+
+@pytest.mark.parametrize("options", [{"per_host": 0}, {"max_workers": 0}])
+def test_harvester_invalid_limits(options):
+    with pytest.raises(ValueError):
+        harvest.Harvester(**options)
@@ -1,15 +1,25 @@
 """Tests for the helpers module"""
 
 import datetime
+import io
+import json
 
+import pendulum
 import pytest
 
 from celus_pycounter.helpers import (
+    SNIFF_SIZE,
     convert_covered,
+    convert_date_column,
     convert_date_run,
+    guess_type_from_content,
     is_first_last,
+    iter_json_object,
+    month_windows,
     next_month,
+    period_months,
     prev_month,
+    sniff_content,
 )
 
 
@@ -39,6 +49,28 @@ def test_prevmonth(pair):
     assert datetime.date(*pair[1]) == prev_month(datetime.date(*pair[0]))
 
 
+def test_period_months():
+    period = (datetime.date(2019, 11, 1), datetime.date(2020, 1, 31))
+    assert period_months(period) == (
+        datetime.date(2019, 11, 1),
+        datetime.date(2019, 12, 1),
+        datetime.date(2020, 1, 1),
+    )
+    assert period_months(period) is period_months(period)
+
+
+def test_month_windows():
+    start, end = datetime.date(2019, 11, 1), datetime.date(2020, 3, 31)
+    assert month_windows(start, end, 2) == [
+        (datetime.date(2019, 11, 1), datetime.date(2019, 12, 31)),
+        (datetime.date(2020, 1, 1), datetime.date(2020, 2, 29)),
+        (datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)),
+    ]
+    assert len(month_windows(start, end)) == 5
+    with pytest.raises(ValueError):
+        month_windows(start, end, 0)
+
+
 @pytest.mark.parametrize(
     "period,expected",
     [
@@ -71,3 +103,90 @@ def test_convert_covered(covered_line, expected):
 def test_convert_date_run(date_run, expected):
     expected_date = datetime.date(*expected)
     assert convert_date_run(date_run) == expected_date
+
+
+@pytest.mark.parametrize(
+    "date_run",
+    ["2017-01-31", "2016-02-29", "01/31/2017", "2017-01-31T10:00:00+01:00", "2017-1-5"],
+)
+def test_convert_date_run_fast_path(date_run):
+    """The fast path gives the same results as pendulum."""
+    expected = pendulum.parse(date_run, strict=False).date()
+    assert convert_date_run(date_run) == expected
+    assert type(convert_date_run(date_run)) is type(expected)
+
+
+def test_convert_date_run_invalid():
+    with pytest.raises(ValueError):
+        convert_date_run("2017-02-30")
+
+
+def test_convert_date_column():
+    assert convert_date_column("Jan-2014") == datetime.date(2014, 1, 1)
+    assert convert_date_column(" Feb-14") == datetime.date(2014, 2, 1)
+    assert convert_date_column(datetime.datetime(2014, 3, 1)) == datetime.date(2014, 3, 1)
+
+
+@pytest.mark.parametrize(
+    "prefix,filetype",
+    [
+        (b"PK\x03\x04", "xlsx"),
+        (b"\x1f\x8b\x08", "gzip"),
+        (b'\xef\xbb\xbf<?xml version="1.0"?>', "xml"),
+        (b"\n  <soap:Envelope>", "xml"),
+        (b'{"Report_Header": {}}', "json"),
+        (b"Journal Report 1 (R4)\tNumber of Successful", "tsv"),
+        (b"Journal Report 1 (R4),Number of Successful", "csv"),
+        (b"", "csv"),
+    ],
+)
+def test_sniff_content(prefix, filetype):
+    assert sniff_content(prefix) == filetype
+
+
+def test_guess_type_reads_prefix_only():
+    file_obj = io.BytesIO(b"a,b\n" * SNIFF_SIZE + b"\t")
+    assert guess_type_from_content(file_obj) == "csv"
+    assert file_obj.tell() == SNIFF_SIZE
+
+
+JSON_DOCUMENT = {
+    "Header": {"Name": "r\u00e9port \u2603", "Release": 5},
+    "Items": [{"Count": 12345}, {"Count": 0.5, "Tags": ["a", "b"]}, [], "x"],
+    "Total": 1234567,
+    "Empty": [],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+def test_iter_json_object(chunk_size):
+    stream = io.BytesIO(json.dumps(JSON_DOCUMENT, ensure_ascii=False, indent=1).encode("utf-8"))
+    pairs = []
+    for key, value in iter_json_object(stream, ("Items", "Empty"), chunk_size):
+        if key in ("Items", "Empty"):
+            value = list(value)
+        pairs.append((key, value))
+    assert dict(pairs) == JSON_DOCUMENT
+    assert [key for key, _ in pairs] == list(JSON_DOCUMENT)
+
+
+def test_iter_json_object_lazy():
+    stream = io.BytesIO(b"\xef\xbb\xbf" + json.dumps(JSON_DOCUMENT).encode("utf-8"))
+    pairs = iter_json_object(stream, ("Items",), chunk_size=16)
+    assert next(pairs) == ("Header", JSON_DOCUMENT["Header"])
+    key, items = next(pairs)
+    assert key == "Items"
+    assert next(items) == {"Count": 12345}
+    # the rest of the items is skipped
+    assert next(pairs) == ("Total", 1234567)
+
+
+def test_iter_json_object_text_and_empty():
+    assert list(iter_json_object(io.StringIO(" { } "))) == []
+    assert list(iter_json_object(io.StringIO('{"a": [1, 2]}'))) == [("a", [1, 2])]
+
+
+@pytest.mark.parametrize("document", ["[1, 2]", '{"a": 1', '{"a" 1}', '{"a": 1,}', ""])
+def test_iter_json_object_invalid(document):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_object(io.StringIO(document), chunk_size=2))
@@ -0,0 +1,97 @@
+"""Tests for lazily parsing COUNTER reports."""
+
+import mock
+import pytest
+
+from celus_pycounter import csvhelper, report
+from celus_pycounter.exceptions import PycounterException
+from tests.conftest import data_path
+
+FILES = [
+    "C4BR1.tsv",
+    "C4BR3.csv",
+    "C4DB2.tsv",
+    "C4JR1.csv",
+    "C4JR1GOA.csv",
+    "C4JR2.csv",
+    "C4MR1.tsv",
+    "JR1.xlsx",
+    "PR1.tsv",
+    "tsvC4JR1",
+]
+
+
+def _attributes(resource):
+    return {
+        name: getattr(resource, name)
+        for cls in type(resource).__mro__
+        for name in getattr(cls, "__slots__", ())
+    }
+
+
+@pytest.mark.parametrize("filename", FILES)
+def test_same_as_parse(filename):
+    expected = report.parse(data_path("data", filename))
+    with report.iter_parse(data_path("data", filename)) as stream:
+        assert stream.report.report_type == expected.report_type
+        assert stream.report.period == expected.period
+        assert stream.report.customer == expected.customer
+        assert stream.report.pubs == []
+        resources = list(stream)
+
+    assert [_attributes(pub) for pub in resources] == [_attributes(pub) for pub in expected.pubs]
+
+
+@pytest.mark.parametrize(
+    "filename, resource_class",
+    [
+        ("C4BR1.tsv", report.CounterBook),
+        ("C4BR2.tsv", report.CounterBook),
+        ("C4BR3.csv", report.CounterBook),
+        ("C4DB1.tsv", report.CounterDatabase),
+        ("C4DB2.tsv", report.CounterDatabase),
+        ("C4JR1.csv", report.CounterJournal),
+        ("C4JR1a.csv", report.CounterJournal),
+        ("C4JR1GOA.csv", report.CounterJournal),
+        ("C4JR2.csv", report.CounterJournal),
+        ("C4MR1.tsv", report.CounterMultimedia),
+        ("PR1.tsv", report.CounterPlatform),
+    ],
+)
+def test_row_plan(filename, resource_class):
+    """Each report type gets its resources from a single plan, with usage from its month columns."""
+    with mock.patch.object(report, "_RowPlan", wraps=report._RowPlan) as row_plan:
+        parsed = report.parse(data_path("data", filename))
+    assert row_plan.call_count == 1
+
+    delimiter = "\t" if filename.endswith(".tsv") else ","
+    with csvhelper.UnicodeReader(data_path("data", filename), delimiter=delimiter) as reader:
+        rows = list(reader)
+    months = parsed.month_grid
+    first_month_col = rows[7].index(months[0].strftime("%b-%Y"))
+    data_rows = [row for row in rows[8:] if row and not row[0].startswith("Total")]
+    assert len(parsed.pubs) == len(data_rows)
+    for pub, row in zip(parsed.pubs, data_rows):
+        assert type(pub) is resource_class
+        cells = row[first_month_col : first_month_col + len(months)]
+        assert {month: usage for month, _, usage in pub} == {
+            month: int(cell or 0) for month, cell in zip(months, cells)
+        }
+
+
+def test_lazy():
+    with report.iter_parse(data_path("data", "C4JR1.csv")) as stream:
+        first = next(iter(stream))
+    assert first.title == "Abstracts of Working Papers in Economics"
+
+
+def test_c5():
+    path = data_path("counter5", "data", "tr_j1.tsv")
+    with report.iter_parse(path) as stream:
+        assert stream.report.report_type == "TR_J1"
+        assert len(list(stream)) == len(report.parse(path).pubs)
+
+
+def test_bogus_file_type():
+    with pytest.raises(PycounterException):
+        report.iter_parse("no_such_file", "qsx")
@@ -1,7 +1,14 @@
 """Test COUNTER JR1 journal report (Excel)"""
 
+import io
+import re
+import zipfile
+
 import pytest
 
+from celus_pycounter import report
+from tests.conftest import data_path
+
 
 def test_report_type(jr1_report_xlsx):
     assert jr1_report_xlsx.report_type == "JR1"
@@ -33,3 +40,18 @@ def test_platform(jr1_report_xlsx):
 def test_stats(jr1_report_xlsx, pub_number, expected):
     publication = jr1_report_xlsx.pubs[pub_number]
     assert [x[2] for x in publication] == expected
+
+
+def test_bogus_dimension():
+    """Sheets declaring an "A1" dimension are read completely."""
+    path = data_path("data", "JR1.xlsx")
+    fixed = io.BytesIO()
+    with zipfile.ZipFile(path) as zip_in, zipfile.ZipFile(fixed, "w") as zip_out:
+        for item in zip_in.infolist():
+            data = zip_in.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1"', data)
+            zip_out.writestr(item, data)
+
+    rpt = report.parse(fixed.getvalue(), filetype="xlsx")
+    assert rpt.as_generic() == report.parse(path).as_generic()
@@ -1,8 +1,13 @@
 """Check data in common output formats."""
 
+import json
 from datetime import date
 
+import pytest
+
+from celus_pycounter import report as report_module
 from celus_pycounter.report import CounterBook, CounterReport
+from tests.conftest import data_path
 
 
 def _check_lines(a, b):
@@ -83,6 +88,101 @@ def test_totals_sparse_data(tmp_path):
     assert numbers == [0, 3, 5], "check counts for book 1"
 
 
+@pytest.mark.parametrize("filename", ["C4DB2.tsv", "C4BR3.csv", "C4JR2.csv"])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_totals_per_metric(filename, columnar):
+    report = report_module.parse(data_path("data", filename))
+    if columnar:
+        report.to_columnar()
+    months = report.month_grid
+    expected = {}
+    for pub in report.pubs:
+        usage = expected.setdefault(pub.metric, [0] * len(months))
+        for month, _, count in pub:
+            usage[months.index(month)] += count
+
+    totals = [line for line in report.as_generic()[8:] if line[0].startswith("Total")]
+    assert len(totals) == len(expected)
+    for line in totals:
+        metric = line[-len(months) - 2]
+        assert [int(cell) for cell in line[-len(months) :]] == expected[metric]
+        assert int(line[-len(months) - 1]) == sum(expected[metric])
+
+
+def test_totals_out_of_period_month():
+    """Usage in months without a column is left out of the totals."""
+    start = date(2019, 1, 1)
+    end = date(2019, 2, 28)
+    book = CounterBook(
+        period=(start, end),
+        title="Book 1",
+        month_data=[(date(2019, 1, 1), 3), (date(2019, 2, 1), 5), (date(2019, 3, 1), 7)],
+    )
+    report = CounterReport(report_type="BR2", period=(start, end))
+    report.pubs = [book]
+    totals = report.as_generic()[8]
+    assert totals[0].startswith("Total")
+    assert totals[-3:] == ["8", "3", "5"]
+
+
 def test_roundtrippable(all_reports, tmp_path):
     """Test that all of our parsable reports can also be output."""
     all_reports.write_tsv(str(tmp_path / "output.tsv"))
+
+
+def test_iter_generic():
+    start = date(2019, 1, 1)
+    end = date(2019, 3, 31)
+    report = CounterReport(report_type="BR2", period=(start, end))
+    report.pubs = [CounterBook(period=(start, end), title="Book 1")]
+    lines = report.iter_generic()
+    assert next(lines)[0] == "Book Report 2 (R4)"
+    assert [next(lines) for _ in range(9)] == report.as_generic()[1:]
+    assert next(lines, None) is None
+
+
+@pytest.mark.parametrize("format_", ["csv", "xlsx"])
+def test_writing_other_formats(report_file_output, tmp_path, format_):
+    report, _expected_data = report_file_output
+    path = str(tmp_path / ("outputfile." + format_))
+
+    report.write_to_file(path, format_)
+
+    assert report_module.parse(path).as_generic() == report.as_generic()
+
+
+def test_writing_jsonl(report_file_output, tmp_path):
+    report, _expected_data = report_file_output
+    path = str(tmp_path / "outputfile.jsonl")
+
+    report.write_to_file(path, "jsonl")
+
+    with open(path, encoding="utf-8") as new_file:
+        resources = [json.loads(line) for line in new_file]
+    assert len(resources) == len(report.pubs)
+    header = report.as_generic()[7]
+    month = header[-1]
+    for resource, line in zip(resources, report.as_generic()[-len(report.pubs) :]):
+        assert list(resource)[1:] == header[1:]
+        assert list(resource.values())[0] == line[0]
+        assert resource[month] == int(line[-1])
+
+
+@pytest.mark.parametrize("filename", ["tr_j1.tsv", "tr_j2.tsv"])
+def test_writing_jsonl_counter5(tmp_path, filename):
+    report = report_module.parse(data_path("counter5", "data", filename))
+    path = str(tmp_path / "outputfile.jsonl")
+
+    report.write_jsonl(path)
+
+    with open(path, encoding="utf-8") as new_file:
+        resources = [json.loads(line) for line in new_file]
+    pubs = sorted(report.pubs, key=lambda pub: pub.title)
+    assert len(resources) == len(pubs)
+    for resource, pub in zip(resources, pubs):
+        assert resource["Journal"] == pub.title
+        usage = {month.strftime("%b-%Y"): count for month, _, count in pub}
+        assert {key: resource[key] for key in usage} == usage
+        assert resource["Reporting Period Total"] == sum(usage.values())
+    if filename == "tr_j2.tsv":
+        assert resources[0]["Jan-2017"] == 3
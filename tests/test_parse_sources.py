@@ -0,0 +1,140 @@
+"""Tests for parsing reports from sources other than file paths."""
+
+import gzip
+import io
+
+import pytest
+
+from celus_pycounter import report
+from celus_pycounter.exceptions import PycounterException
+from celus_pycounter.helpers import MemoryReader, PrefixedReader
+from tests.conftest import data_path, read_data
+
+FILES = ["C4BR1.tsv", "C4JR1.csv", "JR1.xlsx", "csvC4JR1", "tsvC4JR1", "xlsxJR1"]
+
+
+class NonSeekable(io.RawIOBase):
+    """Binary stream that can only be read forwards, like a HTTP response."""
+
+    def __init__(self, data):
+        super().__init__()
+        self._data = io.BytesIO(data)
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = self._data.readinto(buffer)
+        self.bytes_read += size
+        return size
+
+
+def _content(filename):
+    with open(data_path("data", filename), "rb") as datafile:
+        return datafile.read()
+
+
+def _generic(rpt):
+    return [pub.as_generic() for pub in rpt]
+
+
+@pytest.mark.parametrize("filename", FILES)
+@pytest.mark.parametrize(
+    "make_source",
+    [
+        bytes,
+        bytearray,
+        memoryview,
+        io.BytesIO,
+        lambda data: io.BufferedReader(NonSeekable(data)),
+    ],
+)
+def test_parse_in_memory(filename, make_source):
+    expected = report.parse(data_path("data", filename))
+    rpt = report.parse(make_source(_content(filename)))
+    assert rpt.report_type == expected.report_type
+    assert _generic(rpt) == _generic(expected)
+
+
+@pytest.mark.parametrize("filename", FILES)
+def test_parse_mmap(filename):
+    expected = report.parse(data_path("data", filename))
+    assert _generic(report.parse(data_path("data", filename), use_mmap=True)) == _generic(expected)
+
+
+def test_explicit_filetype():
+    rpt = report.parse(_content("C4JR1.csv"), filetype="csv")
+    assert rpt.report_type == "JR1"
+
+
+@pytest.mark.parametrize(
+    "content,sniffed",
+    [
+        (read_data("data", "sushi_simple.xml"), "XML"),
+        (read_data("counter5", "data", "sushi_simple.json"), "JSON"),
+        (gzip.compress(read_data("data", "C4JR1.csv")), "GZIP"),
+    ],
+    ids=["xml", "json", "gzip"],
+)
+@pytest.mark.filterwarnings("ignore:Decoding with")
+def test_not_tabular(tmp_path, content, sniffed):
+    path = tmp_path / "report"
+    path.write_bytes(content)
+    for source in (content, str(path)):
+        with pytest.raises(PycounterException, match="looks like %s" % sniffed):
+            report.parse(source)
+        with pytest.raises(PycounterException, match="looks like %s" % sniffed):
+            report.iter_parse(source)
+
+
+@pytest.mark.parametrize("filename", ["C4JR1.csv", "C4BR1.tsv"])
+@pytest.mark.parametrize("start", [b"<", b"{", b"["])
+def test_tabular_looking_like_other_type(filename, start):
+    """Tables starting like XML or JSON are still parsed."""
+    content = start + read_data("data", filename)
+    expected = report.parse(data_path("data", filename))
+    assert _generic(report.parse(content)) == _generic(expected)
+    with report.iter_parse(content) as stream:
+        assert [pub.as_generic() for pub in stream] == _generic(expected)
+
+
+def test_iter_parse_bytes():
+    with report.iter_parse(_content("C4BR1.tsv")) as stream:
+        assert stream.report.report_type == "BR1"
+        assert len(list(stream)) == len(report.parse(data_path("data", "C4BR1.tsv")).pubs)
+
+
+def test_memory_reader():
+    reader = MemoryReader(memoryview(b"0123456789"))
+    assert reader.read(3) == b"012"
+    assert reader.seek(-2, io.SEEK_END) == 8
+    assert reader.read() == b"89"
+    assert reader.read(5) == b""
+    reader.seek(1)
+    assert reader.tell() == 1
+    with pytest.raises(ValueError):
+        reader.seek(-1)
+
+
+@pytest.mark.parametrize("filename", ["csvC4JR1", "tsvC4JR1"])
+def test_stream_read_once(filename):
+    """Bytes read while sniffing a stream are reused for parsing."""
+    content = _content(filename)
+    stream = NonSeekable(content)
+    rpt = report.parse(stream)
+    assert stream.bytes_read == len(content)
+    assert _generic(rpt) == _generic(report.parse(data_path("data", filename)))
+
+
+def test_unsupported_content():
+    with pytest.raises(PycounterException):
+        report.parse(b'<?xml version="1.0"?><ReportResponse/>')
+
+
+def test_prefixed_reader():
+    reader = PrefixedReader(b"0123", io.BytesIO(b"456789"))
+    assert reader.read(3) == b"012"
+    assert reader.read(3) == b"3"
+    assert reader.read() == b"456789"
+    assert reader.read() == b""
@@ -0,0 +1,239 @@
+"""Tests for polling of queued reports."""
+
+import datetime
+import email.utils
+import json
+
+import mock
+import pytest
+from httmock import HTTMock, all_requests
+
+import celus_pycounter.exceptions
+from celus_pycounter import polling, sushi
+from tests.conftest import read_data
+
+
+def test_backoff():
+    strategy = polling.PollingStrategy(initial_delay=10, multiplier=2, max_delay=50, jitter=0)
+    assert [strategy.next_delay(attempts) for attempts in range(1, 6)] == [10, 20, 40, 50, 50]
+
+
+def test_jitter():
+    strategy = polling.PollingStrategy(initial_delay=10, jitter=0.5)
+    delays = {strategy.next_delay(1) for _ in range(20)}
+    assert len(delays) > 1
+    assert all(5 <= delay <= 15 for delay in delays)
+
+
+def test_budget():
+    strategy = polling.PollingStrategy(initial_delay=10, jitter=0, max_attempts=3, deadline=100)
+    assert strategy.next_delay(2) == 20
+    assert strategy.next_delay(3) is None
+    assert strategy.next_delay(2, elapsed=90) is None
+
+
+def test_retry_after():
+    strategy = polling.PollingStrategy(initial_delay=10, jitter=0)
+    assert strategy.next_delay(1, retry_after=30) == 30
+    assert strategy.next_delay(1, retry_after=5) == 10
+
+
+def test_retry_after_ignored():
+    strategy = polling.PollingStrategy(initial_delay=10, jitter=0, use_retry_after=False)
+    assert strategy.next_delay(1, retry_after=30) == 10
+    assert polling.NO_DELAY.next_delay(1, retry_after=30) == 0
+
+
+def test_default_deadline():
+    strategy = polling.PollingStrategy()
+    assert strategy.deadline is not None
+    assert strategy.next_delay(1, elapsed=strategy.deadline) is None
+
+
+def test_parse_retry_after():
+    assert polling.parse_retry_after("120") == 120
+    assert polling.parse_retry_after(None) is None
+    assert polling.parse_retry_after("soon") is None
+    later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=100)
+    assert 90 < polling.parse_retry_after(email.utils.format_datetime(later)) <= 100
+    assert polling.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+@pytest.mark.parametrize(
+    "exc,retryable",
+    [
+        (celus_pycounter.exceptions.ServiceBusyError("Report Queued"), True),
+        (celus_pycounter.exceptions.Sushi5Error("Queued", "Info", 1011), True),
+        (celus_pycounter.exceptions.Sushi5Error("Too many requests", "Error", "1020"), True),
+        (celus_pycounter.exceptions.Sushi5Error("Not authorized", "Error", 2000), False),
+        (celus_pycounter.exceptions.TooManyRequestsError("HTTP 429"), True),
+        (celus_pycounter.exceptions.SushiException("report not found"), False),
+    ],
+)
+def test_is_retryable(exc, retryable):
+    assert polling.is_retryable(exc) is retryable
+
+
+def test_pending_report():
+    results = [celus_pycounter.exceptions.ServiceBusyError("Report Queued"), "report"]
+
+    def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    pending = polling.PendingReport(
+        fetch, polling.PollingStrategy(initial_delay=1000, max_delay=1000, jitter=0)
+    )
+    assert pending.poll() is None
+    assert 990 < pending.wait_time <= 1000
+    # too early, fetch is not called
+    assert pending.poll() is None
+    assert len(results) == 1
+    pending.next_poll = 0
+    assert pending.poll() == "report"
+    assert pending.done
+    assert pending.attempts == 2
+
+
+def test_pending_report_budget():
+    def fetch():
+        raise celus_pycounter.exceptions.ServiceBusyError("Report Queued")
+
+    pending = polling.PendingReport(fetch, polling.PollingStrategy(initial_delay=0, max_attempts=2))
+    assert pending.poll() is None
+    with pytest.raises(celus_pycounter.exceptions.ServiceBusyError):
+        pending.poll()
+
+
+def _sushi5_response(filename):
+    return json.loads(read_data("counter5", "data", filename))
+
+
+@all_requests
+def queued5_mock(url_unused, request_unused):
+    if queued5_mock.queued:
+        queued5_mock.queued -= 1
+        response = _sushi5_response("not_authorized.json")
+        response["Report_Header"]["Exceptions"][0]["Code"] = 1011
+        return {"status_code": 200, "content": response, "headers": {"Retry-After": "30"}}
+    return {"status_code": 200, "content": _sushi5_response("sushi_simple.json")}
+
+
+class FakeClock:
+    """Replaces time.monotonic and time.sleep, sleeping without waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake_clock = FakeClock()
+    with mock.patch("time.monotonic", fake_clock.monotonic):
+        with mock.patch("time.sleep", fake_clock.sleep):
+            yield fake_clock
+
+
+def test_get_report_sushi5_queued(clock):
+    queued5_mock.queued = 2
+    with HTTMock(queued5_mock):
+        rpt = sushi.get_report(
+            url="http://www.example.com/Sushi",
+            start_date=datetime.date(2019, 1, 1),
+            end_date=datetime.date(2019, 2, 28),
+            release=5,
+            report="TR_J1",
+            polling=polling.PollingStrategy(initial_delay=1, jitter=0),
+        )
+    assert rpt.report_type == "TR_J1"
+    assert clock.sleeps == [30, 30]
+
+
+def test_get_report_sushi5_budget(clock):
+    queued5_mock.queued = 5
+    with HTTMock(queued5_mock):
+        with pytest.raises(celus_pycounter.exceptions.Sushi5Error):
+            sushi.get_report(
+                url="http://www.example.com/Sushi",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 2, 28),
+                release=5,
+                polling=polling.PollingStrategy(initial_delay=1, max_attempts=3),
+            )
+    assert queued5_mock.queued == 2
+
+
+def test_get_report_sushi5_queued_no_delay(clock):
+    queued5_mock.queued = 2
+    with HTTMock(queued5_mock):
+        rpt = sushi.get_report(
+            url="http://www.example.com/Sushi",
+            start_date=datetime.date(2019, 1, 1),
+            end_date=datetime.date(2019, 2, 28),
+            release=5,
+            no_delay=True,
+        )
+    assert rpt.report_type == "TR_J1"
+    assert queued5_mock.queued == 0
+    # Retry-After is ignored
+    assert clock.sleeps == []
+
+
+def test_get_report_sushi4_queued_retry_after(clock):
+    responses = [read_data("data", "sushi_queued.xml"), read_data("data", "sushi_simple.xml")]
+
+    @all_requests
+    def queued4_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": responses.pop(0), "headers": {"Retry-After": "30"}}
+
+    with HTTMock(queued4_mock):
+        rpt = sushi.get_report(
+            "http://www.example.com/Sushi",
+            datetime.date(2015, 1, 1),
+            datetime.date(2015, 1, 31),
+            polling=polling.PollingStrategy(initial_delay=1, jitter=0),
+        )
+    assert rpt.report_type == "JR1"
+    assert clock.sleeps == [30]
+
+
+@pytest.mark.parametrize(
+    "status,content,stream",
+    [
+        (429, b"Too Many Requests", False),
+        (429, b"Too Many Requests", True),
+        # exception alone, without a report header
+        (200, {"Code": 1020, "Severity": "Error", "Message": "Too many requests"}, False),
+        (200, {"Code": 1020, "Severity": "Error", "Message": "Too many requests"}, True),
+        (200, [{"Code": 1020, "Severity": "Error", "Message": "Too many requests"}], False),
+    ],
+)
+def test_get_report_sushi5_too_many_requests(clock, status, content, stream):
+    responses = [(status, content), (200, _sushi5_response("sushi_simple.json"))]
+
+    @all_requests
+    def busy_mock(url_unused, request_unused):
+        status, content = responses.pop(0)
+        return {"status_code": status, "content": content, "headers": {"Retry-After": "30"}}
+
+    with HTTMock(busy_mock):
+        rpt = sushi.get_report(
+            url="http://www.example.com/Sushi",
+            start_date=datetime.date(2019, 1, 1),
+            end_date=datetime.date(2019, 2, 28),
+            release=5,
+            stream=stream,
+            polling=polling.PollingStrategy(initial_delay=1, jitter=0),
+        )
+    assert rpt.report_type == "TR_J1"
+    assert clock.sleeps == [30]
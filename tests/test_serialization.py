@@ -0,0 +1,62 @@
+"""Tests for compact serialization of reports and parallel parsing."""
+
+import pickle
+
+import pytest
+
+from celus_pycounter import report, serialization
+from tests.conftest import data_path, parse_sushi_file
+
+
+def _state(rpt):
+    return (
+        serialization.report_state(rpt),
+        [(type(pub), serialization.resource_state(pub), list(pub)) for pub in rpt.pubs],
+    )
+
+
+def test_round_trip(all_reports):
+    loaded = serialization.loads(serialization.dumps(all_reports))
+    assert _state(loaded) == _state(all_reports)
+    assert vars(loaded).keys() == vars(all_reports).keys()
+    assert {name: value for name, value in vars(loaded).items() if name != "pubs"} == {
+        name: value for name, value in vars(all_reports).items() if name != "pubs"
+    }
+    assert loaded.as_generic() == all_reports.as_generic()
+
+
+def test_round_trip_year():
+    rpt = report.parse(data_path("data", "C4JR1.csv"))
+    assert rpt.year == 2011
+    assert serialization.loads(serialization.dumps(rpt)).year == 2011
+
+
+@pytest.mark.parametrize("filename", ["sushi_simple.xml", "sushi_simple_br1.xml", "sushi_jr2.xml"])
+def test_round_trip_sushi(filename):
+    rpt = parse_sushi_file(filename)
+    assert _state(serialization.loads(serialization.dumps(rpt))) == _state(rpt)
+
+
+def test_round_trip_columnar():
+    rpt = report.parse(data_path("data", "C4JR1my.csv"), use_columnar=True)
+    loaded = serialization.loads(serialization.dumps(rpt))
+    assert loaded.usage_matrix.backend == rpt.usage_matrix.backend
+    assert loaded.as_generic() == rpt.as_generic()
+
+
+def test_smaller_than_pickle(big_multiyear):
+    assert len(serialization.dumps(big_multiyear)) < len(pickle.dumps(big_multiyear))
+
+
+def test_parse_many():
+    filenames = [
+        data_path("data", name) for name in ("C4BR1.tsv", "C4JR1.csv", "JR1.xlsx", "no_such_file")
+    ]
+    results = {result.filename: result for result in report.parse_many(filenames, workers=2)}
+
+    assert set(results) == set(filenames)
+    for filename in filenames[:3]:
+        assert results[filename].error is None
+        assert results[filename].report.as_generic() == report.parse(filename).as_generic()
+    assert results[filenames[3]].report is None
+    assert isinstance(results[filenames[3]].error, OSError)
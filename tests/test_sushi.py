@@ -10,9 +10,11 @@ import mock
 import pytest
 from click.testing import CliRunner
 from httmock import HTTMock, urlmatch
+from lxml import objectify
 
 import celus_pycounter.exceptions
 from celus_pycounter import report, sushi, sushiclient
+from tests.conftest import read_data
 
 
 @urlmatch(netloc=r"(.*\.)?example\.com$")
@@ -344,6 +346,51 @@ def test_sushi_client_queued_report():
             assert result.exit_code == 0
 
 
+def test_raw_to_full_str():
+    """Unicode strings are parsed like bytes."""
+    raw = read_data("data", "sushi_simple.xml")
+    text = raw.decode("utf-8").replace('<?xml version="1.0" ?>', "")
+    assert sushi.raw_to_full(text).as_generic() == sushi.raw_to_full(raw).as_generic()
+
+
+def test_raw_to_full_queued():
+    with pytest.raises(celus_pycounter.exceptions.ServiceBusyError):
+        sushi.raw_to_full(read_data("data", "sushi_queued.xml"))
+
+
+def test_raw_to_full_not_found():
+    with pytest.raises(celus_pycounter.exceptions.SushiException) as excinfo:
+        sushi.raw_to_full(read_data("data", "sushi_error.xml"))
+    xml = excinfo.value.xml
+    assert isinstance(xml, objectify.ObjectifiedElement)
+    response = xml.Body[sushi.ns("sushicounter", "ReportResponse")]
+    assert response[sushi.ns("sushi", "Exception")].Number == 3030
+
+
+def test_raw_to_full_dumps_report_element(caplog):
+    caplog.set_level(logging.DEBUG, logger="celus_pycounter.sushi")
+    raw = read_data("data", "sushi_simple.xml")
+    rpt = sushi.raw_to_full(raw)
+    (message,) = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("COUNTER report")
+    ]
+    assert "Journal of fake data" in message
+    assert "exampleRequestor" not in message
+    # the report is complete even though the dumped element is parsed again
+    assert len(rpt.pubs) == len(sushi.raw_to_full(raw).pubs)
+
+
+def test_raw_to_full_reports_wrapper():
+    """Report may be wrapped in a Reports element."""
+    raw = read_data("data", "sushi_simple.xml")
+    wrapped = raw.replace(b"<ns3:Report>", b"<ns3:Report><Reports>").replace(
+        b"</ns3:Report>", b"</Reports></ns3:Report>"
+    )
+    assert sushi.raw_to_full(wrapped).as_generic() == sushi.raw_to_full(raw).as_generic()
+
+
 def test_missing_issn(sushi_missing_ii):
     publication = next(iter(sushi_missing_ii))
     assert publication.issn == ""
@@ -547,3 +594,42 @@ class TestRAWMR1(unittest.TestCase):
             "0",
             "1",
         ]
+
+
+@pytest.mark.parametrize(
+    "status,exc_class",
+    [
+        (429, celus_pycounter.exceptions.TooManyRequestsError),
+        (503, celus_pycounter.exceptions.ServiceNotAvailableError),
+    ],
+)
+def test_busy_http_status(status, exc_class):
+    @urlmatch(netloc=r"(.*\.)?example\.com$")
+    def busy_mock(url_unused, request_unused):
+        return {"status_code": status, "content": b"busy", "headers": {"Retry-After": "120"}}
+
+    with HTTMock(busy_mock):
+        with pytest.raises(exc_class) as excinfo:
+            sushi.get_sushi_stats_raw(
+                "http://www.example.com/Sushi",
+                datetime.date(2015, 1, 1),
+                datetime.date(2015, 1, 31),
+            )
+    assert excinfo.value.retry_after == 120
+    assert excinfo.value.raw == b"busy"
+
+
+@pytest.mark.parametrize(
+    "number,exc_class",
+    [
+        (1000, celus_pycounter.exceptions.ServiceNotAvailableError),
+        (1010, celus_pycounter.exceptions.ServiceBusyError),
+        (1020, celus_pycounter.exceptions.TooManyRequestsError),
+    ],
+)
+def test_raw_to_full_busy(number, exc_class):
+    raw = read_data("data", "sushi_error.xml").replace(b"3030", str(number).encode())
+    with pytest.raises(exc_class) as excinfo:
+        sushi.raw_to_full(raw)
+    assert excinfo.value.code == number
+    assert str(excinfo.value) == "No Usage Available for Requested Dates"
@@ -0,0 +1,280 @@
+"""Tests for rate limiting and circuit breaking of SUSHI requests."""
+
+import asyncio
+import datetime
+
+import httpx
+import mock
+import pytest
+import requests
+from httmock import HTTMock, all_requests
+
+import celus_pycounter.exceptions
+from celus_pycounter import polling, sushi, throttle
+from tests.conftest import read_data
+
+
+class FakeClock:
+    """Replaces time.monotonic and time.sleep, sleeping without waiting."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake_clock = FakeClock()
+    with mock.patch("time.monotonic", fake_clock.monotonic):
+        with mock.patch("time.sleep", fake_clock.sleep):
+            yield fake_clock
+
+
+@pytest.fixture(autouse=True)
+def no_throttle():
+    yield
+    throttle.disable()
+
+
+def test_token_bucket(clock):
+    bucket = throttle.TokenBucket(rate=2, burst=2)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_circuit_breaker(clock):
+    breaker = throttle.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(celus_pycounter.exceptions.CircuitOpenError) as excinfo:
+        breaker.check()
+    assert excinfo.value.retry_after == 30
+
+    clock.now += 30
+    # one trial request is let through
+    breaker.check()
+    with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+        breaker.check()
+    breaker.record_failure()
+    with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+        breaker.check()
+
+    clock.now += 30
+    breaker.check()
+    breaker.record_success()
+    breaker.check()
+    assert breaker.state == breaker.CLOSED
+
+
+def test_success_resets_failures():
+    breaker = throttle.CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.check()
+
+
+@pytest.mark.parametrize(
+    "exc,failure",
+    [
+        (requests.ConnectionError("reset"), True),
+        (celus_pycounter.exceptions.Sushi5Error("Service Busy", "Error", 1010), True),
+        (celus_pycounter.exceptions.Sushi5Error("Queued", "Info", 1011), False),
+        (celus_pycounter.exceptions.ServiceBusyError("Report Queued"), False),
+        (celus_pycounter.exceptions.RequestorNotAuthorizedError("no"), False),
+        (ValueError("bad JSON"), False),
+        (httpx.ConnectError("refused"), True),
+        (httpx.ReadTimeout("timed out"), True),
+        (asyncio.CancelledError(), False),
+    ],
+)
+def test_is_failure(exc, failure):
+    assert throttle.is_failure(exc) is failure
+
+
+def test_disabled_by_default():
+    with throttle.guard("http://www.example.com/") as guard:
+        assert guard.bucket is None
+        assert guard.breaker is None
+
+
+def _get_sushi_stats_raw(url="http://www.example.com/Sushi", **kwargs):
+    return sushi.get_sushi_stats_raw(
+        url, datetime.date(2015, 1, 1), datetime.date(2015, 1, 31), **kwargs
+    )
+
+
+def test_rate_limit_per_host(clock):
+    throttle.configure(rate=1, burst=1)
+
+    @all_requests
+    def ok_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": b"<xml/>"}
+
+    with HTTMock(ok_mock):
+        _get_sushi_stats_raw()
+        _get_sushi_stats_raw("http://other.example.com/Sushi")
+        _get_sushi_stats_raw()
+    assert clock.sleeps == [1.0]
+
+
+def test_circuit_opens_on_server_errors(clock):
+    throttle.configure(failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    @all_requests
+    def unavailable_mock(url, request_unused):
+        calls.append(url.netloc)
+        return {"status_code": 503, "content": b"Service Unavailable"}
+
+    with HTTMock(unavailable_mock):
+        for _ in range(2):
+            with pytest.raises(celus_pycounter.exceptions.ServiceNotAvailableError):
+                _get_sushi_stats_raw()
+        with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+            _get_sushi_stats_raw()
+        # other providers are not affected
+        with pytest.raises(celus_pycounter.exceptions.ServiceNotAvailableError):
+            _get_sushi_stats_raw("http://other.example.com/Sushi")
+    assert calls == ["www.example.com", "www.example.com", "other.example.com"]
+
+
+def test_circuit_opens_on_sushi5_busy(clock):
+    throttle.configure(failure_threshold=2)
+    response = read_data("counter5", "data", "not_authorized.json").replace(b"2000", b"1010")
+
+    @all_requests
+    def busy_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": response}
+
+    with HTTMock(busy_mock):
+        for _ in range(2):
+            with pytest.raises(celus_pycounter.exceptions.Sushi5Error):
+                sushi.get_report(
+                    url="http://www.example.com/Sushi",
+                    start_date=datetime.date(2019, 1, 1),
+                    end_date=datetime.date(2019, 1, 31),
+                    release=5,
+                )
+        with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+            sushi.get_report(
+                url="http://www.example.com/Sushi",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 1, 31),
+                release=5,
+            )
+
+
+def test_deferred_records_errors_after_response(clock):
+    throttle.configure(failure_threshold=1)
+
+    @all_requests
+    def ok_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": b"<xml/>"}
+
+    with HTTMock(ok_mock):
+        with pytest.raises(celus_pycounter.exceptions.ServiceBusyError):
+            with throttle.deferred():
+                _get_sushi_stats_raw()
+                exc = celus_pycounter.exceptions.ServiceBusyError("Service Busy")
+                exc.code = 1010
+                raise exc
+        with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+            _get_sushi_stats_raw()
+
+
+def test_deferred_records_success(clock):
+    throttle.configure(failure_threshold=2)
+    breaker = throttle._throttle.breaker("www.example.com")
+    breaker.record_failure()
+
+    @all_requests
+    def ok_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": b"<xml/>"}
+
+    with HTTMock(ok_mock):
+        with throttle.deferred():
+            _get_sushi_stats_raw()
+            assert breaker.failures == 1
+    assert breaker.failures == 0
+
+
+def test_circuit_opens_on_sushi4_busy(clock):
+    throttle.configure(failure_threshold=2)
+    response = read_data("data", "sushi_error.xml").replace(b"3030", b"1010")
+
+    @all_requests
+    def busy_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": response}
+
+    with HTTMock(busy_mock):
+        for _ in range(2):
+            with pytest.raises(celus_pycounter.exceptions.ServiceBusyError):
+                sushi.get_report(
+                    "http://www.example.com/Sushi",
+                    datetime.date(2013, 1, 1),
+                    datetime.date(2013, 1, 31),
+                    polling=polling.PollingStrategy(max_attempts=1),
+                )
+        with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+            _get_sushi_stats_raw()
+
+
+def test_circuit_opens_on_streamed_sushi5_busy(clock):
+    throttle.configure(failure_threshold=2)
+    response = read_data("counter5", "data", "not_authorized.json").replace(b"2000", b"1010")
+
+    @all_requests
+    def busy_mock(url_unused, request_unused):
+        return {"status_code": 200, "content": response}
+
+    with HTTMock(busy_mock):
+        for _ in range(2):
+            with pytest.raises(celus_pycounter.exceptions.Sushi5Error):
+                sushi.get_report(
+                    url="http://www.example.com/Sushi",
+                    start_date=datetime.date(2019, 1, 1),
+                    end_date=datetime.date(2019, 1, 31),
+                    release=5,
+                    stream=True,
+                )
+        with pytest.raises(celus_pycounter.exceptions.CircuitOpenError):
+            _get_sushi_stats_raw()
+
+
+@pytest.mark.parametrize("exc_class", [asyncio.CancelledError, KeyboardInterrupt])
+def test_cancelled_trial_keeps_circuit_open(clock, exc_class):
+    throttle.configure(failure_threshold=1, reset_timeout=30)
+    breaker = throttle._throttle.breaker("www.example.com")
+    breaker.record_failure()
+    clock.now += 30
+    with pytest.raises(exc_class):
+        with throttle.guard("http://www.example.com/Sushi"):
+            raise exc_class()
+    assert breaker.state == breaker.OPEN
+    # another trial request is let through
+    with throttle.guard("http://www.example.com/Sushi"):
+        pass
+    assert breaker.state == breaker.CLOSED
+
+
+def test_deferred_cancelled_records_nothing(clock):
+    throttle.configure(failure_threshold=2)
+    breaker = throttle._throttle.breaker("www.example.com")
+    breaker.record_failure()
+    with pytest.raises(asyncio.CancelledError):
+        with throttle.deferred():
+            with throttle.guard("http://www.example.com/Sushi"):
+                pass
+            raise asyncio.CancelledError()
+    assert breaker.failures == 1
+    assert breaker.state == breaker.CLOSED